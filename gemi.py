@@ -3,18 +3,104 @@
 #  (Emotion and Tone info added to Next Dialogue)
 # =============================================================
 
+import time
+_T0 = time.perf_counter() # 시작 시간 측정 기준
+
 import sys
+import contextlib
 import os
 import re
-import pandas as pd
-import sounddevice as sd
-import soundfile as sf
+import bisect
+import math
+import json
+import threading
+import queue
+import importlib
 import datetime
+import hashlib
+import codecs
+import io
+import zipfile
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.sax.saxutils import escape as xml_escape
+from collections import OrderedDict, deque
+import pickle
+import csv
+import random
+import platform
+import tempfile
+import tracemalloc
+import sqlite3
+import zlib
+import fractions
 
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
 
+_T_QT = time.perf_counter()
+
+
+# =============================================================
+# STARTUP PROFILE - 시작 시간 보고서
+# =============================================================
+class StartupProfile:
+    def __init__(self):
+        self.marks = [("PyQt6 import", _T_QT - _T0)] # (이름, 시작 기준 경과 초)
+        self.imports = []                            # (모듈, 소요 초, 스레드)
+        self.lock = threading.Lock()
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.append((name, time.perf_counter() - _T0))
+
+    def record_import(self, name, seconds):
+        with self.lock:
+            self.imports.append((name, seconds, threading.current_thread().name))
+
+    def report(self):
+        with self.lock:
+            lines = ["[시작 시간 보고서]"]
+            for name, t in self.marks:
+                lines.append(f"  {t * 1000:8.1f} ms  {name}")
+            if self.imports:
+                lines.append("[지연 로딩 모듈]")
+                for name, sec, thread in self.imports:
+                    lines.append(f"  {sec * 1000:8.1f} ms  {name} ({thread})")
+            return "\n".join(lines)
+
+
+STARTUP = StartupProfile()
+
+
+# =============================================================
+# LAZY MODULE - 무거운 모듈은 처음 사용할 때 import
+# =============================================================
+class LazyModule:
+    def __init__(self, name, before_import=None):
+        self._name = name
+        self._before_import = before_import
+        self._module = None
+        self._lock = threading.RLock()
+
+    def _load(self):
+        # 모듈 속성(np.load 등)과 이름이 겹치지 않도록 밑줄
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    if self._before_import:
+                        self._before_import()
+                    t = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    STARTUP.record_import(self._name, time.perf_counter() - t)
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
 
 # =============================================================
 # VLC AUTO-LOADER (VLC 미설치 PC 지원)
@@ -41,53 +127,1327 @@ def configure_vlc_path():
         print("VLC Path Error:", e)
 
 
-configure_vlc_path()
+# pandas: 첫 엑셀/SRT 사용 시, 오디오 모듈: 첫 녹음/재생 시, VLC: 창 표시 후 백그라운드 로딩
+# (EXE 빌드 시 분석에 안 잡히므로 gemi.spec 의 hiddenimports 에 등록)
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+sd = LazyModule("sounddevice")
+sf = LazyModule("soundfile")
+vlc = LazyModule("vlc", before_import=configure_vlc_path) # VLC import (경로 설정 후)
+
+
+# =============================================================
+# 녹음 저장 폴더 (사용자 문서 폴더)
+# =============================================================
+def recordings_dir():
+    home_dir = os.path.expanduser("~")
+    save_folder = os.path.join(home_dir, "Documents", "KingnuDubbingTool_Recordings")
+    os.makedirs(save_folder, exist_ok=True)
+    return save_folder
+
+
+def new_take_path(tag=""):
+    # record_<날짜_시각_밀리초><tag>.wav, 같은 이름(변환된 .flac 포함)이 있으면 _2, _3 ...
+    # 테이크 DB 는 경로가 키 (INSERT OR REPLACE) → 같은 초에 두 번 녹음해도 덮어쓰지 않도록
+    now = datetime.datetime.now()
+    stem = os.path.join(recordings_dir(), f"record_{now:%Y%m%d_%H%M%S}_{now.microsecond // 1000:03d}{tag}")
+    path, n = stem, 1
+    while any(os.path.exists(path + ext) for ext in (".wav", ".flac")):
+        n += 1
+        path = f"{stem}_{n}"
+    return path + ".wav"
+
+
+def take_sidecar_path(wav_path):
+    # record_*.wav 옆에 같은 이름의 .json 메타데이터
+    return os.path.splitext(wav_path)[0] + ".json"
+
+
+def read_take_sidecar(wav_path):
+    try:
+        with open(take_sidecar_path(wav_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_take_sidecar(wav_path, meta):
+    with open(take_sidecar_path(wav_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def cue_key(start_sec, line):
+    # 대사의 안정적인 식별자: 시작 시각(ms) + 대사 해시 (행 번호/대본 경로는 대본을 고치거나 옮기면 바뀜)
+    if start_sec is None or start_sec != start_sec:
+        return None
+    text = line.strip() if isinstance(line, str) else "" # NaN/None 대사는 DB 에서 NULL
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    return f"{int(round(start_sec * 1000))}:{digest}"
+
 
-# VLC import (경로 설정 후)
-import vlc
+# =============================================================
+# TAKE STORE - 대본/대사/화자 → 녹음 테이크 색인 (SQLite)
+# =============================================================
+class TakeStore:
+    SCHEMA_VERSION = 4
+    UPGRADES = {
+        2: ["ALTER TABLE takes ADD COLUMN selected INTEGER NOT NULL DEFAULT 0"],  # 대사별 선택 테이크 (믹스다운)
+        3: ["ALTER TABLE takes ADD COLUMN trim_start_sec REAL",                  # 무음 트림 (비파괴)
+            "ALTER TABLE takes ADD COLUMN trim_end_sec REAL"],
+        4: ["ALTER TABLE takes ADD COLUMN cue_key TEXT",                          # 행 번호 대신 대사 식별자로 연결
+            "CREATE INDEX IF NOT EXISTS takes_script_cue_key ON takes (script, cue_key)"],
+    }
+    DB_NAME = "takes.sqlite"
+
+    def __init__(self, folder=None):
+        self.folder = folder or recordings_dir()
+        self.lock = threading.Lock() # 백그라운드 작업에서도 사용
+        self.db = sqlite3.connect(os.path.join(self.folder, self.DB_NAME), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+
+    def _migrate(self):
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        if version >= 1:
+            with self.db:
+                for v in range(version + 1, self.SCHEMA_VERSION + 1):
+                    for sql in self.UPGRADES[v]:
+                        self.db.execute(sql)
+                if version < 4:
+                    self._fill_cue_keys()
+                self.db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            return
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS takes (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    script TEXT,
+                    cue INTEGER,
+                    cue_start_sec REAL,
+                    speaker TEXT,
+                    line TEXT,
+                    video_start_sec REAL,
+                    offset_sec REAL NOT NULL DEFAULT 0,
+                    duration_sec REAL,
+                    created TEXT,
+                    selected INTEGER NOT NULL DEFAULT 0,
+                    trim_start_sec REAL,
+                    trim_end_sec REAL,
+                    cue_key TEXT
+                );
+                CREATE INDEX IF NOT EXISTS takes_script_cue ON takes (script, cue);
+                CREATE INDEX IF NOT EXISTS takes_script_cue_key ON takes (script, cue_key);
+                CREATE INDEX IF NOT EXISTS takes_script_speaker ON takes (script, speaker);
+                CREATE INDEX IF NOT EXISTS takes_speaker ON takes (speaker);
+            """)
+            self.db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        # 색인 도입 전 녹음은 사이드카 기준으로 한 번만 가져옴 (대사 연결 없음)
+        self.import_folder(self.folder)
+
+    def _fill_cue_keys(self):
+        # v4 이전 테이크: 저장해 둔 대사 시작/대사로 식별자 계산
+        rows = self.db.execute(
+            "SELECT id, cue_start_sec, line FROM takes WHERE cue IS NOT NULL AND cue_key IS NULL"
+        ).fetchall()
+        self.db.executemany(
+            "UPDATE takes SET cue_key = ? WHERE id = ?", [(cue_key(r["cue_start_sec"], r["line"]), r["id"]) for r in rows]
+        )
+
+    @staticmethod
+    def script_key(path):
+        return os.path.normcase(os.path.abspath(path)) if path else None
+
+    @staticmethod
+    def take_cue_key(take):
+        if take.get("cue") is None:
+            return None
+        return take.get("cue_key") or cue_key(take.get("cue_start_sec"), take.get("line"))
+
+    def add(self, take):
+        # take: Recorder.stop() 결과 (+ script, cue, cue_start_sec, speaker, line)
+        with self.lock, self.db:
+            cur = self.db.execute(
+                """INSERT OR REPLACE INTO takes
+                   (path, script, cue, cue_key, cue_start_sec, speaker, line, video_start_sec, offset_sec,
+                    duration_sec, created)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    take["path"], self.script_key(take.get("script")), take.get("cue"), self.take_cue_key(take),
+                    take.get("cue_start_sec"), take.get("speaker"), take.get("line"),
+                    take.get("video_start_sec"), take.get("offset_sec") or 0.0,
+                    take.get("duration_sec"), take.get("created"),
+                ),
+            )
+            return cur.lastrowid
+
+    def import_folder(self, folder):
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith((".wav", ".flac")):
+                continue
+            path = os.path.join(folder, name)
+            meta = read_take_sidecar(path)
+            meta["path"] = path
+            trim = meta.get("trim") or {}
+            with self.lock, self.db:
+                self.db.execute(
+                    """INSERT OR IGNORE INTO takes
+                       (path, script, cue, cue_key, cue_start_sec, speaker, line, video_start_sec, duration_sec,
+                        created, trim_start_sec, trim_end_sec)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (
+                        path, self.script_key(meta.get("script")), meta.get("cue"), self.take_cue_key(meta),
+                        meta.get("cue_start_sec"), meta.get("speaker"), meta.get("line"),
+                        meta.get("video_start_sec"), meta.get("duration_sec"), meta.get("created"),
+                        trim.get("start_sec"), trim.get("end_sec"),
+                    ),
+                )
+
+    def _query(self, where, args):
+        with self.lock:
+            return [dict(r) for r in self.db.execute(
+                f"SELECT * FROM takes WHERE {where} ORDER BY created DESC, id DESC", args
+            )]
+
+    def for_cue(self, script, key):
+        # key: cue_key() (대본 행이 추가/삭제되어 번호가 밀려도 같은 대사)
+        return self._query("script = ? AND cue_key = ?", (self.script_key(script), key))
+
+    def for_speaker(self, script, speaker):
+        return self._query("script = ? AND speaker = ?", (self.script_key(script), speaker))
+
+    def for_script(self, script):
+        return self._query("script = ?", (self.script_key(script),))
+
+    def unattached(self):
+        return self._query("script IS NULL", ())
+
+    def selected_for_script(self, script):
+        # 대사마다 한 테이크: 선택한 것, 없으면 가장 최근 것
+        return self._query(
+            """script = ? AND cue_key IS NOT NULL AND id = (
+                   SELECT u.id FROM takes u WHERE u.script = takes.script AND u.cue_key = takes.cue_key
+                   ORDER BY u.selected DESC, u.created DESC, u.id DESC LIMIT 1)""",
+            (self.script_key(script),),
+        )
+
+    def select(self, take_id):
+        with self.lock, self.db:
+            row = self.db.execute("SELECT script, cue_key FROM takes WHERE id = ?", (take_id,)).fetchone()
+            if row is None:
+                return
+            self.db.execute(
+                "UPDATE takes SET selected = 0 WHERE script IS ? AND cue_key IS ?", (row["script"], row["cue_key"])
+            )
+            self.db.execute("UPDATE takes SET selected = 1 WHERE id = ?", (take_id,))
+
+    def set_trim(self, path, start_sec, end_sec):
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE takes SET trim_start_sec = ?, trim_end_sec = ? WHERE path = ?", (start_sec, end_sec, path)
+            )
+
+    def set_offset(self, take_id, offset_sec):
+        with self.lock, self.db:
+            self.db.execute("UPDATE takes SET offset_sec = ? WHERE id = ?", (offset_sec, take_id))
 
+    def move(self, old_path, new_path):
+        # 파일 변환(예: FLAC) 후 경로 갱신
+        with self.lock, self.db:
+            self.db.execute("UPDATE takes SET path = ? WHERE path = ?", (new_path, old_path))
 
+    def remove_missing(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, path FROM takes").fetchall()
+        gone = [(r["id"],) for r in rows if not os.path.exists(r["path"])]
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM takes WHERE id = ?", gone)
+        return len(gone)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# =============================================================
+# AudioRingBuffer - 오디오 콜백 → 파일 쓰기 스레드 사이 고정 크기 버퍼
 # =============================================================
-# Recorder - 안정적 녹음기 
+class AudioRingBuffer:
+    def __init__(self, frames, channels, dtype="float32"):
+        self.buf = np.zeros((frames, channels), dtype=dtype)
+        self.size = frames
+        self.write_pos = 0  # 누적 기록 프레임
+        self.read_pos = 0   # 누적 읽기 프레임
+        self.dropped = 0    # 버퍼가 가득 차 버려진 프레임 수
+        self.cond = threading.Condition()
+
+    def write(self, block):
+        # 오디오 콜백에서 호출 (블로킹 없음, 가득 차면 버림)
+        with self.cond:
+            n = len(block)
+            free = self.size - (self.write_pos - self.read_pos)
+            if n > free:
+                self.dropped += n - free
+                n = free
+            i = self.write_pos % self.size
+            first = min(n, self.size - i)
+            self.buf[i:i + first] = block[:first]
+            self.buf[:n - first] = block[first:n]
+            self.write_pos += n
+            self.cond.notify()
+
+    def read(self, max_frames, timeout=0.1):
+        # 쓰기 스레드에서 호출, 데이터가 없으면 timeout 동안 대기
+        with self.cond:
+            if self.write_pos == self.read_pos:
+                self.cond.wait(timeout)
+            n = min(max_frames, self.write_pos - self.read_pos)
+            i = self.read_pos % self.size
+            first = min(n, self.size - i)
+            out = np.concatenate((self.buf[i:i + first], self.buf[:n - first]))
+            self.read_pos += n
+            self.cond.notify()
+            return out
+
+    def wait_space(self, frames, timeout=0.1):
+        # 재생용: 읽기 스레드가 빈 자리를 기다림 (오디오 콜백이 읽으면 깨어남)
+        with self.cond:
+            if self.size - (self.write_pos - self.read_pos) < frames:
+                self.cond.wait(timeout)
+            return self.size - (self.write_pos - self.read_pos) >= frames
+
+
 # =============================================================
+# Recorder - 스트리밍 녹음기 (길이 제한 없음, 메모리 고정)
+# =============================================================
+class VideoClockSnapshot:
+    # GUI 스레드가 영상 위치를 발행하고 오디오 콜백은 읽기만 (콜백에서 PlaybackClock/VLC 호출 안 함)
+    def __init__(self):
+        self.value = None # (영상 초, monotonic, 배속) - 튜플 통째로 교체하므로 읽기는 원자적
+
+    def publish(self, video_sec, rate):
+        self.value = (video_sec, time.monotonic(), rate)
+
+    def clear(self):
+        self.value = None
+
+    def now(self):
+        v = self.value
+        if v is None:
+            return None
+        sec, t, rate = v
+        return sec + (time.monotonic() - t) * rate
+
+
 class Recorder:
+    BLOCK_FRAMES = 1024      # 입력 스트림 콜백 블록 크기
+    RING_SECONDS = 10        # 링 버퍼 길이 (mono 44.1kHz float32 ≈ 1.7MB)
+    WRITE_FRAMES = 16384     # 파일 쓰기 단위
+    XRUN_LOG = 200           # 테이크마다 남길 xrun 위치 수
+
     def __init__(self):
         self.fs = 44100
         self.channels = 1
-        self.recording = None
-        self.start_time = None
-
-    def start(self):
-        self.start_time = datetime.datetime.now()
-        self.recording = sd.rec(
-            int(3600 * self.fs),
-            samplerate=self.fs,
-            channels=self.channels,
-            dtype="float32"
-        )
+        self.stream = None
+        self.ring = None
+        self.writer = None
+        self.file = None
+        self.path = None
+        self.frames = 0
+        self.error = None
+        self.finished = threading.Event()
+        self.punch_done = threading.Event() # 펀치인 구간 끝 도달 (GUI 틱에서 확인)
+        self.window = None
+        self.latency_key = None   # 지연 보정 프로필 (장치 키, 테이크 오프셋 초)
+        self.subtype = None       # WAV 샘플 형식 (None: soundfile 기본 PCM_16)
+        self.latency_offset = 0.0
+        self.video_snapshot = VideoClockSnapshot()
+        self._reset_clock(None)
+
+    def _reset_clock(self, video_clock):
+        # 오디오 스트림이 보고한 프레임 수/타임스탬프 기준 (벽시계 사용 안 함)
+        self.video_clock = video_clock
+        self.video_snapshot.clear()  # 펀치인: 콜백이 읽는 영상 위치 (GUI 가 publish)
+        self.captured = 0            # 콜백으로 받은 총 프레임
+        self.first_adc = None        # 첫 샘플의 스트림 시각 (inputBufferAdcTime)
+        self.last_adc = None         # 마지막 블록 첫 샘플의 스트림 시각
+        self.last_block_start = 0    # 마지막 블록 첫 샘플의 프레임 번호
+        self.stream_t0 = None        # 시작 직후 (stream.time, 영상 위치) 기준점
+        self.video_t0 = None
+        self.video_first = None      # 펀치인: 첫 기록 샘플의 영상 위치 (콜백에서 직접 측정)
+        self.input_overflows = 0     # 입력 스트림 상태 플래그 (드롭아웃 원인 추적)
+        self.input_underflows = 0
+        self.xruns = []              # (프레임 번호, "overflow"/"underflow") 최대 XRUN_LOG 개
+
+    def is_recording(self):
+        return self.stream is not None
+
+    def set_latency_profile(self, key, offset_sec):
+        self.latency_key = key
+        self.latency_offset = offset_sec
+
+    def publish_video_clock(self, video_sec, rate):
+        # GUI 스레드 (틱/탐색마다): 펀치인 콜백이 보는 영상 위치
+        self.video_snapshot.publish(video_sec, rate)
+
+    def start(self, path, video_clock=None, tags=None, window=None, latency=None):
+        # video_clock: 영상 타임라인 위치(초)를 돌려주는 함수 (예: VideoPlayer.get_time_sec), GUI 스레드에서만 호출
+        # tags: 사이드카/색인에 함께 남길 정보 (대본, 대사 번호, 화자 등)
+        # window: (시작, 끝) 영상 위치(초) - 펀치인. 스트림은 바로 열고 구간 안의 샘플만 기록
+        if self.stream is not None:
+            raise RuntimeError("이미 녹음 중입니다.")
+        if window is not None and video_clock is None:
+            raise ValueError("펀치인에는 영상 시계가 필요합니다.")
+
+        self.path = path
+        self.tags = dict(tags or {})
+        self.frames = 0
+        self.error = None
+        self.finished.clear()
+        self.punch_done.clear()
+        self.window = window
+        self._reset_clock(video_clock)
+        self.ring = AudioRingBuffer(int(self.RING_SECONDS * self.fs), self.channels)
+        self.file = sf.SoundFile(path, mode="w", samplerate=self.fs, channels=self.channels, subtype=self.subtype)
+
+        self.writer = threading.Thread(target=self._write_loop, name="RecorderWriter", daemon=True)
+        self.writer.start()
+
+        try:
+            self.stream = sd.InputStream(
+                samplerate=self.fs,
+                channels=self.channels,
+                dtype="float32",
+                blocksize=self.BLOCK_FRAMES,
+                callback=self._callback,
+                latency=latency or "high",
+            )
+            self.stream.start()
+        except Exception:
+            self.stream = None
+            self.finished.set()
+            self.writer.join()
+            raise
+
+        # 스트림 시계와 영상 시계의 기준점
+        self.stream_t0 = self.stream.time
+        self.video_t0 = video_clock() if video_clock else None
+
+    def _adc_time(self, time_info, frames):
+        # 일부 호스트 API 는 inputBufferAdcTime 을 0 으로 보고 → currentTime 으로 근사
+        t = time_info.inputBufferAdcTime
+        if not t:
+            t = time_info.currentTime - frames / self.fs
+        return t
+
+    def _callback(self, indata, frames, time_info, status):
+        # 오디오 스레드: 시각 기록 + 링 버퍼에 복사만 하고 즉시 반환
+        if status:
+            self._note_status(status)
+        adc = self._adc_time(time_info, frames)
+        if self.window is not None:
+            self._punch_block(indata, frames, time_info, adc)
+            return
+        if self.first_adc is None:
+            self.first_adc = adc
+        self.last_adc = adc
+        self.last_block_start = self.captured
+        self.captured += frames
+        self.ring.write(indata)
+
+    def _note_status(self, status):
+        # 플래그가 있을 때만 호출 (평소에는 bool 확인 한 번)
+        for kind in ("overflow", "underflow"):
+            if getattr(status, "input_" + kind, False):
+                if kind == "overflow":
+                    self.input_overflows += 1
+                else:
+                    self.input_underflows += 1
+                if len(self.xruns) < self.XRUN_LOG:
+                    self.xruns.append((self.captured, kind))
+
+    def _punch_block(self, indata, frames, time_info, adc):
+        # 이 블록 첫 샘플이 입력된 순간의 영상 위치 = 지금 영상 위치 - (지금 - ADC 시각)
+        if self.punch_done.is_set():
+            return
+        video_now = self.video_snapshot.now()
+        if video_now is None:
+            return # 아직 영상 위치 발행 전 (탐색 직후)
+        now = time_info.currentTime
+        pos = video_now - ((now - adc) if now else 0.0)
+        start, end = self.window
+        a = 0
+        if self.first_adc is None:
+            a = int(round((start - pos) * self.fs))
+            if a >= frames:
+                return # 프리롤 구간
+            a = max(0, a)
+            self.first_adc = adc + a / self.fs
+            self.video_first = pos + a / self.fs
+        b = min(frames, int(round((end - pos) * self.fs)))
+        if b > a:
+            self.last_adc = adc + a / self.fs
+            self.last_block_start = self.captured
+            self.captured += b - a
+            self.ring.write(indata[a:b])
+        if b < frames:
+            self.punch_done.set()
+
+    def _write_loop(self):
+        try:
+            while True:
+                block = self.ring.read(self.WRITE_FRAMES)
+                if len(block):
+                    self.file.write(block)
+                    self.frames += len(block)
+                elif self.finished.is_set():
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.file.close()
 
     def stop(self):
-        sd.stop()
-        sd.wait() 
-        
-        duration = (datetime.datetime.now() - self.start_time).total_seconds()
-        samples = int(duration * self.fs)
-        
-        return self.recording[:samples]
+        if self.stream is None:
+            raise RuntimeError("녹음 중이 아닙니다.")
+
+        try:
+            # 종료 직전 기준점 (드리프트 측정용)
+            video_t1 = self.video_clock() if self.video_clock else None
+            stream_t1 = self.stream.time
+            self.stream.stop()
+            self.stream.close()
+        finally:
+            self.stream = None
+            # 남은 버퍼를 모두 기록한 뒤 파일 닫기
+            self.finished.set()
+            self.writer.join()
+
+        if self.error is not None:
+            raise self.error
+
+        take = self._take_metadata(video_t1, stream_t1)
+        write_take_sidecar(self.path, take)
+        return take
+
+    def _take_metadata(self, video_t1, stream_t1):
+        fs = self.fs
+        take = {
+            "path": self.path,
+            "sample_rate": fs,
+            "channels": self.channels,
+            "frames": self.frames,
+            "captured_frames": self.captured,
+            "dropped_frames": self.ring.dropped,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "xruns": [{"frame": f, "kind": k} for f, k in self.xruns],
+            "duration_sec": self.frames / fs,
+            "stream_start_time": self.stream_t0,
+            "stream_first_sample_time": self.first_adc,
+            "video_start_sec": None,
+            "video_end_sec": video_t1,
+            "drift_sec": None,
+            "drift_ppm": None,
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "latency_profile": self.latency_key,
+            "offset_sec": self.latency_offset,
+        }
+        take.update(self.tags)
+        if self.video_t0 is None or self.first_adc is None:
+            return take
+
+        # 첫 샘플 시점의 영상 위치
+        video_first = self.video_first
+        if video_first is None:
+            video_first = self.video_t0 + (self.first_adc - self.stream_t0)
+        take["video_start_sec"] = video_first
+
+        # 종료 기준점의 샘플 번호 → 오디오 시계로 본 경과 시간
+        k1 = self.last_block_start + (stream_t1 - self.last_adc) * fs
+        audio_elapsed = k1 / fs
+        video_elapsed = video_t1 - video_first
+
+        # 영상이 멈춰 있었다면 (일시정지 중 녹음) 드리프트는 의미 없음
+        if audio_elapsed > 1.0 and video_elapsed > 0.5 * audio_elapsed:
+            drift = video_elapsed - audio_elapsed
+            take["drift_sec"] = drift
+            take["drift_ppm"] = drift / audio_elapsed * 1e6
+        return take
 
     def play(self, data):
         sd.play(data, self.fs)
 
 
 # =============================================================
-# VLC Video Player
+# TakePlayer - 테이크 스트리밍 재생 (디스크 → 링 버퍼 → 출력 콜백, 영상 시계 정렬)
 # =============================================================
-class VideoPlayer(QWidget):
+class TakePlayer:
+    BLOCK_FRAMES = 512       # 출력 콜백 블록 (저지연)
+    RING_SECONDS = 4
+    READ_FRAMES = 8192       # 디스크 읽기 단위
+    PREFILL_SECONDS = 0.25   # 시작 전 동기 읽기 (대용량 파일도 즉시 시작)
+
+    def __init__(self):
+        self.stream = None
+        self.reader = None
+        self.file = None
+        self.ring = None
+        self.done = threading.Event()
+        self.stopping = threading.Event()
+        self.eof = False
+        self.sync_error = None # 정렬 시 채운(+)/건너뛴(-) 시간 (초, 진단용)
+        self.video_snapshot = VideoClockSnapshot() # 콜백이 읽는 영상 위치 (GUI 가 publish)
+
+    def is_playing(self):
+        return self.stream is not None and not self.done.is_set()
+
+    def publish_video_clock(self, video_sec, rate):
+        # GUI 스레드 (틱/탐색마다)
+        self.video_snapshot.publish(video_sec, rate)
+
+    def start(self, path, take_start_sec=None):
+        # take_start_sec 이 있으면 발행된 영상 위치가 그 시각에 닿는 샘플부터 소리 냄
+        self.stop()
+        self.file = sf.SoundFile(path)
+        self.fs = self.file.samplerate
+        self.channels = self.file.channels
+        self.video_snapshot.clear()
+        self.take_start = take_start_sec
+        self.aligned = take_start_sec is None
+        self.skip = 0
+        self.sync_error = None
+        self.eof = False
+        self.done.clear()
+        self.stopping.clear()
+        self.ring = AudioRingBuffer(int(self.RING_SECONDS * self.fs), self.channels)
+        self._fill(int(self.PREFILL_SECONDS * self.fs))
+
+        self.reader = threading.Thread(target=self._read_loop, name="TakeReader", daemon=True)
+        self.reader.start()
+        try:
+            self.stream = sd.OutputStream(
+                samplerate=self.fs,
+                channels=self.channels,
+                dtype="float32",
+                blocksize=self.BLOCK_FRAMES,
+                callback=self._callback,
+                finished_callback=self.done.set,
+                latency="low",
+            )
+            self.stream.start()
+        except Exception:
+            # 장치 사용 중/샘플레이트 불가 등: 읽기 스레드를 멈추면 파일도 닫힘
+            if self.stream is not None:
+                self.stream.close()
+            self.stream = None
+            self.stopping.set()
+            self.reader.join()
+            self.done.set()
+            raise
+
+    def _fill(self, frames):
+        block = self.file.read(frames, dtype="float32", always_2d=True)
+        if len(block) < frames:
+            self.eof = True
+        self.ring.write(block)
+
+    def _read_loop(self):
+        try:
+            while not self.eof and not self.stopping.is_set():
+                if self.ring.wait_space(self.READ_FRAMES):
+                    self._fill(self.READ_FRAMES)
+        finally:
+            self.file.close()
+
+    def _callback(self, outdata, frames, time_info, status):
+        start = 0
+        if not self.aligned:
+            # 이 블록이 스피커에 닿는 순간의 영상 위치
+            video_now = self.video_snapshot.now()
+            if video_now is None: # 아직 영상 위치 발행 전
+                outdata.fill(0)
+                return
+            now = time_info.currentTime
+            dac = time_info.outputBufferDacTime
+            pos = video_now + ((dac - now) if now and dac else 0.0)
+            lead = int(round((self.take_start - pos) * self.fs))
+            if lead >= frames: # 아직 테이크 시작 전 (VLC 버퍼링/프리롤)
+                outdata.fill(0)
+                return
+            self.aligned = True
+            self.sync_error = lead / self.fs
+            if lead > 0:
+                start = lead
+            else:
+                self.skip = -lead # 이미 지난 부분은 버림
+
+        while self.skip:
+            dropped = len(self.ring.read(self.skip, timeout=0))
+            if not dropped:
+                break
+            self.skip -= dropped
+
+        outdata[:start] = 0
+        data = self.ring.read(frames - start, timeout=0)
+        n = len(data)
+        outdata[start:start + n] = data
+        outdata[start + n:] = 0
+        if start + n < frames and self.eof and self.ring.write_pos == self.ring.read_pos:
+            raise sd.CallbackStop()
+
+    def stop(self):
+        if self.stream is None:
+            return
+        self.stopping.set()
+        try:
+            self.stream.abort()
+            self.stream.close()
+        finally:
+            self.stream = None
+            self.done.set()
+            self.reader.join()
+
+
+# =============================================================
+# TAKE ENCODER - 녹음 후 FLAC / 24-bit WAV 로 백그라운드 변환 (검증 후 원본 삭제)
+# =============================================================
+STORAGE_FORMATS = {
+    # 키: (표시 이름, 녹음 subtype, 변환 (확장자, format, subtype) 또는 None)
+    "wav": ("WAV (변환 안 함)", None, None),
+    "flac": ("FLAC (녹음 후 압축)", "FLOAT", (".flac", "FLAC", "PCM_24")),
+    "wav24": ("WAV 24-bit (녹음 후 변환)", "FLOAT", (".wav", "WAV", "PCM_24")),
+}
+
+
+class TakeEncoder:
+    BLOCK_FRAMES = 65536
+    RETRY_SEC = 5.0          # 파일 잠김 (녹음기/재생 중 등) 시 재시도 간격
+    MAX_RETRIES = 12         # 이만큼 계속 잠겨 있으면 실패 처리 (약 1분)
+    TOLERANCE = 2.0 / 2 ** 23 # 24-bit 양자화 오차 허용
+
+    def __init__(self, store_getter):
+        self.store_getter = store_getter # GUI 가 쓰는 TakeStore 를 공유 (처음 쓸 때 생성)
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.done = 0
+        self.failed = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.busy_sec = 0.0
+        self.current = None
+        self.worker = None
+
+    def submit(self, path, fmt, trim=True):
+        # 테이크 후처리: (선택) 무음 트림 → (선택) 변환
+        target = STORAGE_FORMATS[fmt][2]
+        if target is None and not trim:
+            return
+        with self.lock:
+            self.pending += 1
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, name="TakeEncoder", daemon=True)
+                self.worker.start()
+        self.jobs.put((path, target, trim, 0))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "pending": self.pending,
+                "done": self.done,
+                "failed": len(self.failed),
+                "current": self.current,
+                "mb_per_sec": self.bytes_in / 1e6 / self.busy_sec if self.busy_sec else 0.0,
+                "saved_ratio": 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+            }
+
+    def _run(self):
+        while True:
+            path, target, trim, attempt = self.jobs.get()
+            with self.lock:
+                self.current = os.path.basename(path)
+            t0 = time.perf_counter()
+            trimmed = False
+            try:
+                if trim:
+                    t = trim_take(path)
+                    self.store_getter().set_trim(path, t["start_sec"], t["end_sec"])
+                    trimmed = True
+                if target is not None:
+                    size_in, size_out = self.encode(path, target)
+                    with self.lock:
+                        self.done += 1
+                        self.bytes_in += size_in
+                        self.bytes_out += size_out
+            except PermissionError as e:
+                # 파일이 아직 열려 있음 (Windows: 녹음기/재생) → 잠시 뒤 다시, 트림이 끝났으면 변환만
+                if attempt < self.MAX_RETRIES:
+                    retry = threading.Timer(self.RETRY_SEC, self.jobs.put, ((path, target, trim and not trimmed, attempt + 1),))
+                    retry.daemon = True
+                    retry.start()
+                    with self.lock:
+                        self.pending += 1
+                else:
+                    with self.lock:
+                        self.failed.append((path, f"파일이 계속 사용 중: {e}"))
+            except Exception as e:
+                print("Take Encoder Error:", path, e)
+                with self.lock:
+                    self.failed.append((path, str(e)))
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                    self.busy_sec += time.perf_counter() - t0
+                    self.current = None
+
+    def encode(self, path, target):
+        ext, fmt, subtype = target
+        base = os.path.splitext(path)[0]
+        dst = base + ext
+        if os.path.normcase(dst) == os.path.normcase(path):
+            dst = base + "_24bit" + ext
+        partial = dst + ".partial"
+
+        # 1) 블록 단위 변환 (정수 PCM 범위로 자름)
+        with sf.SoundFile(path) as src, sf.SoundFile(
+            partial, "w", samplerate=src.samplerate, channels=src.channels, format=fmt, subtype=subtype
+        ) as out:
+            for block in src.blocks(blocksize=self.BLOCK_FRAMES, dtype="float32", always_2d=True):
+                out.write(np.clip(block, -1.0, 1.0))
+
+        # 2) 검증: 다시 읽어 프레임 수와 샘플 값 비교
+        try:
+            self.verify(path, partial)
+        except Exception:
+            os.remove(partial)
+            raise
+
+        # 3) 교체: 색인 갱신 → 원본 삭제까지 성공해야 확정, 사이드카는 그 뒤에 기록
+        #    (wav/flac 은 사이드카 파일을 같이 쓰므로 실패 시 원본 정보가 그대로 남아야 함)
+        meta = read_take_sidecar(path)
+        size_in = os.path.getsize(path)
+        try:
+            os.replace(partial, dst)
+        except OSError:
+            os.remove(partial)
+            raise
+        store = self.store_getter()
+        store.move(path, dst)
+        try:
+            os.remove(path)
+        except OSError:
+            # 되돌려 두고 실패 처리 (PermissionError: 재생 중인 파일은 Windows 에서 지울 수 없음 → 재시도)
+            store.move(dst, path)
+            os.remove(dst)
+            raise
+        if meta:
+            meta["path"] = dst
+            meta["encoded_from"] = os.path.basename(path)
+            write_take_sidecar(dst, meta)
+            if take_sidecar_path(dst) != take_sidecar_path(path):
+                try:
+                    os.remove(take_sidecar_path(path))
+                except OSError:
+                    pass
+        return size_in, os.path.getsize(dst)
+
+    def verify(self, original, encoded):
+        with sf.SoundFile(original) as a, sf.SoundFile(encoded) as b:
+            if (a.frames, a.channels, a.samplerate) != (b.frames, b.channels, b.samplerate):
+                raise RuntimeError(f"변환 검증 실패: 길이/형식 불일치 ({a.frames} ≠ {b.frames})")
+            while True:
+                x = a.read(self.BLOCK_FRAMES, dtype="float32", always_2d=True)
+                if not len(x):
+                    break
+                y = b.read(len(x), dtype="float32", always_2d=True)
+                if len(y) != len(x) or np.abs(np.clip(x, -1.0, 1.0) - y).max() > self.TOLERANCE:
+                    raise RuntimeError("변환 검증 실패: 샘플 값 불일치")
+
+
+# =============================================================
+# PLAYBACK CLOCK - VLC 이벤트 구독 + 이벤트 사이 단조 시계 보간
+# =============================================================
+class PlaybackClock(QObject):
+    changed = pyqtSignal()              # 위치/길이가 불연속적으로 바뀜 (탐색, 일시정지 등)
+    running_changed = pyqtSignal(bool)  # 재생 시작/멈춤
+    _event = pyqtSignal(str, object)    # VLC 스레드 → GUI 스레드
+
+    RESYNC_MS = 300     # 보고 시간과 보간 시간 차이가 이보다 크면 즉시 재기준 (탐색 등)
+    CORRECTION = 0.2    # 작은 오차는 조금씩 따라감 (카운트다운이 튀지 않도록)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query_ms = None  # 현재 위치 조회 함수 (GUI 스레드에서만 호출)
+        self.diag = None      # SessionDiagnostics (진단 패널이 켜져 있을 때만)
+        self._event.connect(self._handle_event)
+        self.reset()
+
+    def reset(self):
+        self.playing = False
+        self.anchor_ms = 0
+        self.anchor_mono = time.monotonic()
+        self.length_ms = 0
+        self.rate = 1.0
+
+    def attach_vlc(self, media_player):
+        # 이벤트 콜백은 VLC 스레드에서 호출되므로 시그널로만 넘김 (libvlc 함수 호출 금지)
+        self.query_ms = media_player.get_time
+        em = media_player.event_manager()
+        E = vlc.EventType
+        em.event_attach(E.MediaPlayerTimeChanged, lambda ev: self._event.emit("time", ev.u.new_time))
+        em.event_attach(E.MediaPlayerLengthChanged, lambda ev: self._event.emit("length", ev.u.new_length))
+        em.event_attach(E.MediaPlayerPlaying, lambda ev: self._event.emit("playing", None))
+        em.event_attach(E.MediaPlayerPaused, lambda ev: self._event.emit("paused", None))
+        em.event_attach(E.MediaPlayerStopped, lambda ev: self._event.emit("stopped", None))
+        em.event_attach(E.MediaPlayerEndReached, lambda ev: self._event.emit("stopped", None))
+
+    def _handle_event(self, kind, value):
+        if kind == "time":
+            self.on_time(value)
+        elif kind == "length":
+            self.on_length(value)
+        elif kind == "playing":
+            self.on_playing(self.query_ms() if self.query_ms else self.now_ms())
+        elif kind == "paused":
+            self.on_paused(self.query_ms() if self.query_ms else self.now_ms())
+        elif kind == "stopped":
+            self.on_paused(self.now_ms())
+
+    # ---------------------------
+    def now_ms(self):
+        if not self.playing:
+            return self.anchor_ms
+        t = self.anchor_ms + (time.monotonic() - self.anchor_mono) * 1000 * self.rate
+        return min(t, self.length_ms) if self.length_ms > 0 else t
+
+    def _anchor(self, ms):
+        self.anchor_ms = max(0, ms)
+        self.anchor_mono = time.monotonic()
+
+    def seek(self, ms):
+        # 사용자 탐색: 이벤트를 기다리지 않고 바로 반영
+        if self.diag is not None:
+            self.diag.seek_started(ms)
+        self._anchor(ms)
+        self.changed.emit()
+
+    def on_time(self, ms):
+        if self.diag is not None:
+            self.diag.time_reported(ms)
+        if not self.playing:
+            self._anchor(ms)
+            self.changed.emit()
+            return
+
+        err = ms - self.now_ms()
+        if abs(err) > self.RESYNC_MS:
+            self._anchor(ms)
+            self.changed.emit()
+        else:
+            self._anchor(self.now_ms() + err * self.CORRECTION)
+
+    def on_length(self, ms):
+        self.length_ms = max(0, int(ms))
+        self.changed.emit()
+
+    def on_playing(self, ms):
+        self._anchor(ms)
+        if not self.playing:
+            self.playing = True
+            self.running_changed.emit(True)
+        self.changed.emit()
+
+    def on_paused(self, ms):
+        self._anchor(ms)
+        if self.playing:
+            self.playing = False
+            self.running_changed.emit(False)
+        self.changed.emit()
+
+
+# =============================================================
+# TIMELINE - 화자별 대사 블록 + 재생 위치 (타일 캐시)
+# =============================================================
+class TimelineView(QWidget):
+    seek_requested = pyqtSignal(float)
+
+    TILE_PX = 256        # 타일 한 장의 폭 (px)
+    MAX_TILES = 96       # 캐시할 타일 수 (LRU)
+    RULER_PX = 16        # 위쪽 시간 눈금 높이
+    BASE_PPS = 10.0      # zoom 0 의 초당 픽셀
+    ZOOM_STEP = 1.25     # 확대 단계 (단계가 정수라 같은 배율의 타일을 재사용)
+    ZOOM_RANGE = (-14, 20)
+    DEFAULT_CUE_SEC = 2.0 # 끝 시간이 없을 때 블록 길이
+    TICK_STEPS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.cues = []   # (시작, 끝, 레인, 색, 화자) 시작 순
+        self.starts = []
+        self.max_len = 0.0
+        self.lanes = 1
+        self.zoom = 0
+        self.view_start = 0.0
+        self.playhead = 0.0
+        self.duration = 0.0
+        self.tiles = OrderedDict() # (zoom, 타일 번호) → QPixmap
+        self._press_x = None
+        self._dragged = False
+        self.setMinimumHeight(110)
+        self.setMouseTracking(False)
+
+    @property
+    def pps(self):
+        return self.BASE_PPS * self.ZOOM_STEP ** self.zoom
+
+    def set_cues(self, full, speaker_colors):
+        lane_of = {spk: i for i, spk in enumerate(speaker_colors)}
+        cues = []
+        for r in full:
+            start = r["시작_초"]
+            if start != start: # NaN 행은 정렬상 맨 뒤 (CueIndex 와 동일)
+                break
+            end = to_sec(r.get("끝", 0))
+            if not end > start:
+                end = start + self.DEFAULT_CUE_SEC
+            spk = r["화자"]
+            cues.append((start, end, lane_of.get(spk, 0), QColor(speaker_colors.get(spk, "#888888")), str(spk)))
+
+        self.cues = cues
+        self.starts = [c[0] for c in cues]
+        self.max_len = max((c[1] - c[0] for c in cues), default=0.0)
+        self.lanes = max(1, len(speaker_colors))
+        self.duration = max(self.duration, max((c[1] for c in cues), default=0.0))
+        self.tiles.clear()
+        self.update()
+
+    def set_playhead(self, sec, duration=None):
+        if duration:
+            self.duration = max(duration, self.cues[-1][1] if self.cues else 0.0)
+        old_x = int((self.playhead - self.view_start) * self.pps)
+        old_start = self.view_start
+        self.playhead = sec
+
+        # 재생 위치가 화면 밖으로 나가면 페이지 넘김
+        span = self.width() / self.pps
+        if sec < self.view_start or sec >= self.view_start + span:
+            self.view_start = max(0.0, sec - span * 0.1)
+
+        if self.view_start != old_start or int((sec - self.view_start) * self.pps) != old_x:
+            self.update()
+
+    # ---------------------------
+    def _cue_range(self, t0, t1):
+        # t0~t1 과 겹칠 수 있는 대사 인덱스 범위 (가장 긴 대사만큼 앞에서부터)
+        lo = bisect.bisect_left(self.starts, t0 - self.max_len)
+        hi = bisect.bisect_left(self.starts, t1)
+        return lo, hi
+
+    def _lane_rect_y(self, lane, h):
+        lane_h = (h - self.RULER_PX) / self.lanes
+        return self.RULER_PX + lane * lane_h, lane_h
+
+    def _tick_step(self):
+        for step in self.TICK_STEPS:
+            if step * self.pps >= 70:
+                return step
+        return self.TICK_STEPS[-1]
+
+    def _tile(self, i, h):
+        key = (self.zoom, i)
+        pix = self.tiles.get(key)
+        if pix is not None:
+            self.tiles.move_to_end(key)
+            return pix
+
+        dpr = self.devicePixelRatioF()
+        pix = QPixmap(int(self.TILE_PX * dpr), int(h * dpr))
+        pix.setDevicePixelRatio(dpr)
+        pix.fill(QColor("#1b1b1b"))
+
+        pps = self.pps
+        t0 = i * self.TILE_PX / pps
+        t1 = (i + 1) * self.TILE_PX / pps
+        painter = QPainter(pix)
+
+        # 시간 눈금
+        step = self._tick_step()
+        painter.setPen(QColor("#666666"))
+        k = int(t0 // step)
+        while k * step < t1:
+            x = (k * step - t0) * pps
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.RULER_PX))
+            sec = k * step
+            painter.drawText(QPointF(x + 3, self.RULER_PX - 4), f"{int(sec // 60):02d}:{sec % 60:04.1f}")
+            k += 1
+
+        # 대사 블록 (이 타일에 걸친 것만)
+        lo, hi = self._cue_range(t0, t1)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for start, end, lane, color, spk in self.cues[lo:hi]:
+            if end <= t0:
+                continue
+            y, lane_h = self._lane_rect_y(lane, h)
+            x = (start - t0) * pps
+            w = max(1.0, (end - start) * pps)
+            painter.fillRect(QRectF(x, y + 1, w, lane_h - 2), color)
+            if w > 40 and lane_h >= 12:
+                painter.setPen(QColor("white"))
+                painter.drawText(QRectF(x + 2, y, w - 4, lane_h), Qt.AlignmentFlag.AlignVCenter, spk)
+                painter.setPen(Qt.PenStyle.NoPen)
+        painter.end()
+
+        self.tiles[key] = pix
+        if len(self.tiles) > self.MAX_TILES:
+            self.tiles.popitem(last=False)
+        return pix
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        w, h = self.width(), self.height()
+        origin = self.view_start * self.pps
+        first = int(origin // self.TILE_PX)
+        last = int((origin + w) // self.TILE_PX)
+        for i in range(first, last + 1):
+            painter.drawPixmap(QPointF(i * self.TILE_PX - origin, 0), self._tile(i, h))
+
+        x = (self.playhead - self.view_start) * self.pps
+        painter.setPen(QPen(QColor("#ff3b30"), 2))
+        painter.drawLine(QPointF(x, 0), QPointF(x, h))
+
+    def resizeEvent(self, event):
+        if event.oldSize().height() != event.size().height():
+            self.tiles.clear()
+        super().resizeEvent(event)
+
+    # ---------------------------
+    def wheelEvent(self, event):
+        # 마우스 위치 기준 확대/축소
+        x = event.position().x()
+        anchor = self.view_start + x / self.pps
+        step = 1 if event.angleDelta().y() > 0 else -1
+        self.zoom = min(max(self.zoom + step, self.ZOOM_RANGE[0]), self.ZOOM_RANGE[1])
+        self.view_start = max(0.0, anchor - x / self.pps)
+        self.update()
+
+    def mousePressEvent(self, event):
+        self._press_x = event.position().x()
+        self._dragged = False
+
+    def mouseMoveEvent(self, event):
+        if self._press_x is None:
+            return
+        dx = event.position().x() - self._press_x
+        if not self._dragged and abs(dx) < 4:
+            return
+        self._dragged = True
+        self._press_x = event.position().x()
+        self.view_start = max(0.0, self.view_start - dx / self.pps)
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._press_x is not None and not self._dragged:
+            self.seek_requested.emit(self._hit(event.position()))
+        self._press_x = None
+
+    def _hit(self, pos):
+        # 블록을 누르면 그 대사 시작으로, 빈 곳이면 누른 시간으로
+        t = self.view_start + pos.x() / self.pps
+        lo, hi = self._cue_range(t, t + 1e-9)
+        for start, end, lane, _, _ in self.cues[lo:hi]:
+            y, lane_h = self._lane_rect_y(lane, self.height())
+            if start <= t < end and y <= pos.y() < y + lane_h:
+                return start
+        return max(0.0, t)
+
+
+# =============================================================
+# MEDIA BACKEND - VideoPlayer 아래의 재생 엔진 (VLC / 가상 시계)
+#   prepare(path) → media (작업 스레드 가능), attach(media, clock, window_id) (GUI 스레드)
+#   is_ready / has_media / is_playing / play / pause / set_time_ms / get_volume / set_volume
+#   위치는 PlaybackClock 에 이벤트로 알림 (틱마다 엔진에 묻지 않음)
+# =============================================================
+class VlcBackend:
+    name = "vlc"
+
+    def __init__(self):
+        # libvlc 는 창 표시 후 preload() 로 백그라운드 준비 (시작 시간 단축)
+        self.instance = None
+        self.player = None
+        self._lock = threading.Lock()
+
+    def preload(self):
+        threading.Thread(target=self._preload, name="VlcPreload", daemon=True).start()
+
+    def _preload(self):
+        try:
+            self._init()
+        except Exception as e:
+            print("VLC Preload Error:", e)
+
+    def _init(self):
+        with self._lock:
+            if self.instance is None:
+                t = time.perf_counter()
+                self.instance = vlc.Instance()
+                STARTUP.record_import("vlc.Instance()", time.perf_counter() - t)
+                STARTUP.mark("VLC 준비 완료")
+
+    def prepare(self, path):
+        self._init()
+        return self.instance.media_new(path)
+
+    def attach(self, media, clock, window_id):
+        # 백그라운드 준비가 끝나지 않았으면 여기서 대기/생성
+        self._init()
+        if self.player is None:
+            self.player = self.instance.media_player_new()
+            clock.attach_vlc(self.player)
+        clock.reset()
+        self.player.set_media(media)
+        clock.changed.emit()
+
+        if sys.platform == "win32":
+            self.player.set_hwnd(window_id)
+        else:
+            self.player.set_xwindow(window_id)
+
+    def is_ready(self):
+        return self.player is not None
+
+    def has_media(self):
+        return self.player is not None and bool(self.player.get_media())
+
+    def is_playing(self):
+        return self.player is not None and self.player.is_playing()
+
+    def play(self):
+        self.player.play()
+
+    def pause(self):
+        self.player.pause()
+
+    def set_time_ms(self, ms):
+        self.player.set_time(int(ms))
+
+    def get_volume(self):
+        return self.player.audio_get_volume()
+
+    def set_volume(self, volume):
+        self.player.audio_set_volume(volume)
+
+
+class SimulatedBackend:
+    # 영상 없이 대본 싱크만 재생 (가상 시계)
+    #   rate > 0 : 실제 시간의 rate 배속 (최대 MAX_RATE, QTimer 재생 경로 그대로)
+    #   rate = 0 : step() 으로만 진행 (결정적, 벽시계 무관)
+    name = "simulated"
+    MAX_RATE = 100.0
+
+    def __init__(self, length_sec, rate=1.0):
+        self.length_ms = max(0, int(round(length_sec * 1000))) # VLC 처럼 정수 ms
+        self.rate = min(max(0.0, rate), self.MAX_RATE)
+        self.clock = None
+        self.playing = False
+        self.pos_ms = 0.0
+        self.mono0 = time.monotonic()
+        self.volume = 100
+        self.end_timer = None
+
+    def preload(self):
+        pass
+
+    def prepare(self, path):
+        return path
+
+    def attach(self, media, clock, window_id):
+        self.clock = clock
+        self.playing = False
+        self.pos_ms = 0.0
+        if self.end_timer is None:
+            self.end_timer = QTimer()
+            self.end_timer.setSingleShot(True)
+            self.end_timer.timeout.connect(self._reach_end)
+        clock.reset()
+        clock.rate = self.rate
+        clock.on_length(self.length_ms)
+
+    def is_ready(self):
+        return self.clock is not None
+
+    def has_media(self):
+        return self.clock is not None
+
+    def is_playing(self):
+        return self.playing
+
+    def position_ms(self):
+        if not self.playing:
+            return self.pos_ms
+        return min(self.length_ms, self.pos_ms + (time.monotonic() - self.mono0) * 1000 * self.rate)
+
+    def _rebase(self, ms):
+        self.pos_ms = min(max(0.0, ms), self.length_ms)
+        self.mono0 = time.monotonic()
+        if self.playing and self.rate > 0:
+            self.end_timer.start(max(0, int((self.length_ms - self.pos_ms) / self.rate)))
+
+    def play(self):
+        if self.playing or self.pos_ms >= self.length_ms:
+            return
+        self.playing = True
+        self._rebase(self.pos_ms)
+        self.clock.on_playing(self.pos_ms)
+
+    def pause(self):
+        if not self.playing:
+            return
+        pos = self.position_ms()
+        self.playing = False
+        self.end_timer.stop()
+        self._rebase(pos)
+        self.clock.on_paused(self.pos_ms)
+
+    def _reach_end(self):
+        self.playing = False
+        self._rebase(self.length_ms)
+        self.clock.on_paused(self.length_ms)
+
+    def set_time_ms(self, ms):
+        self._rebase(ms)
+        # VLC 처럼 위치 보고는 이벤트로 (탐색 지연 계측 경로 동일)
+        QTimer.singleShot(0, lambda pos=self.pos_ms: self.clock.on_time(pos))
+
+    def step(self, sec):
+        # 결정적 진행: 가상 위치만 옮기고 시계 기준점을 맞춤 (changed 시그널 없음 → 호출자가 틱)
+        self._rebase(self.position_ms() + sec * 1000)
+        self.clock._anchor(self.pos_ms)
+        if self.pos_ms >= self.length_ms and self.playing:
+            self._reach_end()
+
+    def get_volume(self):
+        return self.volume
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+# =============================================================
+# Video Player (재생 엔진은 MEDIA BACKEND)
+# =============================================================
+class VideoPlayer(QWidget):
+    def __init__(self, parent=None, backend=None):
+        super().__init__(parent)
 
-        self.instance = vlc.Instance()
-        self.media_player = self.instance.media_player_new()
+        self.vlc_backend = VlcBackend()
+        self.backend = backend or self.vlc_backend
+
+        # 재생 위치는 VLC 이벤트 기반 시계에서 읽음 (틱마다 ctypes 호출 안 함)
+        self.clock = PlaybackClock(self)
 
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -97,6 +1457,11 @@ class VideoPlayer(QWidget):
         self.video_frame.setStyleSheet("background:black;")
         layout.addWidget(self.video_frame)
 
+        # 대사 타임라인 (블록 클릭 → 해당 대사로 이동)
+        self.timeline = TimelineView()
+        self.timeline.seek_requested.connect(self.set_time_sec)
+        layout.addWidget(self.timeline)
+
         # Seek bar
         self.slider = QSlider(Qt.Orientation.Horizontal)
         self.slider.setRange(0, 1000)
@@ -171,9 +1536,19 @@ class VideoPlayer(QWidget):
         self.btn_rec_start = QPushButton("🎙 녹음 시작")
         self.btn_rec_stop = QPushButton("⏹ 녹음 종료")
         self.btn_rec_play = QPushButton("🎧 녹음 듣기")
+        self.btn_waveform = QPushButton("〰 파형 보기")
+        self.btn_punch = QPushButton("🎯 펀치인 (R)")
+        self.spin_preroll = QDoubleSpinBox()
+        self.spin_preroll.setRange(0.0, 10.0)
+        self.spin_preroll.setSingleStep(0.5)
+        self.spin_preroll.setValue(2.0)
+        self.spin_preroll.setSuffix("초 프리롤")
+        rec.addWidget(self.btn_punch)
+        rec.addWidget(self.spin_preroll)
         rec.addWidget(self.btn_rec_start)
         rec.addWidget(self.btn_rec_stop)
         rec.addWidget(self.btn_rec_play)
+        rec.addWidget(self.btn_waveform)
         layout.addLayout(rec)
 
         self.dragging = False
@@ -181,6 +1556,7 @@ class VideoPlayer(QWidget):
     # ---------------------------
     def format_time(self, ms):
         if ms < 0: return "00:00:00.000"
+        ms = int(ms)
         seconds = ms // 1000
         milliseconds = ms % 1000
         h = seconds // 3600
@@ -188,42 +1564,65 @@ class VideoPlayer(QWidget):
         s = seconds % 60
         return f"{h:02}:{m:02}:{s:02}.{milliseconds:03}"
     
+    def preload_backend(self):
+        self.backend.preload()
+
+    def set_backend(self, backend):
+        # 엔진 교체 (예: 가상 시계 ↔ VLC). 이전 엔진은 멈춰 두어 시계에 이벤트가 섞이지 않게
+        if backend is self.backend:
+            return
+        if self.backend.is_playing():
+            self.backend.pause()
+        self.backend = backend
+
+    def is_ready(self):
+        return self.backend.is_ready()
+
+    def is_playing(self):
+        return self.backend.is_playing()
+
+    def prepare_media(self, path):
+        # 작업 스레드에서 호출 가능 (libvlc 초기화 + 미디어 생성)
+        return self.backend.prepare(path)
+
     def load_video(self, path):
-        media = self.instance.media_new(path)
-        self.media_player.set_media(media)
+        self.attach_media(self.prepare_media(path))
 
-        if sys.platform == "win32":
-            self.media_player.set_hwnd(self.video_frame.winId())
-        else:
-            self.media_player.set_xwindow(self.video_frame.winId())
+    def attach_media(self, media):
+        # GUI 스레드에서 호출
+        self.backend.attach(media, self.clock, self.video_frame.winId())
 
     def toggle_play(self):
-        # VLC의 is_playing() 상태에 따라 토글
-        if self.media_player.is_playing():
-            self.media_player.pause()
+        if not self.backend.is_ready():
+            return
+        # 엔진의 재생 상태에 따라 토글
+        if self.backend.is_playing():
+            self.backend.pause()
         else:
-            self.media_player.play()
+            self.backend.play()
 
     def stop(self):
-        self.media_player.pause()
+        if not self.backend.is_ready():
+            return
+        self.backend.pause()
 
     def get_time_sec(self):
-        return max(0, self.media_player.get_time() / 1000)
+        return max(0, self.clock.now_ms() / 1000)
 
     def set_time_sec(self, sec):
+        if not self.backend.is_ready():
+            return
         # 영상의 최대 길이 초과 방지
-        total_sec = self.media_player.get_length() / 1000
+        total_sec = self.clock.length_ms / 1000
         if sec < 0:
             sec = 0
         elif sec > total_sec:
             sec = total_sec
-            
-        self.media_player.set_time(int(sec * 1000))
-        
-        # 타임라인 이동 후 강제 업데이트 요청 (AttributeError 해결)
-        parent_widget = self.parent()
-        if hasattr(parent_widget, 'update_by_time'):
-            parent_widget.update_by_time() 
+
+        self.backend.set_time_ms(sec * 1000)
+
+        # 시계에 바로 반영 → changed 시그널로 화면 갱신
+        self.clock.seek(sec * 1000)
 
 
     def manual_seek(self):
@@ -235,7 +1634,7 @@ class VideoPlayer(QWidget):
             total_seconds = h * 3600 + m * 60 + s
             
             # 이동 전에 일시정지 (컨트롤 개선)
-            if self.media_player.is_playing():
+            if self.is_playing():
                 self.stop()
                 
             self.set_time_sec(total_seconds)
@@ -249,17 +1648,19 @@ class VideoPlayer(QWidget):
 
     def finish_drag(self):
         self.dragging = False
-        total = self.media_player.get_length() / 1000
+        if not self.backend.is_ready():
+            return
+        total = self.clock.length_ms / 1000
         if total > 0:
             pos = self.slider.value() / 1000
             self.set_time_sec(total * pos)
 
     def update_time_on_drag(self):
-        if not self.media_player.get_media():
+        if not self.backend.has_media():
             return
             
         slider_value = self.slider.value()
-        length_ms = self.media_player.get_length()
+        length_ms = self.clock.length_ms
         
         if length_ms <= 0:
             return
@@ -273,17 +1674,18 @@ class VideoPlayer(QWidget):
 
     def update_slider(self):
         # 드래그 중에는 타이머에 의한 업데이트를 건너뛰어 성능을 확보
-        if self.dragging:
+        if self.dragging or not self.backend.is_ready():
             return
             
-        length = self.media_player.get_length()
-        cur = self.media_player.get_time()
-        
+        length = self.clock.length_ms
+        cur = int(self.clock.now_ms())
+
         # 시간 레이블 업데이트 (총 시간은 타이머를 통해 업데이트)
         current_time_str = self.format_time(cur)
         total_time_str = self.format_time(length)
         self.lbl_cur_time.setText(current_time_str)
         self.lbl_total_time.setText(total_time_str)
+        self.timeline.set_playhead(cur / 1000, length / 1000)
         
         if length <= 0:
             return
@@ -293,81 +1695,1937 @@ class VideoPlayer(QWidget):
 
 
 # =============================================================
-# Main Tool
+# SCRIPT LOADING - 엑셀 대본 파싱 (GUI 와 무관한 순수 함수)
 # =============================================================
-class KingnuTool(QMainWindow):
-    def __init__(self):
-        super().__init__()
+class ScriptFormatError(ValueError):
+    pass
 
-        self.setWindowTitle("킹누 더빙툴 — FINAL 2025")
-        self.resize(1500, 900)
 
-        # ---------------- QSS (스타일 시트) 적용 ----------------
-        self.setStyleSheet(self._get_qss_style())
+SCRIPT_COLUMN_RENAME = {
+    " 시작": "시작", "시작 ": "시작",
+    " 끝": "끝", "끝 ": "끝",
+    " 화자": "화자", "화자 ": "화자",
+    " 대사": "대사", "대사 ": "대사",
+}
+SCRIPT_REQUIRED_COLUMNS = ["시작", "화자", "대사"]
 
-        self.rec = Recorder()
-        self.dialogues_full = []
-        self.dialogues_primary = [] 
-        self.speaker_colors = {}
-        self.mode = "primary" # '실전 모드' 유지
 
-        # ---------------- Layout ----------------
-        central = QWidget()
-        self.setCentralWidget(central)
-        main = QHBoxLayout()
-        central.setLayout(main)
+def to_sec(t):
+    try:
+        if isinstance(t, (float, int)):
+            return float(t)
+
+        parts = str(t).split(":")
+        if len(parts) == 3:
+            h, m, s = parts
+            return int(h)*3600 + int(m)*60 + float(s)
+        elif len(parts) == 2:
+            m, s = parts
+            return int(m)*60 + float(s)
+        else:
+            return 0.0
+    except:
+        return 0.0
+
+
+def build_primary(full): # 화자가 바뀌는 시점의 대사만
+    result = []
+    prev = None
+    for r in full:
+        if r["화자"] != prev:
+            result.append(r)
+            prev = r["화자"]
+    return result
+
+
+SPEAKER_PALETTE = [
+    "#FF6B6B","#4ECDC4","#45B7D1","#FFA600",
+    "#6A4C93","#1982C4","#8E5572","#9BC53D",
+    "#F94144","#577590","#D8572A"
+]
+
+
+def build_speaker_colors(full):
+    i = 0
+    colors = {}
+    for r in full:
+        s = r["화자"]
+        if s not in colors:
+            colors[s] = SPEAKER_PALETTE[i % len(SPEAKER_PALETTE)]
+            i += 1
+    return colors
+
+
+def _plain_value(v):
+    # 캐시를 pandas 없이 읽을 수 있도록 기본 타입으로 변환
+    if v is None or type(v) in (str, bool, int, float):
+        return v
+    if type(v).__name__ == "NaTType":
+        return None
+    if hasattr(v, "to_pydatetime"): # pandas.Timestamp
+        return v.to_pydatetime()
+    if isinstance(v, (datetime.datetime, datetime.date, datetime.time, datetime.timedelta)):
+        return v
+    if hasattr(v, "item"): # numpy 스칼라
+        return v.item()
+    return str(v)
+
+
+def read_script_excel(path, sort=True):
+    df = pd.read_excel(path)
+    df.rename(columns=SCRIPT_COLUMN_RENAME, inplace=True)
+
+    if not all(x in df.columns for x in SCRIPT_REQUIRED_COLUMNS):
+        raise ScriptFormatError("필수 컬럼(시작, 화자, 대사)이 없습니다.")
+
+    df["시작_초"] = df["시작"].apply(to_sec)
+    if sort:
+        df = df.sort_values(by="시작_초")
+
+    columns = [str(c) for c in df.columns]
+    full = [
+        dict(zip(columns, map(_plain_value, values)))
+        for values in df.itertuples(index=False, name=None)
+    ]
+    return full
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def app_data_dir():
+    # 앱 내부 데이터 (캐시, 장치 프로필 등)
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    folder = os.path.join(base, "KingnuDubbingTool")
+    os.makedirs(folder, exist_ok=True)
+    return folder
 
-        # --------------------------------------------------------
-        # LEFT PANEL (연습 모드 버튼 삭제 및 전체 대사 보기 버튼 추가)
-        # --------------------------------------------------------
-        left = QVBoxLayout()
-        
-        # 전체 대사 보기 버튼 (새 기능)
-        self.btn_show_all = QPushButton("📋 전체 대사 보기 (더블클릭 이동)")
-        self.btn_show_all.clicked.connect(self.show_all_dialogues_dialog)
-        left.addWidget(self.btn_show_all)
 
-        # 현재 화자 그룹
-        group_current = QGroupBox("현재 대사")
-        group_current_layout = QVBoxLayout(group_current)
-        
-        self.lbl_current = QLabel("-")
-        self.lbl_current.setObjectName("CurrentSpeakerLabel")
-        group_current_layout.addWidget(self.lbl_current)
-        
-        left.addWidget(group_current)
+# =============================================================
+# SCRIPT CACHE - 파싱된 대본 디스크 캐시 (경로/크기/수정시각/내용 해시)
+# =============================================================
+class ScriptCache:
+    MAGIC = b"KNSC"
+    VERSION = 1                        # 파싱 방식이 바뀌면 올려서 기존 캐시 무효화
+    MAX_BYTES = 64 * 1024 * 1024       # 총 용량 초과 시 오래 안 쓴 항목부터 삭제
+
+    def __init__(self, folder=None):
+        self.folder = folder or os.path.join(app_data_dir(), "script_cache")
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _entry_path(self, path):
+        key = os.path.normcase(os.path.abspath(path)).encode("utf-8")
+        return os.path.join(self.folder, hashlib.sha1(key).hexdigest() + ".kcache")
+
+    def _file_key(self, path):
+        st = os.stat(path)
+        return {
+            "version": self.VERSION,
+            "path": os.path.abspath(path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": file_digest(path),
+        }
+
+    def load(self, path):
+        # 캐시 적중 시 (full, primary), 아니면 None
+        entry = self._entry_path(path)
+        try:
+            with open(entry, "rb") as f:
+                if f.read(4) != self.MAGIC:
+                    return None
+                header_len = int.from_bytes(f.read(4), "little")
+                header = json.loads(f.read(header_len).decode("utf-8"))
+
+                st = os.stat(path)
+                if (header.get("version") != self.VERSION
+                        or header.get("size") != st.st_size
+                        or header.get("mtime_ns") != st.st_mtime_ns
+                        or header.get("hash") != file_digest(path)):
+                    return None
+
+                columns, rows, primary_idx = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print("Script Cache Error:", e)
+            self._remove(entry)
+            return None
 
+        os.utime(entry) # 최근 사용 표시 (용량 정리 순서)
+        full = [dict(zip(columns, r)) for r in rows]
+        primary = [full[i] for i in primary_idx]
+        return full, primary
 
-        # 다음 화자 그룹 (강조)
-        group_next = QGroupBox("다음 대사 준비")
-        group_next_layout = QVBoxLayout(group_next)
-        
-        self.lbl_next = QLabel("-")
-        self.lbl_next.setObjectName("NextSpeakerLabel")
-        group_next_layout.addWidget(self.lbl_next)
-        
-        self.lbl_count = QLabel("(다음화자) 준비 -")
-        self.lbl_count.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_count.setObjectName("CountdownLabel")
-        group_next_layout.addWidget(self.lbl_count)
-        
-        left.addWidget(group_next)
+    def store(self, path, full, primary):
+        try:
+            header = json.dumps(self._file_key(path)).encode("utf-8")
+            columns = list(full[0].keys()) if full else []
+            rows = [tuple(r.get(c) for c in columns) for r in full]
+            index_of = {id(r): i for i, r in enumerate(full)}
+            primary_idx = [index_of[id(r)] for r in primary]
+            payload = zlib.compress(pickle.dumps((columns, rows, primary_idx), pickle.HIGHEST_PROTOCOL), 1)
+
+            entry = self._entry_path(path)
+            tmp = entry + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.MAGIC)
+                f.write(len(header).to_bytes(4, "little"))
+                f.write(header)
+                f.write(payload)
+            os.replace(tmp, entry)
+        except Exception as e:
+            print("Script Cache Error:", e)
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.folder):
+            p = os.path.join(self.folder, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
 
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.MAX_BYTES:
+                break
+            self._remove(p)
+            total -= size
 
-        # 다다음 화자 그룹
-        group_next2 = QGroupBox("다다음 대사")
-        group_next2_layout = QVBoxLayout(group_next2)
-        
-        self.lbl_next2 = QLabel("-")
-        self.lbl_next2.setObjectName("Next2SpeakerLabel")
-        group_next2_layout.addWidget(self.lbl_next2)
-        
-        left.addWidget(group_next2)
+    @staticmethod
+    def _remove(p):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
 
-        left.addStretch()
 
-        # --------------------------------------------------------
-        # RIGHT PANEL
+def _no_report(percent, text=""):
+    pass
+
+
+def load_script(path, cache=None, report=_no_report):
+    # 캐시 적중 시 openpyxl/pandas 를 전혀 거치지 않음
+    if cache is not None:
+        report(5, "캐시 확인 중")
+        hit = cache.load(path)
+        if hit is not None:
+            return hit
+
+    report(10, "엑셀 읽는 중")
+    full = read_script_excel(path)
+    report(60, "정리 중")
+    primary = build_primary(full)
+    if cache is not None:
+        report(70, "캐시 저장 중")
+        cache.store(path, full, primary)
+    return full, primary
+
+
+# =============================================================
+# SRT - 줄 단위 스트리밍 파서 (BOM/CRLF/CP949 대응) + 쓰기 전용 엑셀 출력
+# =============================================================
+SRT_TIMING_RE = re.compile(r"^\s*(\S+)\s*-->\s*(\S+)")
+HTML_TAG_RE = re.compile(r"<[^>]*>")
+SCRIPT_SHEET_COLUMNS = ["시작", "끝", "화자", "대사", "감정", "톤"]
+
+
+def strip_html(text):
+    return HTML_TAG_RE.sub("", text)
+
+
+def detect_text_encoding(path, sample_bytes=1 << 16, scan_limit=8 << 20):
+    # scan_limit: 순수 ASCII 가 이어지면 이만큼만 읽고 UTF-8 로 판단 (큰 영어 자막을 끝까지 읽지 않음)
+    with open(path, "rb") as f:
+        head = f.read(4)
+        if head.startswith(b"\xef\xbb\xbf"):
+            return "utf-8-sig"
+        if head.startswith(b"\xff\xfe") or head.startswith(b"\xfe\xff"):
+            return "utf-16"
+
+        # ASCII 이외 문자가 충분히 나올 때까지 UTF-8 로 점진 디코딩, 실패하면 CP949 (EUC-KR 상위 호환)
+        f.seek(0)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        non_ascii = 0
+        scanned = 0
+        while non_ascii < sample_bytes and scanned < scan_limit:
+            chunk = f.read(min(1 << 20, scan_limit - scanned))
+            if not chunk:
+                break
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                return "cp949"
+            non_ascii += len(chunk.translate(None, bytes(range(128)))) # ASCII 를 지운 나머지 = 비 ASCII 바이트
+            scanned += len(chunk)
+    return "utf-8"
+
+
+def iter_srt_cues(path, report=_no_report):
+    # (시작, 끝, 대사) 를 한 줄씩 읽으며 생성
+    # 숫자만 있는 줄은 바로 다음 줄이 타이밍일 때만 큐 번호로 취급 (숫자 대사 보존)
+    encoding = detect_text_encoding(path)
+    total = max(1, os.path.getsize(path))
+    consumed = 0
+
+    start = end = None
+    texts = []
+    pending_digits = None
+
+    with open(path, encoding=encoding, errors="replace") as f:
+        for line_no, raw in enumerate(f):
+            consumed += len(raw)
+            if line_no % 20000 == 0:
+                report(min(95, 95 * consumed // total), "SRT 변환 중")
+
+            line = raw.strip().lstrip("\ufeff") # 이어 붙인 SRT 중간의 BOM
+
+            m = SRT_TIMING_RE.match(line) if "-->" in line else None
+            if m:
+                # 새 큐 시작: 앞의 숫자 줄은 큐 번호였음
+                if start is not None and texts:
+                    yield start, end, " ".join(texts)
+                start = m.group(1).replace(",", ".")
+                end = m.group(2).replace(",", ".")
+                texts = []
+                pending_digits = None
+                continue
+
+            if pending_digits is not None:
+                # 타이밍이 뒤따르지 않았으므로 숫자 대사
+                if start is not None:
+                    texts.append(pending_digits)
+                pending_digits = None
+
+            if line.isdigit():
+                pending_digits = line
+            elif line and start is not None:
+                texts.append(strip_html(line))
+
+    if pending_digits is not None and start is not None:
+        texts.append(pending_digits)
+    if start is not None and texts:
+        yield start, end, " ".join(texts)
+
+
+class XlsxStreamWriter:
+    # 최소 쓰기 전용 XLSX: 행을 시트 XML 로 바로 압축 기록 (메모리 일정, 문자열 셀만)
+    XML_ILLEGAL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+    PARTS = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        ),
+    }
+
+    def __init__(self, path):
+        self.zf = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        for name, xml in self.PARTS.items():
+            self.zf.writestr(name, xml)
+
+        self.sheet = io.TextIOWrapper(self.zf.open("xl/worksheets/sheet1.xml", "w"), encoding="utf-8")
+        self.sheet.write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self.rows = 0
+
+    def append(self, values):
+        self.rows += 1
+        r = self.rows
+        cells = []
+        for col, value in enumerate(values):
+            if value is None or value == "":
+                continue
+            text = xml_escape(self.XML_ILLEGAL_RE.sub("", str(value)))
+            cells.append(
+                f'<c r="{chr(65 + col)}{r}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+            )
+        self.sheet.write(f'<row r="{r}">{"".join(cells)}</row>')
+
+    def close(self):
+        self.sheet.write("</sheetData></worksheet>")
+        self.sheet.close()
+        self.zf.close()
+
+
+def write_script_xlsx(save, rows):
+    # 행을 하나씩 바로 파일로 흘려보냄 (DataFrame 을 만들지 않음)
+    writer = XlsxStreamWriter(save)
+    count = 0
+    try:
+        writer.append(SCRIPT_SHEET_COLUMNS)
+        for row in rows:
+            writer.append(row)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def convert_srt_to_excel(path, save, report=_no_report):
+    report(0, "SRT 읽는 중")
+    rows = ([start, end, "", text, "", ""] for start, end, text in iter_srt_cues(path, report))
+    count = write_script_xlsx(save, rows)
+    report(100, "완료")
+    return count
+
+
+# =============================================================
+# CUE INDEX - 시작 시간 정렬 배열 + 재생 커서
+# =============================================================
+class CueIndex:
+    def __init__(self, full, primary):
+        # load_excel 에서 한 번만 생성 (시작_초 기준 정렬된 리스트)
+        self.full_starts = self._sorted_starts(full)
+        self.primary_starts = self._sorted_starts(primary)
+        self.cursor_full = -1
+        self.cursor_primary = -1
+
+    def locate(self, now):
+        # now 시점의 (full 인덱스, primary 인덱스) 반환. 시작 전이면 -1
+        self.cursor_full = self._advance(self.full_starts, self.cursor_full, now)
+        self.cursor_primary = self._advance(self.primary_starts, self.cursor_primary, now)
+        return self.cursor_full, self.cursor_primary
+
+    @staticmethod
+    def _sorted_starts(rows):
+        # 시작 셀이 비어 NaN 인 행은 정렬 시 맨 뒤로 가며, 기존 순차 탐색처럼 도달하지 않는 것으로 취급
+        starts = []
+        for r in rows:
+            t = r["시작_초"]
+            if t != t:
+                break
+            starts.append(t)
+        return starts
+
+    @staticmethod
+    def _advance(starts, cursor, now):
+        n = len(starts)
+
+        # 일반 재생: 커서가 그대로이거나 한 칸만 전진 → O(1)
+        if cursor == -1 or (cursor < n and starts[cursor] <= now):
+            if cursor + 1 >= n or now < starts[cursor + 1]:
+                return cursor
+            if cursor + 2 >= n or now < starts[cursor + 2]:
+                return cursor + 1
+
+        # 탐색(seek) 직후: 이진 탐색으로 재위치
+        return bisect.bisect_right(starts, now) - 1
+
+
+# =============================================================
+# LABEL RENDERER - 대사/화자가 바뀔 때만 위젯 갱신
+# =============================================================
+class LabelRenderer:
+    # 라벨별 배경 스타일 템플릿 (setStyleSheet 는 화자가 바뀔 때만 호출)
+    STYLE_TEMPLATES = {
+        "CurrentSpeakerLabel": "background:{color}; font-size:20px; font-weight:bold; padding:15px; border-radius:6px;",
+        "Next2SpeakerLabel": "background:{color}; font-size:16px; font-weight:normal; padding:10px; border-radius:6px;",
+    }
+    NO_SPEAKER_COLOR = "#3a3a3a"
+    UNKNOWN_SPEAKER_COLOR = "#555555"
+
+    _UNSET = object()
+
+    def __init__(self):
+        self.keys = {}      # label -> 마지막으로 그린 대사 키
+        self.speakers = {}  # label -> 마지막으로 적용한 화자
+        self.styles = {}    # objectName -> {화자: 스타일 문자열}
+        self.set_palette({})
+
+    def set_palette(self, speaker_colors):
+        # 화자별 스타일 문자열을 미리 만들어 둠 (assign_colors 시점에 한 번)
+        self.styles = {}
+        for name, tpl in self.STYLE_TEMPLATES.items():
+            table = {None: tpl.format(color=self.NO_SPEAKER_COLOR)}
+            for spk, color in speaker_colors.items():
+                table[spk] = tpl.format(color=color)
+            self.styles[name] = table
+        self.reset()
+
+    def reset(self):
+        # 새 스크립트 로드 시 다음 틱에서 전부 다시 그리도록 초기화
+        self.keys.clear()
+        self.speakers.clear()
+
+    def changed(self, label, key):
+        if self.keys.get(label, self._UNSET) == key:
+            return False
+        self.keys[label] = key
+        return True
+
+    def set_text(self, label, text):
+        if self.changed(label, text):
+            label.setText(text)
+
+    def set_speaker(self, label, spk):
+        prev = self.speakers.get(label, self._UNSET)
+        if prev is spk or prev == spk:
+            return
+        self.speakers[label] = spk
+
+        table = self.styles.get(label.objectName())
+        if table is None:
+            return
+        style = table.get(spk)
+        if style is None:
+            style = self.STYLE_TEMPLATES[label.objectName()].format(color=self.UNKNOWN_SPEAKER_COLOR)
+            table[spk] = style
+        label.setStyleSheet(style)
+
+
+# =============================================================
+# DIALOGUE SEARCH INDEX - 대사/감정/톤 바이그램 색인 (한글 음절 단위)
+# =============================================================
+class DialogueSearchIndex:
+    FIELDS = ("대사", "감정", "톤")
+    FIELD_SEP = "\n" # normalize 가 지우는 공백 문자라 검색어에는 나오지 않음
+
+    def __init__(self, rows, report=_no_report):
+        # 대본 로드 시 한 번만 생성
+        self.texts = []
+        self.unigrams = {}  # 글자 → 행 집합 (한 글자 검색용)
+        self.bigrams = {}   # 두 글자 → 행 집합
+
+        n = len(rows)
+        for i, row in enumerate(rows):
+            if i % 2000 == 0:
+                report(80 + 15 * i // max(1, n), "검색 색인 생성 중")
+            # 필드마다 따로 정규화 후 줄바꿈으로 연결 (검색어는 공백이 없어 필드 경계를 넘는 일치 없음)
+            text = self.FIELD_SEP.join(
+                self.normalize(str(row[f])) for f in self.FIELDS
+                if row.get(f) is not None and row.get(f) == row.get(f) # None/NaN 제외
+            )
+            self.texts.append(text)
+
+            for ch in set(text):
+                self.unigrams.setdefault(ch, set()).add(i)
+            for bg in {text[k:k + 2] for k in range(len(text) - 1)}:
+                self.bigrams.setdefault(bg, set()).add(i)
+
+    @staticmethod
+    def normalize(text):
+        # 대소문자/띄어쓰기 차이는 무시
+        return "".join(text.lower().split())
+
+    def search(self, query):
+        # 일치하는 행 번호 집합, 검색어가 비어 있으면 None (필터 없음)
+        q = self.normalize(query)
+        if not q:
+            return None
+        if len(q) == 1:
+            return self.unigrams.get(q, set())
+
+        # 가장 짧은 목록부터 교집합 → 후보만 부분 문자열 확인
+        postings = []
+        for bg in {q[k:k + 2] for k in range(len(q) - 1)}:
+            rows = self.bigrams.get(bg)
+            if not rows:
+                return set()
+            postings.append(rows)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for rows in postings[1:]:
+            candidates = candidates & rows
+            if not candidates:
+                return set()
+
+        if len(q) == 2:
+            return candidates
+        texts = self.texts
+        return {i for i in candidates if q in texts[i]}
+
+
+# =============================================================
+# SCRIPT BUNDLE - 백그라운드에서 만든 뒤 GUI 스레드에서 한 번에 교체
+# =============================================================
+class ScriptBundle:
+    def __init__(self, path, full, primary, report=_no_report):
+        self.path = path
+        self.full = full
+        self.primary = primary
+        report(80, "색인 생성 중")
+        self.cue_index = CueIndex(full, primary)
+        self.search_index = DialogueSearchIndex(full, report)
+        self.speaker_colors = build_speaker_colors(full)
+
+
+def load_script_bundle(path, cache=None, report=_no_report):
+    full, primary = load_script(path, cache, report)
+    return ScriptBundle(path, full, primary, report)
+
+
+# =============================================================
+# DIALOGUE BROWSER MODEL - 전체 대사 목록 (보이는 행만 그림)
+# =============================================================
+class DialogueTableModel(QAbstractTableModel):
+    def __init__(self, rows, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        self.columns = list(rows[0].keys()) if rows else []
+        self.speakers = [r.get("화자") for r in rows]
+
+        # 화자 필터용 행 집합
+        self.speaker_rows = {}
+        for i, spk in enumerate(self.speakers):
+            self.speaker_rows.setdefault(spk, set()).add(i)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+
+        col_name = self.columns[index.column()]
+        value = self.rows[index.row()].get(col_name)
+
+        # 시작_초 컬럼도 출력
+        if col_name == "시작_초":
+            return f"{value:.3f}초" if value is not None else ""
+        elif value is None:
+            return ""
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section]
+        return str(section + 1)
+
+
+class DialogueFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.speaker = None      # None = 전체보기
+        self.search_rows = None  # None = 검색어 없음
+        self.accepted = None     # 화자 ∩ 검색 결과 (None = 전체)
+
+    def set_speaker(self, speaker):
+        # 테이블을 다시 만들지 않고 필터만 재적용
+        self.speaker = speaker
+        self._refilter()
+
+    def set_search_rows(self, rows):
+        self.search_rows = rows
+        self._refilter()
+
+    def _refilter(self):
+        accepted = None
+        if self.speaker is not None:
+            accepted = self.sourceModel().speaker_rows.get(self.speaker, set())
+        if self.search_rows is not None:
+            accepted = self.search_rows if accepted is None else accepted & self.search_rows
+        self.accepted = accepted
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.accepted is None or source_row in self.accepted
+
+
+# =============================================================
+# WAVEFORM PEAKS - 다중 해상도 min/max/RMS 피라미드 + 디스크 캐시
+# =============================================================
+def peaks_dir():
+    # 녹음 폴더 옆 (KingnuDubbingTool_Peaks)
+    folder = os.path.join(os.path.dirname(recordings_dir()), "KingnuDubbingTool_Peaks")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+class PeakPyramid:
+    BASE = 256          # 0 레벨 한 칸의 샘플 수
+    FACTOR = 4          # 레벨이 올라갈 때마다 묶는 칸 수
+    MIN_BUCKETS = 512   # 이보다 짧아지면 더 거친 레벨은 만들지 않음
+    READ_BLOCK = BASE * 4096
+
+    def __init__(self, sample_rate, frames, levels):
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.levels = levels # [레벨] → (칸 수, 3) float32 배열 [min, max, rms]
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def bucket_size(self, level):
+        return self.BASE * self.FACTOR ** level
+
+    def level_for(self, samples_per_pixel):
+        # 한 칸이 한 픽셀보다 작은 레벨 중 가장 거친 것
+        level = 0
+        while level + 1 < len(self.levels) and self.bucket_size(level + 1) <= samples_per_pixel:
+            level += 1
+        return level
+
+    @classmethod
+    def build(cls, path, report=_no_report):
+        parts = []
+        with sf.SoundFile(path) as f:
+            sr, frames = f.samplerate, f.frames
+            done = 0
+            for block in f.blocks(blocksize=cls.READ_BLOCK, dtype="float32", always_2d=True):
+                mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+                parts.append(cls._reduce_samples(mono))
+                done += len(block)
+                report(95 * done // max(1, frames), "파형 계산 중")
+
+        levels = [np.concatenate(parts) if parts else np.zeros((0, 3), dtype=np.float32)]
+        while len(levels[-1]) > cls.MIN_BUCKETS:
+            levels.append(cls._reduce_level(levels[-1]))
+        return cls(sr, frames, levels)
+
+    @classmethod
+    def _reduce_samples(cls, x):
+        # 읽기 블록은 BASE 의 배수이므로 마지막 블록만 자투리 칸이 생김
+        full = len(x) // cls.BASE * cls.BASE
+        out = []
+        if full:
+            b = x[:full].reshape(-1, cls.BASE)
+            out.append(np.stack([b.min(axis=1), b.max(axis=1), np.sqrt((b * b).mean(axis=1))], axis=1))
+        if full < len(x):
+            t = x[full:]
+            out.append(np.array([[t.min(), t.max(), np.sqrt((t * t).mean())]]))
+        return np.concatenate(out).astype(np.float32)
+
+    @classmethod
+    def _reduce_level(cls, lv):
+        pad = (-len(lv)) % cls.FACTOR
+        if pad:
+            lv = np.concatenate([lv, np.repeat(lv[-1:], pad, axis=0)])
+        g = lv.reshape(-1, cls.FACTOR, 3)
+        return np.stack([
+            g[:, :, 0].min(axis=1),
+            g[:, :, 1].max(axis=1),
+            np.sqrt((g[:, :, 2] ** 2).mean(axis=1)),
+        ], axis=1).astype(np.float32)
+
+    def save(self, path):
+        arrays = {f"level{i}": lv for i, lv in enumerate(self.levels)}
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, sample_rate=self.sample_rate, frames=self.frames, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            n = sum(1 for k in z.files if k.startswith("level"))
+            return cls(int(z["sample_rate"]), int(z["frames"]), [z[f"level{i}"] for i in range(n)])
+
+
+class PeakCache:
+    def __init__(self, folder=None):
+        self.folder = folder or peaks_dir()
+
+    def _prefix(self, path):
+        return hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode("utf-8")).hexdigest()[:16]
+
+    def _entry(self, path):
+        st = os.stat(path)
+        return os.path.join(self.folder, f"{self._prefix(path)}_{st.st_size}_{st.st_mtime_ns}.npz")
+
+    def load(self, path):
+        entry = self._entry(path)
+        if not os.path.exists(entry):
+            return None
+        try:
+            return PeakPyramid.load(entry)
+        except Exception as e:
+            print("Peak Cache Error:", e)
+            return None
+
+    def get_or_build(self, path, report=_no_report):
+        pyramid = self.load(path)
+        if pyramid is not None:
+            return pyramid
+
+        pyramid = PeakPyramid.build(path, report)
+        # 같은 파일의 이전 버전 캐시 정리
+        prefix = self._prefix(path)
+        for name in os.listdir(self.folder):
+            if name.startswith(prefix + "_"):
+                ScriptCache._remove(os.path.join(self.folder, name))
+        pyramid.save(self._entry(path))
+        return pyramid
+
+
+def guide_audio_path(video_path):
+    st = os.stat(video_path)
+    key = f"{os.path.normcase(os.path.abspath(video_path))}|{st.st_size}|{st.st_mtime_ns}"
+    return os.path.join(peaks_dir(), "guide_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".wav")
+
+
+GUIDE_EXTRACT_TIMEOUT_SEC = 1800 # 전체 추출 제한 (보통 실시간보다 훨씬 빠름)
+GUIDE_EXTRACT_STALL_SEC = 60     # 진행률이 이만큼 그대로면 중단
+
+
+def ensure_guide_audio(video_path, report=_no_report, sample_rate=22050):
+    # 영상의 오디오 트랙을 VLC 스트림 출력으로 mono WAV 추출 (가이드 트랙, 한 번만)
+    dst = guide_audio_path(video_path)
+    if os.path.exists(dst):
+        return dst
+
+    partial = dst + ".partial.wav"
+    instance = vlc.Instance("--quiet", "--no-video")
+    player = instance.media_player_new()
+    media = instance.media_new(video_path)
+    media.add_option(
+        ":sout=#transcode{vcodec=none,acodec=s16l,channels=1,samplerate=%d}"
+        ":std{access=file,mux=wav,dst='%s'}" % (sample_rate, partial.replace("\\", "/"))
+    )
+    player.set_media(media)
+    ok = False
+    try:
+        player.play()
+        t0 = last_progress = time.monotonic()
+        last_pos = -1.0
+        while True:
+            state = player.get_state()
+            if state == vlc.State.Ended:
+                break
+            if state in (vlc.State.Error, vlc.State.Stopped):
+                # Stopped: 입력을 읽지 못하면 (디먹스 실패) Ended 없이 여기서 멈춤
+                raise RuntimeError("영상 오디오 추출 실패 (VLC)")
+            now = time.monotonic()
+            pos = player.get_position()
+            if pos > last_pos:
+                last_pos, last_progress = pos, now
+            if now - t0 > GUIDE_EXTRACT_TIMEOUT_SEC or now - last_progress > GUIDE_EXTRACT_STALL_SEC:
+                raise RuntimeError("영상 오디오 추출 시간 초과 (VLC)")
+            report(max(0, min(95, int(pos * 95))), "영상 오디오 추출 중")
+            time.sleep(0.2)
+        ok = True
+    finally:
+        player.stop()
+        player.release()
+        instance.release()
+        if not ok: # 실패/취소 시 반쯤 쓴 WAV 정리
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+
+    os.replace(partial, dst)
+    return dst
+
+
+# =============================================================
+# WAVEFORM VIEW - 캐시된 피라미드로만 그림 (원본 샘플 다시 읽지 않음)
+# =============================================================
+class WaveformView(QWidget):
+    MIN_SPAN = 0.02 # 최대 확대 시 화면 폭 (초)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pyramid = None
+        self.view_start = 0.0
+        self.view_end = 1.0
+        self._drag_x = None
+        self.setMinimumHeight(160)
+
+    def set_pyramid(self, pyramid):
+        self.pyramid = pyramid
+        self.view_start = 0.0
+        self.view_end = max(self.MIN_SPAN, pyramid.duration if pyramid else 1.0)
+        self.update()
+
+    def _columns(self, width):
+        # 픽셀 열마다 [min, max, rms] (reduceat 으로 한 번에 계산)
+        p = self.pyramid
+        sr = p.sample_rate
+        spp = (self.view_end - self.view_start) * sr / width
+        level = p.level_for(spp)
+        data = p.levels[level]
+        n = len(data)
+        if n == 0:
+            return None
+
+        bs = p.bucket_size(level)
+        edges = ((self.view_start * sr + np.arange(width + 1) * spp) // bs).astype(np.int64)
+        inside = edges[:-1] < n
+        starts = np.minimum(edges[:-1], n - 1)
+        ext = np.concatenate([data, data[-1:]]) # reduceat 마지막 구간 경계용
+        mins = np.minimum.reduceat(ext[:, 0], starts)
+        maxs = np.maximum.reduceat(ext[:, 1], starts)
+        rms = np.sqrt(np.add.reduceat(ext[:, 2] ** 2, starts) / np.maximum(1, np.diff(np.append(starts, n + 1))))
+        return mins, maxs, rms, inside
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1e1e1e"))
+        w, h = self.width(), self.height()
+        mid = h / 2
+
+        if self.pyramid is None or not self.pyramid.frames or w <= 0:
+            painter.setPen(QColor("#888888"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "파형 없음")
+            return
+
+        cols = self._columns(w)
+        if cols is None:
+            return
+        mins, maxs, rms, inside = cols
+
+        painter.setPen(QColor("#00bfff"))
+        painter.drawLines([
+            QLineF(x, mid - maxs[x] * mid, x, mid - mins[x] * mid)
+            for x in range(w) if inside[x]
+        ])
+        painter.setPen(QColor("#7fdfff"))
+        painter.drawLines([
+            QLineF(x, mid - rms[x] * mid, x, mid + rms[x] * mid)
+            for x in range(w) if inside[x]
+        ])
+
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(6, 14, f"{self.view_start:.2f}s ~ {self.view_end:.2f}s")
+
+    def wheelEvent(self, event):
+        if self.pyramid is None:
+            return
+        # 마우스 위치 기준 확대/축소
+        span = self.view_end - self.view_start
+        anchor = self.view_start + span * event.position().x() / max(1, self.width())
+        scale = 0.8 if event.angleDelta().y() > 0 else 1.25
+        new_span = min(max(span * scale, self.MIN_SPAN), max(self.MIN_SPAN, self.pyramid.duration))
+        start = anchor - (anchor - self.view_start) * new_span / span
+        self._set_view(start, new_span)
+
+    def mousePressEvent(self, event):
+        self._drag_x = event.position().x()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_x is None or self.pyramid is None:
+            return
+        span = self.view_end - self.view_start
+        dx = event.position().x() - self._drag_x
+        self._drag_x = event.position().x()
+        self._set_view(self.view_start - dx * span / max(1, self.width()), span)
+
+    def mouseReleaseEvent(self, event):
+        self._drag_x = None
+
+    def _set_view(self, start, span):
+        start = min(max(0.0, start), max(0.0, self.pyramid.duration - span))
+        self.view_start = start
+        self.view_end = start + span
+        self.update()
+
+
+# =============================================================
+# LATENCY CALIBRATION - 루프백 테스트 신호 + 상호상관으로 왕복 지연 측정
+# =============================================================
+class CalibrationError(RuntimeError):
+    pass
+
+
+def make_calibration_signal(fs, seconds=0.5, f0=200.0, f1=8000.0):
+    # 로그 스윕 (자기상관 피크가 뾰족함) + 끝 잡음 방지용 페이드
+    t = np.arange(int(fs * seconds)) / fs
+    k = np.log(f1 / f0)
+    sweep = np.sin(2 * np.pi * f0 * seconds / k * (np.exp(t / seconds * k) - 1))
+    fade = min(len(t) // 10, int(fs * 0.01))
+    env = np.ones(len(t))
+    env[:fade] = np.linspace(0, 1, fade)
+    env[-fade:] = np.linspace(1, 0, fade)
+    return (0.5 * sweep * env).astype(np.float32)
+
+
+def estimate_lag(reference, recorded):
+    # FFT 상호상관 → (지연 샘플 수(소수), 정규화 상관계수 0~1)
+    m, n = len(reference), len(recorded)
+    if n < m:
+        raise CalibrationError("녹음이 테스트 신호보다 짧습니다.")
+    size = 1 << (n + m - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(recorded, size) * np.conj(np.fft.rfft(reference, size)), size)[: n - m + 1]
+
+    # 각 위치의 녹음 구간 에너지로 나눠 정규화 (큰 잡음에 속지 않도록)
+    energy = np.concatenate([[0.0], np.cumsum(recorded.astype(np.float64) ** 2)])
+    seg = energy[m:] - energy[:-m]
+    ref_energy = float(np.dot(reference, reference))
+    score = corr / np.sqrt(np.maximum(seg * ref_energy, 1e-20))
+    lag = int(np.argmax(score))
+
+    # 포물선 보간으로 소수 샘플 위치
+    frac = 0.0
+    if 0 < lag < len(corr) - 1:
+        a, b, c = corr[lag - 1], corr[lag], corr[lag + 1]
+        denom = a - 2 * b + c
+        if denom:
+            frac = 0.5 * (a - c) / denom
+    return float(lag + frac), float(score[lag])
+
+
+class LoopbackDevice:
+    # 실제 오디오 장치 (출력 → 루프백 케이블/마이크 → 입력)
+    def __init__(self, device=None):
+        self.device = device # None: 기본 입출력 장치
+
+    @property
+    def key(self):
+        return audio_device_key(self.device)
+
+    def playrec(self, signal, fs):
+        rec = sd.playrec(signal, samplerate=fs, channels=1, dtype="float32", device=self.device, blocking=True)
+        return rec[:, 0]
+
+
+class SimulatedLoopbackDevice:
+    # 장비 없이 보정 흐름을 시험하는 가상 장치 (지연 + 감쇠 + 반사음 + 잡음)
+    def __init__(self, latency_sec=0.085, noise=0.02, jitter_frames=8, seed=None):
+        self.latency_sec = latency_sec
+        self.noise = noise
+        self.jitter_frames = jitter_frames
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def key(self):
+        return f"simulated:{self.latency_sec * 1000:.1f}ms"
+
+    def playrec(self, signal, fs):
+        delay = int(round(self.latency_sec * fs)) + int(self.rng.integers(0, self.jitter_frames + 1))
+        out = np.zeros(len(signal), dtype=np.float32)
+        if delay < len(signal):
+            out[delay:] += 0.3 * signal[: len(signal) - delay]
+        echo = delay + int(0.007 * fs)
+        if echo < len(signal):
+            out[echo:] += 0.08 * signal[: len(signal) - echo]
+        out += self.rng.normal(0, self.noise, len(out)).astype(np.float32)
+        return out
+
+
+def audio_device_key(device=None):
+    # 호스트 API + 입력/출력 장치 이름 (장치 번호는 재부팅마다 바뀔 수 있음)
+    ins, outs = (device, device) if device is not None else sd.default.device
+    info_in = sd.query_devices(ins, "input")
+    info_out = sd.query_devices(outs, "output")
+    api = sd.query_hostapis(info_in["hostapi"])["name"]
+    return f"{api}|{info_in['name']}|{info_out['name']}"
+
+
+def measure_round_trip(device, fs=48000, runs=3, report=_no_report, min_confidence=0.3):
+    signal = make_calibration_signal(fs)
+    pre, tail = int(0.1 * fs), int(1.0 * fs) # 1초 이상 지연은 측정 안 함
+    out = np.concatenate([np.zeros(pre, np.float32), signal, np.zeros(tail, np.float32)])
+
+    lags, scores = [], []
+    for i in range(runs):
+        report(100 * i // runs, f"루프백 측정 {i + 1}/{runs}")
+        recorded = np.asarray(device.playrec(out, fs), dtype=np.float32)
+        lag, score = estimate_lag(signal, recorded)
+        if score < min_confidence:
+            raise CalibrationError(f"테스트 신호를 찾지 못했습니다 (상관 {score:.2f}). 루프백 연결과 음량을 확인하세요.")
+        lags.append((lag - pre) / fs)
+        scores.append(score)
+
+    return {
+        "round_trip_sec": float(np.median(lags)),
+        "spread_sec": float(max(lags) - min(lags)),
+        "confidence": float(min(scores)),
+        "runs": [float(v) for v in lags],
+        "sample_rate": fs,
+        "measured": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+class LatencyProfiles:
+    # 장치 키 → 측정 결과 (JSON, 앱 데이터 폴더)
+    FILE_NAME = "latency_profiles.json"
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(app_data_dir(), self.FILE_NAME)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.profiles = json.load(f)
+        except (OSError, ValueError):
+            self.profiles = {}
+
+    def get(self, key):
+        return self.profiles.get(key)
+
+    def set(self, key, profile):
+        self.profiles[key] = profile
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.profiles, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def offset_for(self, key):
+        # 테이크는 왕복 지연만큼 늦게 들어오므로 그만큼 앞으로 당김
+        profile = self.profiles.get(key)
+        return -profile["round_trip_sec"] if profile else 0.0
+
+
+# =============================================================
+# MIXDOWN - 선택 테이크를 타임라인에 배치해 블록 단위로 믹스 (메모리 고정)
+# =============================================================
+MIX_SAMPLE_RATE = 44100
+MIX_BLOCK_FRAMES = 65536
+
+
+def take_timeline_sec(take):
+    # 테이크 첫 샘플의 영상 위치 (측정값 우선, 없으면 대사 시작) + 지연 보정
+    start = take.get("video_start_sec")
+    if start is None:
+        start = take.get("cue_start_sec") or 0.0
+    return start + (take.get("offset_sec") or 0.0)
+
+
+class StreamResampler:
+    # 블록 단위 폴리페이즈 windowed-sinc 리샘플러 (L/M 유리수 비, 카이저 창 저역통과)
+    # 48k -> 44.1k 처럼 내릴 때 새 나이퀴스트 위 성분을 걸러 에일리어싱을 막음
+    HALF = 32       # 출력 하나당 양쪽 입력 탭 수
+    ROLLOFF = 0.92  # 차단 주파수 (낮은 쪽 나이퀴스트 대비)
+    BETA = 8.6      # 카이저 창 (저지대역 약 -80dB)
+
+    def __init__(self, src_fs, dst_fs):
+        ratio = fractions.Fraction(int(round(dst_fs)), int(round(src_fs))).limit_denominator(4096)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        L, half = self.up, self.HALF
+        fc = self.ROLLOFF * 0.5 / max(self.up, self.down)  # 업샘플 도메인 기준 (cycle/sample)
+        # taps[p, i] = h(p + (half - 1 - i) * L), i 는 x[base - half + 1 + i] 에 곱함
+        k = np.arange(half - 1, -half - 1, -1)
+        j = np.arange(L)[:, None] + k[None, :] * L
+        h = 2 * fc * L * np.sinc(2 * fc * j) * np.kaiser(2 * half * L + 1, self.BETA)[j + half * L]
+        self.taps = h.astype(np.float32)
+        self.n = 0                                    # 다음 출력 샘플 번호
+        self.offset = -half                           # buf[0] 의 입력 샘플 번호
+        self.buf = np.zeros(half, dtype=np.float32)   # 시작 전은 무음
+
+    def _bases(self, frames):
+        u = (self.n + np.arange(frames, dtype=np.int64)) * self.down
+        return u // self.up, u % self.up
+
+    def need(self, frames):
+        # frames 개를 만들려면 더 필요한 입력 샘플 수
+        if frames <= 0:
+            return 0
+        last = ((self.n + frames - 1) * self.down) // self.up
+        return max(0, last + self.HALF + 1 - (self.offset + len(self.buf)))
+
+    def feed(self, x):
+        self.buf = np.concatenate([self.buf, np.asarray(x, dtype=np.float32)])
+
+    def pull(self, frames):
+        if frames <= 0:
+            return np.zeros(0, dtype=np.float32)
+        short = self.need(frames)
+        if short:
+            # 입력이 끝난 뒤는 무음으로 간주 (한 번에 다 넣고 뽑는 경우)
+            self.feed(np.zeros(short, dtype=np.float32))
+        base, phase = self._bases(frames)
+        first = base - self.HALF + 1 - self.offset
+        idx = first[:, None] + np.arange(2 * self.HALF)[None, :]
+        out = np.einsum("ij,ij->i", self.buf[idx], self.taps[phase]).astype(np.float32)
+        self.n += frames
+        keep = (self.n * self.down) // self.up - self.HALF + 1 - self.offset
+        if keep > 0:
+            self.buf = self.buf[keep:]
+            self.offset += keep
+        return out
+
+
+class MixSource:
+    # 타임라인 위 파일 하나 (처음 닿을 때 열고, 끝나면 닫음)
+    def __init__(self, path, start_sec, gain=1.0, in_sec=0.0, out_sec=None, fs=MIX_SAMPLE_RATE):
+        # in_sec/out_sec: 파일 안에서 쓸 구간 (무음 트림), start_sec 는 파일 0 초의 타임라인 위치
+        self.path = path
+        self.fs = fs
+        self.gain = gain
+        info = sf.info(path)
+        dur = info.frames / info.samplerate
+        out_sec = dur if out_sec is None else min(out_sec, dur)
+        self.start = int(round((start_sec + in_sec) * fs))
+        self.length = int(round((out_sec - in_sec) * fs))
+        self.skip = int(round(in_sec * fs)) # 파일 앞에서 건너뛸 부분
+        if self.start < 0: # 타임라인 0 이전 부분
+            self.skip -= self.start
+            self.length += self.start
+            self.start = 0
+        self.length = max(0, self.length)
+        self.file = None
+        self.resampler = None
+
+    @property
+    def end(self):
+        return self.start + self.length
+
+    def _open(self):
+        self.file = sf.SoundFile(self.path)
+        if self.file.samplerate != self.fs:
+            self.resampler = StreamResampler(self.file.samplerate, self.fs)
+        if self.skip:
+            self.file.seek(int(self.skip * self.file.samplerate / self.fs))
+
+    def _read_mono(self, frames):
+        x = self.file.read(frames, dtype="float32", always_2d=True)
+        return x.mean(axis=1) if x.shape[1] > 1 else x[:, 0]
+
+    def read(self, frames):
+        if self.file is None:
+            self._open()
+        if self.resampler is None:
+            x = self._read_mono(frames)
+        else:
+            need = self.resampler.need(frames)
+            if need:
+                got = self._read_mono(need)
+                if len(got) < need: # 파일 끝: 0 으로 채움
+                    got = np.concatenate([got, np.zeros(need - len(got), np.float32)])
+                self.resampler.feed(got)
+            x = self.resampler.pull(frames)
+        if len(x) < frames:
+            x = np.concatenate([x, np.zeros(frames - len(x), np.float32)])
+        return x * self.gain
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def duck_envelope(t0, frames, intervals, duck_gain, attack, release):
+    # 대사 구간마다 [시작-attack, 시작, 끝, 끝+release] 사다리꼴 → 최솟값 (블록 사이 상태 없음)
+    env = np.ones(frames, dtype=np.float32)
+    t = np.arange(t0, t0 + frames)
+    for s, e in intervals:
+        env = np.minimum(env, np.interp(t, [s - attack, s, e, e + release], [1.0, duck_gain, duck_gain, 1.0]))
+    return env
+
+
+def render_mix(job, report=_no_report):
+    # job: {"output", "sources": [(경로, 시작초, 게인, 트림 시작, 트림 끝)], "reference", "duck_db", "duration_sec"}
+    fs = MIX_SAMPLE_RATE
+    block = MIX_BLOCK_FRAMES
+    sources = sorted((MixSource(*src, fs=fs) for src in job["sources"]), key=lambda m: m.start)
+    reference = MixSource(job["reference"], 0.0, fs=fs) if job.get("reference") else None
+    duck_gain = 10 ** (job.get("duck_db", -12.0) / 20)
+    attack, release = int(0.05 * fs), int(0.25 * fs)
+
+    starts = [m.start for m in sources]
+    longest = max([m.length for m in sources] or [0])
+    total = max([m.end for m in sources] + [reference.end if reference else 0])
+    if job.get("duration_sec"):
+        total = max(total, int(job["duration_sec"] * fs))
+    if total <= 0:
+        raise ValueError("믹스할 테이크가 없습니다.")
+
+    t0 = time.perf_counter()
+    peak = 0.0
+    clipped = 0
+    subtype = "PCM_24"
+    with sf.SoundFile(job["output"], "w", samplerate=fs, channels=1, subtype=subtype) as out:
+        nxt = 0 # 아직 시작 안 한 첫 소스
+        active = []
+        for b0 in range(0, total, block):
+            n = min(block, total - b0)
+            b1 = b0 + n
+            while nxt < len(sources) and sources[nxt].start < b1:
+                active.append(sources[nxt])
+                nxt += 1
+
+            mix = np.zeros(n, dtype=np.float32)
+            for m in active:
+                a = max(b0, m.start)
+                e = min(b1, m.end)
+                if e > a:
+                    mix[a - b0:e - b0] += m.read(e - a)
+            for m in [m for m in active if m.end <= b1]:
+                m.close()
+                active.remove(m)
+
+            if reference is not None and reference.end > b0:
+                e = min(b1, reference.end)
+                ref = reference.read(e - b0)
+                # 덕킹 구간: 이 블록 근처 테이크만 (정렬된 시작 기준 이진 탐색)
+                lo = bisect.bisect_left(starts, b0 - release - longest)
+                hi = bisect.bisect_left(starts, b1 + attack)
+                near = [(m.start, m.end) for m in sources[lo:hi] if m.end + release > b0]
+                if near:
+                    ref *= duck_envelope(b0, e - b0, near, duck_gain, attack, release)
+                mix[: e - b0] += ref
+
+            peak = max(peak, float(np.abs(mix).max()) if n else 0.0)
+            over = np.abs(mix) > 1.0
+            if over.any():
+                clipped += int(over.sum())
+                np.clip(mix, -1.0, 1.0, out=mix)
+            out.write(mix)
+            report(100 * b1 // total, "믹스 중")
+
+    for m in sources:
+        m.close()
+    if reference is not None:
+        reference.close()
+    return {
+        "output": job["output"],
+        "seconds": time.perf_counter() - t0,
+        "duration_sec": total / fs,
+        "takes": len(sources),
+        "peak": peak,
+        "clipped_samples": clipped,
+    }
+
+
+def take_mix_source(take):
+    # 무음 트림이 있으면 그 구간만 (파일은 그대로)
+    return (take["path"], take_timeline_sec(take), 1.0, take.get("trim_start_sec") or 0.0, take.get("trim_end_sec"))
+
+
+def build_mix_jobs(takes, output, reference=None, duck_db=-12.0, stems_dir=None):
+    # 전체 믹스 1개 + (선택) 화자별 스템. 스템은 서로 독립이라 병렬 렌더 가능
+    sources = [take_mix_source(t) for t in takes if os.path.exists(t["path"])]
+    jobs = [{"output": output, "sources": sources, "reference": reference, "duck_db": duck_db}]
+    if stems_dir:
+        os.makedirs(stems_dir, exist_ok=True)
+        ext = os.path.splitext(output)[1] or ".wav"
+        by_speaker = {}
+        for t in takes:
+            if os.path.exists(t["path"]):
+                by_speaker.setdefault(t["speaker"] or "화자없음", []).append(take_mix_source(t))
+        # 스템 길이를 전체 믹스와 맞춤 (편집기에서 0 위치 정렬)
+        ends = [st + (out if out is not None else sf.info(p).duration) for p, st, _, _, out in sources]
+        duration = max(ends + [sf.info(reference).duration if reference else 0.0])
+        for spk, srcs in sorted(by_speaker.items()):
+            safe = re.sub(r'[\\/:*?"<>|]+', "_", str(spk))
+            jobs.append({"output": os.path.join(stems_dir, safe + ext), "sources": srcs, "duration_sec": duration})
+    return jobs
+
+
+def render_mix_jobs(jobs, workers=None, report=_no_report):
+    # 작업이 하나면 현재 스레드에서, 여러 개면 프로세스 풀에서 병렬
+    if len(jobs) == 1:
+        return [render_mix(jobs[0], report)]
+    results = []
+    with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(render_mix, job) for job in jobs]
+        for fut in as_completed(futures):
+            results.append(fut.result())
+            report(100 * len(results) // len(jobs), f"믹스 {len(results)}/{len(jobs)}")
+    return results
+
+
+# =============================================================
+# TRIM - 프레임 RMS + 히스테리시스로 발화 구간 검출 (비파괴: 사이드카/색인에 기록)
+# =============================================================
+TRIM_FRAME_SEC = 0.010   # 분석 프레임 (겹침 없음)
+TRIM_ON_DB = 12.0        # 잡음 바닥 대비 발화 시작 문턱
+TRIM_OFF_DB = 6.0        # 발화 끝 문턱 (시작보다 낮게 → 히스테리시스)
+TRIM_MIN_ON_DB = -55.0   # 조용한 방에서도 이보다 작으면 발화로 보지 않음
+TRIM_MIN_ON_SEC = 0.06   # 이만큼 연속으로 넘어야 발화 (클릭/잡음 무시)
+TRIM_PRE_PAD_SEC = 0.08  # 자른 구간 앞뒤 여유
+TRIM_POST_PAD_SEC = 0.15
+
+
+def framed_levels(path, frame_sec=TRIM_FRAME_SEC, block_frames=4096):
+    # 파일을 블록 단위로 읽어 프레임별 RMS(dBFS) 배열 (메모리는 블록 크기만큼)
+    parts = []
+    with sf.SoundFile(path) as f:
+        fs = f.samplerate
+        hop = max(1, int(round(fs * frame_sec)))
+        for block in f.blocks(blocksize=hop * block_frames, dtype="float32", always_2d=True):
+            mono = block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            full = len(mono) // hop * hop
+            power = (mono[:full].reshape(-1, hop) ** 2).mean(axis=1)
+            if full < len(mono):
+                power = np.append(power, (mono[full:] ** 2).mean())
+            parts.append(power)
+    power = np.concatenate(parts) if parts else np.zeros(0)
+    return fs, hop, 10 * np.log10(np.maximum(power, 1e-12))
+
+
+def detect_speech_bounds(levels_db):
+    # → (시작 프레임, 끝 프레임(미포함), 잡음 바닥, 시작 문턱) / 발화 없으면 None
+    if not len(levels_db):
+        return None
+    floor = float(np.percentile(levels_db, 10))
+    on = max(floor + TRIM_ON_DB, TRIM_MIN_ON_DB)
+    off = on - (TRIM_ON_DB - TRIM_OFF_DB)
+
+    k = max(1, int(round(TRIM_MIN_ON_SEC / TRIM_FRAME_SEC)))
+    above = (levels_db > on).astype(np.int32)
+    if len(above) < k:
+        return None
+    sustained = np.convolve(above, np.ones(k, dtype=np.int32), "valid") == k
+    if not sustained.any():
+        return None
+    first = int(np.argmax(sustained))
+    last = len(sustained) - 1 - int(np.argmax(sustained[::-1])) + k - 1
+
+    # 히스테리시스: 시작 문턱을 넘은 곳에서 끝 문턱 아래로 떨어지는 곳까지 넓힘
+    quiet = levels_db <= off
+    before = np.flatnonzero(quiet[:first])
+    after = np.flatnonzero(quiet[last + 1:])
+    start = int(before[-1]) + 1 if before.size else 0
+    end = last + 1 + int(after[0]) if after.size else len(levels_db)
+    return start, end, floor, on
+
+
+def trim_take(path, write=True):
+    fs, hop, levels = framed_levels(path)
+    duration = len(levels) * hop / fs
+    bounds = detect_speech_bounds(levels)
+    if bounds is None:
+        trim = {"speech": False, "start_sec": None, "end_sec": None}
+    else:
+        start, end, floor, on = bounds
+        trim = {
+            "speech": True,
+            "start_sec": max(0.0, start * hop / fs - TRIM_PRE_PAD_SEC),
+            "end_sec": min(duration, end * hop / fs + TRIM_POST_PAD_SEC),
+            "floor_db": floor,
+            "on_db": on,
+        }
+    trim["duration_sec"] = duration
+    if write:
+        meta = read_take_sidecar(path)
+        meta["trim"] = trim
+        write_take_sidecar(path, meta)
+    return trim
+
+
+def cli_trim_one(path):
+    # 프로세스 풀 작업자: 발화 구간 검출 + 사이드카 기록
+    t0 = time.perf_counter()
+    try:
+        trim = trim_take(path)
+        if not trim["speech"]:
+            return _cli_result(path, t0, cues=None, trim=trim, issues=["발화를 찾지 못함"], issue_total=1)
+        cut = trim["duration_sec"] - (trim["end_sec"] - trim["start_sec"])
+        return _cli_result(
+            path, t0, cues=None, trim=trim,
+            output=f"{trim['start_sec']:.2f}s ~ {trim['end_sec']:.2f}s (-{cut:.2f}s)",
+        )
+    except Exception as e:
+        return _cli_result(path, t0, cues=None, ok=False, error=str(e))
+
+
+def trim_session(paths, workers=None, report=_no_report):
+    # 세션 폴더 전체를 프로세스 풀로 (파일마다 독립)
+    files = _collect_inputs(paths, (".wav", ".flac"))
+    results = []
+    if not files:
+        return results
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(cli_trim_one, f) for f in files]
+        for fut in as_completed(futures):
+            results.append(fut.result())
+            report(100 * len(results) // len(files), f"트림 {len(results)}/{len(files)}")
+    return results
+
+
+# =============================================================
+# ALIGN - 테이크 온셋 포락선 ↔ 원본(가이드) 대사 구간 FFT 상호상관
+# =============================================================
+ALIGN_HOP_SEC = 0.01        # 포락선 해상도 (10 ms)
+ALIGN_SEARCH_SEC = 1.0      # 현재 위치 앞뒤 탐색 범위
+ALIGN_MIN_CONFIDENCE = 0.5  # 일괄 적용 기본 문턱
+
+
+def read_mono(path, start_sec=0.0, end_sec=None):
+    with sf.SoundFile(path) as f:
+        fs = f.samplerate
+        a = max(0, int(start_sec * fs))
+        b = f.frames if end_sec is None else min(f.frames, int(end_sec * fs))
+        f.seek(min(a, f.frames))
+        x = f.read(max(0, b - a), dtype="float32", always_2d=True)
+    return (x.mean(axis=1) if x.shape[1] > 1 else x[:, 0]), fs
+
+
+def align_hop(fs, hop_sec=ALIGN_HOP_SEC):
+    # 포락선 한 프레임의 샘플 수 (실제 프레임 길이는 hop / fs 초)
+    return max(1, int(round(fs * hop_sec)))
+
+
+def onset_envelope(x, fs, hop_sec=ALIGN_HOP_SEC):
+    # 프레임 로그 에너지의 증가분 (반파 정류) → 평균 0 / 분산 1
+    hop = align_hop(fs, hop_sec)
+    n = len(x) // hop
+    if n < 2:
+        return np.zeros(n, dtype=np.float32)
+    level = 10 * np.log10((x[: n * hop].reshape(n, hop).astype(np.float64) ** 2).mean(axis=1) + 1e-10)
+    flux = np.maximum(np.diff(level, prepend=level[0]), 0.0)
+    std = flux.std()
+    return ((flux - flux.mean()) / std if std > 0 else flux * 0).astype(np.float32)
+
+
+def align_take(take_path, placed_sec, reference_path, in_sec=0.0, out_sec=None, search_sec=ALIGN_SEARCH_SEC):
+    # placed_sec: 테이크 파일 0 초의 현재 타임라인 위치 → 옮길 양(초)과 신뢰도
+    take, fs_t = read_mono(take_path, in_sec, out_sec)
+    seg_start = placed_sec + in_sec # 사용 구간의 현재 위치
+    dur = len(take) / fs_t
+    win_start = max(0.0, seg_start - search_sec)
+    ref, fs_r = read_mono(reference_path, win_start, seg_start + dur + search_sec)
+
+    # 두 포락선의 프레임 길이가 같도록 테이크를 가이드 샘플레이트로 (예: 44.1k → 22.05k)
+    if fs_t != fs_r and len(take) > 1:
+        resampler = StreamResampler(fs_t, fs_r)
+        resampler.feed(take)
+        take = resampler.pull(int((len(take) - 1) * fs_r / fs_t) + 1)
+
+    env_take = onset_envelope(take, fs_r)
+    env_ref = onset_envelope(ref, fs_r)
+    if len(env_take) < 10 or len(env_ref) < len(env_take):
+        raise CalibrationError("정렬할 구간이 너무 짧습니다.")
+
+    lag, score = estimate_lag(env_take, env_ref)
+    best = win_start + lag * align_hop(fs_r) / fs_r
+    return {"delta_sec": best - seg_start, "confidence": max(0.0, min(1.0, score))}
+
+
+def take_align_job(take, reference_path):
+    return (take["id"], take["path"], take_timeline_sec(take), reference_path,
+            take.get("trim_start_sec") or 0.0, take.get("trim_end_sec"))
+
+
+def cli_align_one(take_id, path, placed_sec, reference_path, in_sec, out_sec):
+    # 프로세스 풀 작업자
+    t0 = time.perf_counter()
+    try:
+        r = align_take(path, placed_sec, reference_path, in_sec, out_sec)
+        return _cli_result(
+            path, t0, cues=None, take_id=take_id, align=r,
+            output=f"{r['delta_sec'] * 1000:+.0f} ms (신뢰도 {r['confidence']:.2f})",
+        )
+    except Exception as e:
+        return _cli_result(path, t0, cues=None, take_id=take_id, ok=False, error=str(e))
+
+
+def align_session(takes, reference_path, workers=None, report=_no_report):
+    jobs = [take_align_job(t, reference_path) for t in takes if os.path.exists(t["path"])]
+    results = []
+    if not jobs:
+        return results
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(cli_align_one, *job) for job in jobs]
+        for fut in as_completed(futures):
+            results.append(fut.result())
+            report(100 * len(results) // len(jobs), f"정렬 {len(results)}/{len(jobs)}")
+    return results
+
+
+def apply_alignment(store, take, result):
+    # 오프셋에 더하고 사이드카에도 남김 (원본 파일은 그대로)
+    offset = (take.get("offset_sec") or 0.0) + result["delta_sec"]
+    store.set_offset(take["id"], offset)
+    meta = read_take_sidecar(take["path"])
+    if meta:
+        meta["offset_sec"] = offset
+        meta["alignment"] = dict(result, applied=datetime.datetime.now().isoformat(timespec="seconds"))
+        write_take_sidecar(take["path"], meta)
+    return offset
+
+
+# =============================================================
+# BACKGROUND TASK - 작업 스레드 풀에서 실행 (진행률/취소)
+# =============================================================
+class LoadCancelled(Exception):
+    pass
+
+
+class TaskSignals(QObject):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+class BackgroundTask(QRunnable):
+    def __init__(self, fn):
+        # fn(report) 형태, report(percent, text) 는 취소 시 LoadCancelled 발생
+        super().__init__()
+        self.fn = fn
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report(self, percent, text=""):
+        if self.cancel_event.is_set():
+            raise LoadCancelled()
+        self.signals.progress.emit(int(percent), text)
+
+    def run(self):
+        # 재생/동기화 타이머가 밀리지 않도록 낮은 우선순위
+        QThread.currentThread().setPriority(QThread.Priority.LowPriority)
+        try:
+            result = self.fn(self.report)
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+
+        if self.cancel_event.is_set():
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
+
+
+# =============================================================
+# DIAGNOSTICS - 틱 시간 히스토그램, 늦은/누락 틱, VLC 탐색 지연, 테이크 xrun
+# =============================================================
+class SessionDiagnostics:
+    TICK_BUCKETS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66) # 마지막 칸은 66ms 초과
+    LATE_FACTOR = 1.5       # 틱 간격이 주기의 이 배를 넘으면 늦은 틱
+    SEEK_MATCH_MS = 300     # VLC 보고 시간이 목표와 이만큼 가까우면 탐색 완료
+    SEEK_TIMEOUT_SEC = 5.0  # 이 안에 보고가 없으면 응답 없는 탐색
+    MAX_EVENTS = 50000      # 세션 로그 최대 길이 (오래된 것부터 버림)
+
+    def __init__(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.reset()
+
+    def reset(self):
+        self.t0 = time.monotonic()
+        self.events = deque(maxlen=self.MAX_EVENTS) # (세션 초, 종류, 값 ms, 설명)
+        self.tick_hist = [0] * (len(self.TICK_BUCKETS_MS) + 1)
+        self.tick_count = 0
+        self.tick_total_ms = 0.0
+        self.tick_max_ms = 0.0
+        self.late_ticks = 0
+        self.missed_ticks = 0
+        self.last_tick = None
+        self.seek_ms = []
+        self.seek_timeouts = 0
+        self.pending_seek = None # (목표 ms, 시작 시각)
+        self.takes = []
+
+    def _log(self, kind, value_ms, detail=""):
+        self.events.append((time.monotonic() - self.t0, kind, value_ms, detail))
+
+    # ---------------------------
+    def tick(self, start, end, video_sec):
+        # start/end: perf_counter, update_by_time 한 번의 앞뒤
+        ms = (end - start) * 1000
+        self.tick_count += 1
+        self.tick_total_ms += ms
+        self.tick_max_ms = max(self.tick_max_ms, ms)
+        self.tick_hist[bisect.bisect_left(self.TICK_BUCKETS_MS, ms)] += 1
+        if ms > self.interval_ms:
+            self._log("slow_tick", ms, f"video={video_sec:.3f}")
+
+        if self.last_tick is not None:
+            gap = (start - self.last_tick) * 1000
+            if gap > self.interval_ms * self.LATE_FACTOR:
+                missed = max(0, int(round(gap / self.interval_ms)) - 1)
+                self.late_ticks += 1
+                self.missed_ticks += missed
+                self._log("late_tick", gap, f"video={video_sec:.3f} missed={missed}")
+        self.last_tick = start
+
+    def tick_stopped(self):
+        # 일시정지 동안의 공백은 늦은 틱이 아님
+        self.last_tick = None
+
+    def seek_started(self, target_ms):
+        if self.pending_seek is not None:
+            self._expire_seek(time.monotonic())
+        self.pending_seek = (target_ms, time.monotonic())
+
+    def time_reported(self, ms):
+        if self.pending_seek is None:
+            return
+        target, t = self.pending_seek
+        now = time.monotonic()
+        if abs(ms - target) <= self.SEEK_MATCH_MS:
+            self.pending_seek = None
+            latency = (now - t) * 1000
+            self.seek_ms.append(latency)
+            self._log("seek", latency, f"target={target / 1000:.3f}")
+        else:
+            self._expire_seek(now)
+
+    def _expire_seek(self, now):
+        # 오래 응답이 없던 탐색은 완료 못한 것으로 기록 (짧은 것은 다음 보고를 계속 기다림)
+        target, t = self.pending_seek
+        if now - t > self.SEEK_TIMEOUT_SEC:
+            self.pending_seek = None
+            self.seek_timeouts += 1
+            self._log("seek_timeout", (now - t) * 1000, f"target={target / 1000:.3f}")
+
+    def note_take(self, take):
+        entry = {
+            "path": take.get("path"),
+            "cue": take.get("cue"),
+            "duration_sec": take.get("duration_sec"),
+            "input_overflows": take.get("input_overflows", 0),
+            "input_underflows": take.get("input_underflows", 0),
+            "dropped_frames": take.get("dropped_frames", 0),
+        }
+        self.takes.append(entry)
+        bad = entry["input_overflows"] + entry["input_underflows"] + entry["dropped_frames"]
+        self._log("take_xrun" if bad else "take", float(entry["duration_sec"] or 0) * 1000,
+                  f"{os.path.basename(entry['path'] or '')} overflow={entry['input_overflows']} "
+                  f"underflow={entry['input_underflows']} dropped={entry['dropped_frames']}")
+
+    # ---------------------------
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return None
+        v = sorted(values)
+        return v[min(len(v) - 1, int(q * len(v)))]
+
+    def summary(self):
+        n = self.tick_count
+        return {
+            "session_sec": time.monotonic() - self.t0,
+            "interval_ms": self.interval_ms,
+            "ticks": n,
+            "tick_mean_ms": self.tick_total_ms / n if n else None,
+            "tick_max_ms": self.tick_max_ms if n else None,
+            "tick_histogram": {
+                (f"<={edge}ms" if i < len(self.TICK_BUCKETS_MS) else f">{self.TICK_BUCKETS_MS[-1]}ms"): c
+                for i, (edge, c) in enumerate(zip(self.TICK_BUCKETS_MS + (None,), self.tick_hist))
+            },
+            "late_ticks": self.late_ticks,
+            "missed_ticks": self.missed_ticks,
+            "seeks": len(self.seek_ms),
+            "seek_p50_ms": self._percentile(self.seek_ms, 0.5),
+            "seek_p90_ms": self._percentile(self.seek_ms, 0.9),
+            "seek_max_ms": max(self.seek_ms) if self.seek_ms else None,
+            "seek_timeouts": self.seek_timeouts,
+            "takes": self.takes,
+        }
+
+    def report(self):
+        s = self.summary()
+        fmt = lambda v: "-" if v is None else f"{v:.2f}"
+        lines = [
+            f"세션 {s['session_sec']:.0f}초 · 틱 주기 {s['interval_ms']}ms",
+            "",
+            f"[update_by_time] {s['ticks']}회  평균 {fmt(s['tick_mean_ms'])} ms  최대 {fmt(s['tick_max_ms'])} ms",
+        ]
+        peak = max(self.tick_hist) or 1
+        for label, count in s["tick_histogram"].items():
+            lines.append(f"  {label:>8} {count:>8}  {'█' * int(round(count / peak * 30))}")
+        lines += [
+            f"늦은 틱 {s['late_ticks']}  ·  누락 추정 {s['missed_ticks']}",
+            "",
+            f"[VLC 탐색] {s['seeks']}회  p50 {fmt(s['seek_p50_ms'])} ms  p90 {fmt(s['seek_p90_ms'])} ms  "
+            f"최대 {fmt(s['seek_max_ms'])} ms  응답 없음 {s['seek_timeouts']}",
+            "",
+            f"[테이크] {len(self.takes)}개",
+        ]
+        for t in self.takes[-12:]:
+            lines.append(f"  {os.path.basename(t['path'] or ''):<36} overflow {t['input_overflows']:>3}  "
+                         f"underflow {t['input_underflows']:>3}  dropped {t['dropped_frames']}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        # 확장자로 형식 결정: .csv → 이벤트 표, 그 외 → JSON (요약 + 이벤트)
+        if path.lower().endswith(".csv"):
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(["time_sec", "kind", "value_ms", "detail"])
+                for t, kind, value, detail in list(self.events):
+                    w.writerow([f"{t:.3f}", kind, f"{value:.3f}", detail])
+            return
+        data = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "summary": self.summary(),
+            "events": [{"time_sec": t, "kind": k, "value_ms": v, "detail": d} for t, k, v, d in list(self.events)],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class DiagnosticsPanel(QDockWidget):
+    REFRESH_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__("진단", parent)
+        self.diag = None
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        layout.addWidget(self.text)
+        row = QHBoxLayout()
+        self.btn_reset = QPushButton("초기화")
+        self.btn_export = QPushButton("세션 로그 내보내기...")
+        row.addWidget(self.btn_reset)
+        row.addWidget(self.btn_export)
+        layout.addLayout(row)
+        self.setWidget(body)
+
+        self.btn_reset.clicked.connect(self._reset)
+        self.btn_export.clicked.connect(self._export)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def attach(self, diag):
+        self.diag = diag
+        self.refresh()
+        self.refresh_timer.start()
+
+    def detach(self):
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        if self.diag is not None:
+            self.text.setPlainText(self.diag.report())
+
+    def _reset(self):
+        if self.diag is not None:
+            self.diag.reset()
+            self.refresh()
+
+    def _export(self):
+        if self.diag is None:
+            return
+        name = datetime.datetime.now().strftime("diagnostics_%Y%m%d_%H%M%S")
+        path, _ = QFileDialog.getSaveFileName(self, "세션 로그 내보내기", name + ".csv", "CSV (*.csv);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.diag.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "오류", f"내보내기 실패: {e}")
+
+
+# =============================================================
+# Main Tool
+# =============================================================
+class KingnuTool(QMainWindow):
+    SYNC_INTERVAL_MS = 33 # 재생 중 카운트다운 갱신 주기 (~30fps)
+
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("킹누 더빙툴 — FINAL 2025")
+        self.resize(1500, 900)
+
+        # ---------------- QSS (스타일 시트) 적용 ----------------
+        self.setStyleSheet(self._get_qss_style())
+
+        self.rec = Recorder()
+        self.dialogues_full = []
+        self.dialogues_primary = [] 
+        self.speaker_colors = {}
+        self.cue_index = CueIndex([], [])
+        self.renderer = LabelRenderer()
+        self.search_index = DialogueSearchIndex([])
+        self.script_cache = ScriptCache()
+        self.script_path = None
+        self.video_path = None
+        self.peak_cache = None # 첫 파형 보기 때 생성
+        self.take_store = None # 첫 녹음/테이크 목록 때 생성
+        self.punch = None # 펀치인 중인 대사 {"cue", "start", "end"}
+        self.latency_profiles = LatencyProfiles()
+        self.take_player = TakePlayer()
+        self.settings = QSettings("KingnuDubbingTool", "KingnuDubbingTool")
+        self.storage_format = self.settings.value("storage_format", "wav")
+        if self.storage_format not in STORAGE_FORMATS:
+            self.storage_format = "wav"
+        self.rec.subtype = STORAGE_FORMATS[self.storage_format][1]
+        self.encoder = TakeEncoder(self.takes)
+        self.preview = None # 영상 동기 미리듣기 중 {"volume": 원래 VLC 음량}
+        self.diag = None # 진단 패널을 켜면 SessionDiagnostics (끄면 계측 없음)
+        self.mode = "primary" # '실전 모드' 유지
+
+        # ---------------- Layout ----------------
+        central = QWidget()
+        self.setCentralWidget(central)
+        main = QHBoxLayout()
+        central.setLayout(main)
+
+        # --------------------------------------------------------
+        # LEFT PANEL (연습 모드 버튼 삭제 및 전체 대사 보기 버튼 추가)
+        # --------------------------------------------------------
+        left = QVBoxLayout()
+        
+        # 전체 대사 보기 버튼 (새 기능)
+        self.btn_show_all = QPushButton("📋 전체 대사 보기 (더블클릭 이동)")
+        self.btn_show_all.clicked.connect(self.show_all_dialogues_dialog)
+        left.addWidget(self.btn_show_all)
+
+        # 현재 화자 그룹
+        group_current = QGroupBox("현재 대사")
+        group_current_layout = QVBoxLayout(group_current)
+        
+        self.lbl_current = QLabel("-")
+        self.lbl_current.setObjectName("CurrentSpeakerLabel")
+        group_current_layout.addWidget(self.lbl_current)
+        
+        left.addWidget(group_current)
+
+
+        # 다음 화자 그룹 (강조)
+        group_next = QGroupBox("다음 대사 준비")
+        group_next_layout = QVBoxLayout(group_next)
+        
+        self.lbl_next = QLabel("-")
+        self.lbl_next.setObjectName("NextSpeakerLabel")
+        group_next_layout.addWidget(self.lbl_next)
+        
+        self.lbl_count = QLabel("(다음화자) 준비 -")
+        self.lbl_count.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_count.setObjectName("CountdownLabel")
+        group_next_layout.addWidget(self.lbl_count)
+        
+        left.addWidget(group_next)
+
+
+        # 다다음 화자 그룹
+        group_next2 = QGroupBox("다다음 대사")
+        group_next2_layout = QVBoxLayout(group_next2)
+        
+        self.lbl_next2 = QLabel("-")
+        self.lbl_next2.setObjectName("Next2SpeakerLabel")
+        group_next2_layout.addWidget(self.lbl_next2)
+        
+        left.addWidget(group_next2)
+
+        left.addStretch()
+
+        # --------------------------------------------------------
+        # RIGHT PANEL
         # --------------------------------------------------------
         self.player = VideoPlayer(self) # self를 넘겨줌
 
@@ -375,6 +3633,8 @@ class KingnuTool(QMainWindow):
         self.player.btn_rec_start.clicked.connect(self.start_record)
         self.player.btn_rec_stop.clicked.connect(self.stop_record)
         self.player.btn_rec_play.clicked.connect(self.play_record)
+        self.player.btn_waveform.clicked.connect(self.show_waveform_dialog)
+        self.player.btn_punch.clicked.connect(self.punch_in)
         self.player.btn_manual_seek.clicked.connect(self.player.manual_seek) # 수동 이동 버튼 연결
 
         main.addLayout(left, 3)
@@ -397,10 +3657,87 @@ class KingnuTool(QMainWindow):
         act_srt.triggered.connect(self.load_srt)
         menu.addAction(act_srt)
 
-        # Timer
+        act_sim = QAction("영상 없이 대본 재생 (가상 시계)...", self)
+        act_sim.triggered.connect(self.start_simulated_playback)
+        menu.addAction(act_sim)
+
+        act_mix = QAction("더빙 믹스 내보내기...", self)
+        act_mix.triggered.connect(self.export_mixdown)
+        menu.addAction(act_mix)
+
+        menu_audio = self.menuBar().addMenu("오디오")
+        act_calibrate = QAction("지연 보정 (루프백 측정)...", self)
+        act_calibrate.triggered.connect(self.show_calibration_dialog)
+        menu_audio.addAction(act_calibrate)
+
+        menu_storage = menu_audio.addMenu("녹음 저장 형식")
+        group_storage = QActionGroup(self)
+        for key, (name, _, _) in STORAGE_FORMATS.items():
+            act = QAction(name, self, checkable=True)
+            act.setChecked(key == self.storage_format)
+            act.triggered.connect(lambda checked, k=key: self.set_storage_format(k))
+            group_storage.addAction(act)
+            menu_storage.addAction(act)
+        act_trim = QAction("세션 폴더 무음 트림...", self)
+        act_trim.triggered.connect(self.trim_session_folder)
+        menu_audio.addAction(act_trim)
+
+        act_align = QAction("에피소드 테이크 자동 정렬 (가이드 기준)", self)
+        act_align.triggered.connect(self.align_episode)
+        menu_audio.addAction(act_align)
+
+        act_encode_all = QAction("기존 WAV 테이크 모두 변환", self)
+        act_encode_all.triggered.connect(self.encode_existing_takes)
+        menu_storage.addSeparator()
+        menu_storage.addAction(act_encode_all)
+
+        menu_help = self.menuBar().addMenu("도움말")
+        act_startup = QAction("시작 시간 보고서", self)
+        act_startup.triggered.connect(self.show_startup_report)
+        menu_help.addAction(act_startup)
+
+        self.diag_panel = DiagnosticsPanel(self)
+        self.diag_panel.setObjectName("DiagnosticsPanel")
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.diag_panel)
+        self.diag_panel.hide()
+        act_diag = self.diag_panel.toggleViewAction()
+        act_diag.setText("진단 패널 (틱/탐색/xrun 계측)")
+        act_diag.setShortcut("Ctrl+Shift+D")
+        act_diag.toggled.connect(self.set_diagnostics)
+        menu_help.addAction(act_diag)
+
+        # --------------------------------------------------------
+        # 백그라운드 로딩 (진행률 + 취소)
+        # --------------------------------------------------------
+        self.task_pool = QThreadPool(self)
+        self.task_pool.setMaxThreadCount(2)
+        self.tasks = {} # 종류 → 실행 중 BackgroundTask
+        self.task_generation = 0 # 작업마다 증가 (취소/대체된 작업의 늦은 결과 무시)
+
+        self.lbl_task = QLabel("")
+        self.task_progress = QProgressBar()
+        self.task_progress.setRange(0, 100)
+        self.task_progress.setMaximumWidth(220)
+        self.btn_task_cancel = QPushButton("취소")
+        self.btn_task_cancel.clicked.connect(self.cancel_tasks)
+        for w in (self.lbl_task, self.task_progress, self.btn_task_cancel):
+            self.statusBar().addPermanentWidget(w)
+            w.hide()
+
+        # 인코딩 큐 상태 (작업 중일 때만 1초마다 갱신)
+        self.lbl_encode = QLabel("")
+        self.statusBar().addPermanentWidget(self.lbl_encode)
+        self.lbl_encode.hide()
+        self.encode_timer = QTimer(self)
+        self.encode_timer.setInterval(1000)
+        self.encode_timer.timeout.connect(self.update_encode_status)
+
+        # Timer: 재생 중에만 동작 (일시정지/미로드 시 정지), 탐색·길이 변경은 시계 시그널로 즉시 갱신
         self.timer = QTimer()
+        self.timer.setInterval(self.SYNC_INTERVAL_MS)
         self.timer.timeout.connect(self.update_by_time)
-        self.timer.start(200)
+        self.player.clock.running_changed.connect(self._sync_running_changed)
+        self.player.clock.changed.connect(self.update_by_time)
 
         # --------------------------------------------------------
         # 포커스 설정 (키보드 이벤트가 QMainWindow로 오도록 강제 지정)
@@ -418,7 +3755,7 @@ class KingnuTool(QMainWindow):
         if key == Qt.Key.Key_Left or key == Qt.Key.Key_Right:
             
             # 1. 탐색 전 영상 일시정지 (컨트롤 개선)
-            if self.player.media_player.is_playing():
+            if self.player.is_playing():
                 self.player.stop() 
             
             current_time = self.player.get_time_sec()
@@ -434,6 +3771,10 @@ class KingnuTool(QMainWindow):
         elif key == Qt.Key.Key_Space:
             # 스페이스바: 재생/일시정지 토글
             self.player.toggle_play()
+
+        elif key == Qt.Key.Key_R:
+            # R: 현재 대사 펀치인 (녹음 중 다시 누르면 취소)
+            self.punch_in()
         
         elif key == Qt.Key.Key_Return or key == Qt.Key.Key_Enter:
             # 엔터 키 입력 시 수동 이동 실행
@@ -442,6 +3783,32 @@ class KingnuTool(QMainWindow):
 
         super().keyPressEvent(event) 
 
+    def show_startup_report(self):
+        QMessageBox.information(self, "시작 시간 보고서", STARTUP.report())
+
+    def set_diagnostics(self, on):
+        # 꺼져 있을 때는 타이머가 update_by_time 을 바로 호출 (계측 비용 없음)
+        if on == (self.player.clock.diag is not None):
+            return
+        if on:
+            if self.diag is None:
+                self.diag = SessionDiagnostics(self.SYNC_INTERVAL_MS)
+            self.timer.timeout.disconnect(self.update_by_time)
+            self.timer.timeout.connect(self._diag_tick)
+            self.player.clock.diag = self.diag
+            self.diag_panel.attach(self.diag)
+        else:
+            self.timer.timeout.disconnect(self._diag_tick)
+            self.timer.timeout.connect(self.update_by_time)
+            self.player.clock.diag = None
+            self.diag.tick_stopped()
+            self.diag_panel.detach()
+
+    def _diag_tick(self):
+        t0 = time.perf_counter()
+        self.update_by_time()
+        self.diag.tick(t0, time.perf_counter(), self.player.get_time_sec())
+
     # =============================================================
     # UI STYLING (QSS)
     # =============================================================
@@ -556,8 +3923,8 @@ class KingnuTool(QMainWindow):
                 border-radius: 4px;
             }
 
-            /* Table Widget */
-            QTableWidget {
+            /* Table View */
+            QTableView {
                 background-color: #1e1e1e;
                 color: #ffffff; 
                 gridline-color: #3e3e3e;
@@ -592,7 +3959,7 @@ class KingnuTool(QMainWindow):
             return
 
         dialog = QDialog(self)
-        dialog.setWindowTitle("전체 대사 목록 (화자 필터 및 더블클릭 이동)")
+        dialog.setWindowTitle("전체 대사 목록 (화자 필터 · 검색 및 더블클릭 이동)")
         dialog.resize(1000, 700)
         
         main_layout = QVBoxLayout(dialog)
@@ -605,415 +3972,1699 @@ class KingnuTool(QMainWindow):
         speakers = ["--전체보기--"] + sorted(list(self.speaker_colors.keys()))
         self.combo_speaker_filter.addItems(speakers)
 
+        # 대사/감정/톤 검색 (입력하는 대로 필터)
+        self.edit_dialogue_search = QLineEdit()
+        self.edit_dialogue_search.setPlaceholderText("대사 · 감정 · 톤 검색")
+        self.edit_dialogue_search.setClearButtonEnabled(True)
+
         filter_layout.addWidget(lbl_filter)
         filter_layout.addWidget(self.combo_speaker_filter)
-        filter_layout.addStretch()
+        filter_layout.addWidget(QLabel("검색:"))
+        filter_layout.addWidget(self.edit_dialogue_search, 1)
         main_layout.addLayout(filter_layout)
 
-        # --- 2. 테이블 위젯 ---
-        self.dialogue_table = QTableWidget() 
+        # --- 2. 테이블 (모델/뷰: 화면에 보이는 행만 렌더링) ---
+        self.dialogue_model = DialogueTableModel(self.dialogues_full, dialog)
+        self.dialogue_proxy = DialogueFilterProxy(dialog)
+        self.dialogue_proxy.setSourceModel(self.dialogue_model)
+
+        self.dialogue_table = QTableView()
+        self.dialogue_table.setModel(self.dialogue_proxy)
+        self.dialogue_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.dialogue_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         main_layout.addWidget(self.dialogue_table)
-        
-        # 초기 테이블 설정 및 데이터 로드
-        self._populate_dialogue_table("--전체보기--")
+
+        self._setup_dialogue_columns()
 
         # --- 3. 이벤트 연결 ---
         self.combo_speaker_filter.currentTextChanged.connect(self._handle_speaker_filter_change)
-        
-        # 더블클릭 이벤트 연결
-        self.dialogue_table.cellDoubleClicked.connect(
-            lambda row, col: self.seek_to_row_start_time_filtered(row, dialog)
+        self.edit_dialogue_search.textChanged.connect(self._handle_dialogue_search_change)
+
+        # 더블클릭 이벤트 연결 (프록시 인덱스 → 원본 행)
+        self.dialogue_table.doubleClicked.connect(
+            lambda index: self.seek_to_row_start_time_filtered(index, dialog)
         )
-        
+
         dialog.exec()
-        
-    def _populate_dialogue_table(self, filter_speaker):
+
+    def _setup_dialogue_columns(self):
         table = self.dialogue_table
-        
-        # 필터링 로직
-        if filter_speaker == "--전체보기--":
-            filtered_data = self.dialogues_full
-        else:
-            filtered_data = [
-                row for row in self.dialogues_full 
-                if row.get("화자") == filter_speaker
-            ]
-        
-        table.setRowCount(0) # 기존 내용 삭제
-        
-        column_names = list(self.dialogues_full[0].keys()) if self.dialogues_full else []
-        table.setColumnCount(len(column_names))
-        table.setHorizontalHeaderLabels(column_names)
-        
-        table.setRowCount(len(filtered_data))
-        
-        # 테이블 채우기
-        for row_idx, row_data in enumerate(filtered_data):
-            for col_idx, col_name in enumerate(column_names):
-                value = row_data.get(col_name)
-                
-                # 시작_초 컬럼도 출력
-                if col_name == "시작_초":
-                    value_str = f"{value:.3f}초" if value is not None else ""
-                elif value is None:
-                    value_str = ""
-                else:
-                    value_str = str(value)
-                    
-                item = QTableWidgetItem(value_str)
-                table.setItem(row_idx, col_idx, item)
 
-        # 컬럼 크기 조정
+        # 행 높이 고정 (행마다 크기 계산하지 않음)
+        vheader = table.verticalHeader()
+        vheader.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vheader.setDefaultSectionSize(vheader.fontMetrics().height() + 10)
+
+        # 컬럼 크기는 처음 일부 행만 보고 한 번 계산
         header = table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        
+        header.setResizeContentsPrecision(200)
+        table.resizeColumnsToContents()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+
         try:
-            dialogue_col_index = column_names.index("대사")
+            dialogue_col_index = self.dialogue_model.columns.index("대사")
             header.setSectionResizeMode(dialogue_col_index, QHeaderView.ResizeMode.Stretch)
         except ValueError:
             pass
-            
-        # 테이블에 현재 필터링된 데이터를 임시 저장 (더블클릭 탐색을 위해)
-        self.filtered_dialogues = filtered_data
-
 
     def _handle_speaker_filter_change(self, speaker_name):
-        self._populate_dialogue_table(speaker_name)
-        
-    def seek_to_row_start_time_filtered(self, row_index_in_table, dialog):
+        self.dialogue_proxy.set_speaker(None if speaker_name == "--전체보기--" else speaker_name)
+
+    def _handle_dialogue_search_change(self, text):
+        self.dialogue_proxy.set_search_rows(self.search_index.search(text))
+
+    def seek_to_row_start_time_filtered(self, proxy_index, dialog):
         try:
-            # 테이블의 인덱스가 아니라 self.filtered_dialogues 리스트의 인덱스 사용
-            start_sec = self.filtered_dialogues[row_index_in_table]["시작_초"]
+            # 필터된 테이블의 행이 아니라 원본(dialogues_full) 행으로 변환
+            source_row = self.dialogue_proxy.mapToSource(proxy_index).row()
+            start_sec = self.dialogues_full[source_row]["시작_초"]
             self.player.set_time_sec(start_sec)
             dialog.accept()
-                
+
         except (IndexError, KeyError, TypeError) as e:
             QMessageBox.warning(self, "오류", f"해당 행의 시작 시간을 찾을 수 없습니다: {e}")
 
     # =============================================================
-    # LOAD VIDEO (동일)
+    # BACKGROUND TASKS
+    # =============================================================
+    def run_task(self, kind, title, fn, on_done, on_error):
+        # 같은 종류의 이전 작업은 취소 (결과는 무시됨)
+        prev = self.tasks.get(kind)
+        if prev is not None:
+            prev.cancel()
+
+        task = BackgroundTask(fn)
+        self.task_generation += 1
+        task.generation = self.task_generation
+        self.tasks[kind] = task
+        task.signals.progress.connect(lambda p, text: self._task_progress(task, title, p, text))
+        task.signals.finished.connect(lambda result: self._task_finished(kind, task, on_done, result))
+        task.signals.failed.connect(lambda e: self._task_finished(kind, task, on_error, e))
+        task.signals.cancelled.connect(lambda: self._task_finished(kind, task, None, None))
+
+        self._task_progress(task, title, 0, "대기 중")
+        self.task_pool.start(task)
+
+    def _task_progress(self, task, title, percent, text):
+        if task not in self.tasks.values():
+            return
+        self.lbl_task.setText(f"{title}: {text}")
+        self.task_progress.setValue(percent)
+        for w in (self.lbl_task, self.task_progress, self.btn_task_cancel):
+            w.show()
+
+    def _task_finished(self, kind, task, callback, value):
+        current = self.tasks.get(kind)
+        if current is None or current.generation != task.generation:
+            return # 취소되었거나 새 작업으로 대체됨
+        del self.tasks[kind]
+        if not self.tasks:
+            self._hide_task_ui()
+        if callback is None:
+            self.statusBar().showMessage("작업이 취소되었습니다.", 3000)
+        else:
+            callback(value)
+
+    def _hide_task_ui(self):
+        for w in (self.lbl_task, self.task_progress, self.btn_task_cancel):
+            w.hide()
+
+    def cancel_tasks(self):
+        # pd.read_excel 처럼 report 를 부르지 않는 작업도 있으므로 기다리지 않고 바로 목록에서 제외
+        # (작업 스레드는 끝까지 돌지만 결과는 세대 확인에서 버려짐)
+        for task in self.tasks.values():
+            task.cancel()
+        if self.tasks:
+            self.tasks.clear()
+            self._hide_task_ui()
+            self.statusBar().showMessage("작업이 취소되었습니다.", 3000)
+
+    # =============================================================
+    # LOAD VIDEO (백그라운드)
     # =============================================================
     def load_video(self):
         path, _ = QFileDialog.getOpenFileName(
             self, "영상 선택", "", "Video (*.mp4 *.mkv *.avi *.mov)"
         )
         if path:
-            self.player.load_video(path)
-            QMessageBox.information(self, "완료", "영상 로드 완료!")
+            self.run_task(
+                "video", "영상 로드",
+                lambda report: (path, self.player.vlc_backend.prepare(path)),
+                self._video_loaded,
+                lambda e: QMessageBox.critical(self, "오류", f"영상 로드 실패 (VLC 초기화 오류): {e}"),
+            )
+
+    def start_simulated_playback(self):
+        # 대본 싱크만 배속 재생 (영상/libvlc 없이 큐 타이밍 확인)
+        if not self.dialogues_full:
+            QMessageBox.warning(self, "경고", "엑셀 대본을 먼저 불러오세요.")
+            return
+        rate, ok = QInputDialog.getDouble(self, "가상 시계", "재생 배속 (1 ~ 100):", 10.0, 1.0, SimulatedBackend.MAX_RATE, 1)
+        if not ok:
+            return
+        self.player.set_backend(SimulatedBackend(replay_length_sec(self.dialogues_full), rate))
+        self.player.attach_media(None)
+        self.player.toggle_play()
+        self.statusBar().showMessage(f"가상 시계 ×{rate:g} 재생 (영상 불러오기로 VLC 복귀)", 5000)
+
+    def _video_loaded(self, loaded):
+        self.video_path, media = loaded
+        self.player.set_backend(self.player.vlc_backend)
+        self.player.attach_media(media)
+        self.statusBar().showMessage("영상 로드 완료!", 3000)
 
     # =============================================================
-    # LOAD EXCEL (동일)
+    # LOAD EXCEL (백그라운드, 완료 시 한 번에 교체)
     # =============================================================
     def load_excel(self):
         path, _ = QFileDialog.getOpenFileName(self, "엑셀 선택", "", "Excel (*.xlsx)")
         if not path:
             return
 
-        try:
-            df = pd.read_excel(path)
-
-            rename = {
-                " 시작": "시작", "시작 ": "시작",
-                " 끝": "끝", "끝 ": "끝",
-                " 화자": "화자", "화자 ": "화자",
-                " 대사": "대사", "대사 ": "대사",
-            }
-            df.rename(columns=rename, inplace=True)
-
-            if not all(x in df.columns for x in ["시작", "화자", "대사"]):
-                QMessageBox.warning(self, "오류", "엑셀 양식이 잘못되었습니다: 필수 컬럼(시작, 화자, 대사)이 없습니다.")
-                return
-
-            df["시작_초"] = df["시작"].apply(self.to_sec)
-            df = df.sort_values(by="시작_초")
-
-            self.dialogues_full = df.to_dict("records")
-            self.dialogues_primary = self.build_primary(self.dialogues_full) # 기존 알고리즘 유지
-            self.assign_colors()
+        # 변경 없는 파일은 디스크 캐시에서 바로 로드
+        cache = self.script_cache
+        self.run_task(
+            "excel", "엑셀 로드",
+            lambda report: load_script_bundle(path, cache, report),
+            self.apply_script,
+            self._excel_failed,
+        )
 
-            QMessageBox.information(self, "완료", "엑셀 로드 완료!")
-        except Exception as e:
+    def apply_script(self, bundle):
+        # GUI 스레드에서 한 번에 교체 (타이머 틱 사이에 원자적으로)
+        self.dialogues_full = bundle.full
+        self.dialogues_primary = bundle.primary
+        self.cue_index = bundle.cue_index
+        self.search_index = bundle.search_index
+        self.speaker_colors = bundle.speaker_colors
+        self.script_path = bundle.path
+        self.renderer.set_palette(self.speaker_colors)
+        self.player.timeline.set_cues(self.dialogues_full, self.speaker_colors)
+        self.update_by_time()
+        self.statusBar().showMessage("엑셀 로드 완료!", 3000)
+
+    def _excel_failed(self, e):
+        if isinstance(e, ScriptFormatError):
+            QMessageBox.warning(self, "오류", f"엑셀 양식이 잘못되었습니다: {e}")
+        else:
             QMessageBox.critical(self, "치명적 오류", f"엑셀 파일을 처리하는 중 예기치 않은 오류가 발생했습니다: {e}")
 
     # =============================================================
-    # SRT → EXCEL (동일)
+    # SRT → EXCEL (백그라운드)
     # =============================================================
     def strip_html(self, text):
-        return re.sub(r"<[^>]*>", "", text)
+        return strip_html(text)
 
     def load_srt(self):
         path, _ = QFileDialog.getOpenFileName(self, "SRT 선택", "", "SRT (*.srt)")
         if not path:
             return
 
-        subs = []
-        cur = {"start": "", "end": "", "text": ""}
-
-        with open(path, encoding="utf-8") as f:
-            lines = f.read().splitlines()
-
-        for line in lines:
-            line = line.strip()
-
-            if line.isdigit():
-                if cur["text"]:
-                    subs.append(cur)
-                cur = {"start": "", "end": "", "text": ""}
-                continue
-
-            if "-->" in line:
-                s, e = line.split("-->")
-                cur["start"] = s.strip().replace(",", ".")
-                cur["end"] = e.strip().replace(",", ".")
-                continue
-
-            if line:
-                clean = self.strip_html(line)
-                cur["text"] += (" " if cur["text"] else "") + clean
-
-        if cur["text"]:
-            subs.append(cur)
-
-        df = pd.DataFrame([{
-            "시작": x["start"],
-            "끝": x["end"],
-            "화자": "",
-            "대사": x["text"],
-            "감정": "",
-            "톤": ""
-        } for x in subs])
-
         save, _ = QFileDialog.getSaveFileName(self, "엑셀 저장", "", "Excel (*.xlsx)")
-        if save:
-            df.to_excel(save, index=False)
-            QMessageBox.information(self, "완료", "SRT → 엑셀 변환 성공!")
+        if not save:
+            return
+
+        self.run_task(
+            "srt", "SRT 변환",
+            lambda report: convert_srt_to_excel(path, save, report),
+            lambda count: QMessageBox.information(self, "완료", f"SRT → 엑셀 변환 성공! ({count}개 대사)"),
+            lambda e: QMessageBox.warning(self, "오류", f"SRT 변환 실패: {e}"),
+        )
 
     # =============================================================
     # RECORDING (경로 수정 적용)
     # =============================================================
     def start_record(self):
-        self.rec.start()
+        try:
+            save_path = new_take_path()
+
+            # 녹음 중 바로 파일로 기록 (스트리밍), 영상 타임라인 위치 함께 기록
+            # 현재 대사에 자동 연결 (대본이 없거나 첫 대사 전이면 연결 없음)
+            self.apply_latency_profile()
+            self.rec.start(save_path, self.player.get_time_sec, self.current_cue_tags())
+        except Exception as e:
+            QMessageBox.warning(self, "오류", f"녹음 시작 실패: {e}")
+            return
         QMessageBox.information(self, "녹음", "녹음을 시작합니다!")
 
     def stop_record(self):
+        if self.punch is not None:
+            self.finish_punch()
+            return
         try:
-            data = self.rec.stop()
+            take = self.rec.stop()
+            self.store_take(take)
+            QMessageBox.information(self, "저장", f"녹음 저장 완료!\n{take['path']}")
+        except Exception as e:
+            QMessageBox.warning(self, "오류", f"녹음 종료 및 저장 실패: {e}\n(재시도하거나 권한을 확인해주세요.)")
 
-            now = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"record_{now}.wav"
+    # =============================================================
+    # PUNCH-IN (대사 구간만 자동 녹음, 핫패스에 대화상자 없음)
+    # =============================================================
+    def cue_end_sec(self, idx):
+        row = self.dialogues_full[idx]
+        start = row["시작_초"]
+        end = to_sec(row.get("끝", 0))
+        if end > start:
+            return end
+        if idx + 1 < len(self.dialogues_full) and self.dialogues_full[idx + 1]["시작_초"] > start:
+            return self.dialogues_full[idx + 1]["시작_초"]
+        return start + TimelineView.DEFAULT_CUE_SEC
+
+    def punch_in(self):
+        # 다시 누르면 취소
+        if self.punch is not None:
+            self.finish_punch(keep=False)
+            return
+        if self.rec.is_recording() or not self.player.is_ready():
+            return
 
-            # 저장 경로 설정 (사용자 문서 폴더)
-            home_dir = os.path.expanduser("~")
-            save_folder = os.path.join(home_dir, "Documents", "KingnuDubbingTool_Recordings")
-            
-            if not os.path.exists(save_folder):
-                os.makedirs(save_folder)
-                
-            save_path = os.path.join(save_folder, filename)
+        tags = self.current_cue_tags()
+        if not tags:
+            if not self.dialogues_full:
+                self.statusBar().showMessage("펀치인: 대본을 먼저 불러오세요.", 3000)
+                return
+            # 첫 대사 전이면 첫 대사
+            self.player.set_time_sec(self.dialogues_full[0]["시작_초"])
+            tags = self.current_cue_tags()
+
+        idx = tags["cue"]
+        start = tags["cue_start_sec"]
+        end = self.cue_end_sec(idx)
+        path = new_take_path(f"_cue{idx + 1:05d}")
 
-            sf.write(save_path, data, self.rec.fs)
-            QMessageBox.information(self, "저장", f"녹음 저장 완료!\n{save_path}")
+        # 먼저 프리롤 위치로 탐색한 뒤 녹음 준비 (첫 콜백이 이전 재생 위치를 보지 않도록)
+        self.player.set_time_sec(start - self.player.spin_preroll.value())
+        try:
+            # 입력 스트림은 프리롤 동안 미리 열어 두고, 구간 밖 샘플은 콜백에서 버림
+            self.apply_latency_profile()
+            self.rec.start(path, self.player.get_time_sec, tags, window=(start, end), latency="low")
         except Exception as e:
-            QMessageBox.warning(self, "오류", f"녹음 종료 및 저장 실패: {e}\n(재시도하거나 권한을 확인해주세요.)")
+            self.statusBar().showMessage(f"펀치인 실패: {e}", 5000)
+            return
 
-    def play_record(self):
+        self.punch = {"cue": idx, "start": start, "end": end}
+        self.publish_punch_clock()
+        if not self.player.is_playing():
+            self.player.toggle_play()
+        self.statusBar().showMessage(f"🎯 펀치인 #{idx + 1}  {start:.2f}s ~ {end:.2f}s")
+
+    def check_punch(self):
+        # 타이머 틱/탐색마다 호출: 콜백용 영상 위치 발행 + Event 확인
+        if self.punch is None:
+            return
+        if self.rec.punch_done.is_set():
+            self.finish_punch()
+        else:
+            self.publish_punch_clock()
+
+    def publish_punch_clock(self):
+        clock = self.player.clock
+        self.rec.publish_video_clock(clock.now_ms() / 1000, clock.rate if clock.playing else 0.0)
+
+    def finish_punch(self, keep=True):
+        punch, self.punch = self.punch, None
+        if self.player.is_playing():
+            self.player.stop()
         try:
-            # 기본 경로 설정 (KingnuDubbingTool_Recordings 폴더)
-            home_dir = os.path.expanduser("~")
-            app_path = os.path.join(home_dir, "Documents", "KingnuDubbingTool_Recordings")
+            take = self.rec.stop()
+        except Exception as e:
+            self.statusBar().showMessage(f"펀치인 저장 실패: {e}", 5000)
+            return
 
-            if not os.path.exists(app_path):
-                os.makedirs(app_path, exist_ok=True)
+        if keep and take["frames"] > 0:
+            self.store_take(take)
+            self.statusBar().showMessage(
+                f"✔ #{punch['cue'] + 1} 테이크 저장 ({take['duration_sec']:.2f}초) - R 로 다시 녹음", 5000
+            )
+        else:
+            for p in (take["path"], take_sidecar_path(take["path"])):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            self.statusBar().showMessage("펀치인 취소", 3000)
 
-            file_path, _ = QFileDialog.getOpenFileName(
-                self,
-                "재생할 WAV 파일 선택",
-                app_path, # 기본 경로로 설정
-                "WAV 파일 (*.wav)"
+        # 같은 대사 시작으로 돌아가 바로 다시 녹음할 수 있게
+        self.player.set_time_sec(punch["start"])
+
+    # =============================================================
+    # LATENCY CALIBRATION (장치별 왕복 지연 → 새 테이크 자동 오프셋)
+    # =============================================================
+    def apply_latency_profile(self):
+        try:
+            key = audio_device_key()
+        except Exception:
+            key = None
+        self.rec.set_latency_profile(key, self.latency_profiles.offset_for(key) if key else 0.0)
+
+    def show_calibration_dialog(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("지연 보정 (루프백)")
+        dialog.resize(620, 360)
+        layout = QVBoxLayout(dialog)
+
+        layout.addWidget(QLabel("출력을 입력으로 연결(루프백 케이블 또는 스피커 앞 마이크)한 뒤 측정하세요."))
+        row = QHBoxLayout()
+        combo_device = QComboBox()
+        combo_device.addItems(["현재 오디오 장치", "시뮬레이션 장치"])
+        spin_sim = QDoubleSpinBox()
+        spin_sim.setRange(0.0, 500.0)
+        spin_sim.setValue(85.0)
+        spin_sim.setSuffix(" ms (시뮬레이션)")
+        btn_measure = QPushButton("측정")
+        row.addWidget(combo_device)
+        row.addWidget(spin_sim)
+        row.addWidget(btn_measure)
+        layout.addLayout(row)
+
+        lbl_result = QLabel("-")
+        lbl_result.setWordWrap(True)
+        layout.addWidget(lbl_result)
+
+        profiles_list = QListWidget()
+        layout.addWidget(profiles_list)
+
+        def refresh():
+            profiles_list.clear()
+            for key, p in sorted(self.latency_profiles.profiles.items()):
+                profiles_list.addItem(
+                    f"{key}  ·  {p['round_trip_sec'] * 1000:.1f} ms  (±{p['spread_sec'] * 1000:.1f}, 상관 {p['confidence']:.2f}, {p['measured']})"
+                )
+
+        def measured(result):
+            key, profile = result
+            self.latency_profiles.set(key, profile)
+            lbl_result.setText(
+                f"{key}\n왕복 지연 {profile['round_trip_sec'] * 1000:.1f} ms · 새 테이크는 이만큼 앞당겨 배치됩니다."
             )
+            btn_measure.setEnabled(True)
+            refresh()
+
+        def failed(e):
+            lbl_result.setText(f"측정 실패: {e}")
+            btn_measure.setEnabled(True)
+
+        def run():
+            if combo_device.currentIndex() == 1:
+                device = SimulatedLoopbackDevice(spin_sim.value() / 1000)
+            else:
+                device = LoopbackDevice()
+            btn_measure.setEnabled(False)
+            lbl_result.setText("측정 중...")
+            self.run_task(
+                "calibrate", "지연 측정",
+                lambda report: (device.key, measure_round_trip(device, report=report)),
+                measured, failed,
+            )
+
+        btn_measure.clicked.connect(run)
+        refresh()
+        dialog.exec()
+
+    # =============================================================
+    # MIXDOWN (선택 테이크 → WAV/FLAC, 가이드 덕킹, 화자별 스템)
+    # =============================================================
+    def export_mixdown(self):
+        if not self.script_path:
+            QMessageBox.information(self, "믹스", "대본(엑셀)을 먼저 불러오세요.")
+            return
+        takes = self.takes().selected_for_script(self.script_path)
+        if not takes:
+            QMessageBox.information(self, "믹스", "이 대본에 연결된 테이크가 없습니다.")
+            return
 
-            if not file_path:
+        save, _ = QFileDialog.getSaveFileName(self, "믹스 저장", "", "FLAC (*.flac);;WAV (*.wav)")
+        if not save:
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("믹스 옵션")
+        form = QFormLayout(dialog)
+        chk_duck = QCheckBox("영상 오디오(가이드)를 깔고 대사 구간 덕킹")
+        chk_duck.setEnabled(bool(self.video_path))
+        spin_duck = QDoubleSpinBox()
+        spin_duck.setRange(-60.0, 0.0)
+        spin_duck.setValue(-12.0)
+        spin_duck.setSuffix(" dB")
+        chk_stems = QCheckBox("화자별 스템도 내보내기 (병렬)")
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(QLabel(f"테이크 {len(takes)}개 (대사별 선택 테이크, 없으면 최신)"))
+        form.addRow(chk_duck)
+        form.addRow("덕킹 양", spin_duck)
+        form.addRow(chk_stems)
+        form.addRow(buttons)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        video_path = self.video_path if chk_duck.isChecked() else None
+        duck_db = spin_duck.value()
+        stems_dir = os.path.splitext(save)[0] + "_stems" if chk_stems.isChecked() else None
+
+        def work(report):
+            reference = ensure_guide_audio(video_path, report) if video_path else None
+            jobs = build_mix_jobs(takes, save, reference, duck_db, stems_dir)
+            return render_mix_jobs(jobs, report=report)
+
+        def done(results):
+            main = next(r for r in results if r["output"] == save)
+            warn = f" · 클리핑 {main['clipped_samples']}샘플" if main["clipped_samples"] else ""
+            self.statusBar().showMessage(
+                f"믹스 완료: {os.path.basename(save)} ({main['duration_sec'] / 60:.1f}분, 파일 {len(results)}개, {main['seconds']:.1f}s){warn}",
+                8000,
+            )
+
+        self.run_task("mixdown", "믹스", work, done, lambda e: QMessageBox.warning(self, "오류", f"믹스 실패:\n{e}"))
+
+    # =============================================================
+    # WAVEFORM (녹음 테이크 / 영상 오디오)
+    # =============================================================
+    def show_waveform_dialog(self):
+        if self.peak_cache is None:
+            self.peak_cache = PeakCache()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("파형 보기 (휠: 확대/축소, 드래그: 이동)")
+        dialog.resize(1100, 520)
+        layout = QHBoxLayout(dialog)
+
+        files = QListWidget()
+        files.setMaximumWidth(320)
+        if self.video_path:
+            item = QListWidgetItem("🎬 영상 오디오 (가이드)")
+            item.setData(Qt.ItemDataRole.UserRole, ("video", self.video_path))
+            files.addItem(item)
+        folder = recordings_dir()
+        for name in sorted(os.listdir(folder), reverse=True):
+            if name.lower().endswith((".wav", ".flac")):
+                item = QListWidgetItem(name)
+                item.setData(Qt.ItemDataRole.UserRole, ("take", os.path.join(folder, name)))
+                files.addItem(item)
+
+        right = QVBoxLayout()
+        lbl_state = QLabel("왼쪽 목록에서 파일을 선택하세요.")
+        view = WaveformView()
+        right.addWidget(lbl_state)
+        right.addWidget(view, 1)
+        layout.addWidget(files)
+        layout.addLayout(right, 1)
+
+        def build(kind, path, report):
+            if kind == "video":
+                path = ensure_guide_audio(path, report)
+            return self.peak_cache.get_or_build(path, report)
+
+        def shown(pyramid, name):
+            view.set_pyramid(pyramid)
+            lbl_state.setText(f"{name} · {pyramid.duration:.2f}초 · {pyramid.sample_rate} Hz")
+
+        def selected(item):
+            if item is None:
                 return
+            kind, path = item.data(Qt.ItemDataRole.UserRole)
+            lbl_state.setText(f"{item.text()} · 파형 준비 중...")
+            self.run_task(
+                "peaks", "파형",
+                lambda report: build(kind, path, report),
+                lambda pyramid: shown(pyramid, item.text()),
+                lambda e: lbl_state.setText(f"파형 생성 실패: {e}"),
+            )
+
+        files.currentItemChanged.connect(lambda cur, prev: selected(cur))
+        dialog.exec()
+
+    def takes(self):
+        if self.take_store is None:
+            self.take_store = TakeStore()
+        return self.take_store
+
+    def store_take(self, take):
+        self.takes().add(take)
+        if self.player.clock.diag is not None:
+            self.diag.note_take(take)
+        xruns = take.get("input_overflows", 0) + take.get("input_underflows", 0)
+        if xruns:
+            self.statusBar().showMessage(f"⚠ 입력 오버플로/언더플로 {xruns}회 - 테이크에 끊김이 있을 수 있습니다.", 8000)
+        self.encoder.submit(take["path"], self.storage_format)
+        self.update_encode_status()
+
+    def align_one_take(self, take, on_applied):
+        video_path = self.video_path
+
+        def work(report):
+            reference = ensure_guide_audio(video_path, report)
+            _, path, placed, _, in_sec, out_sec = take_align_job(take, reference)
+            return align_take(path, placed, reference, in_sec, out_sec)
+
+        def done(r):
+            answer = QMessageBox.question(
+                self, "정렬 제안",
+                f"{os.path.basename(take['path'])}\n{r['delta_sec'] * 1000:+.0f} ms 이동 제안 (신뢰도 {r['confidence']:.2f})\n적용할까요?",
+            )
+            if answer == QMessageBox.StandardButton.Yes:
+                apply_alignment(self.takes(), take, r)
+                on_applied()
 
-            data, fs = sf.read(file_path, dtype="float32")
-            sd.play(data, fs)
-            QMessageBox.information(self, "재생", f"재생 중:\n{file_path}")
+        self.run_task("align", "정렬", work, done, lambda e: QMessageBox.warning(self, "오류", f"정렬 실패:\n{e}"))
+
+    def align_episode(self):
+        if not self.script_path or not self.video_path:
+            QMessageBox.information(self, "정렬", "대본과 영상을 먼저 불러오세요.")
+            return
+        takes = self.takes().selected_for_script(self.script_path)
+        video_path = self.video_path
+        by_id = {t["id"]: t for t in takes}
+
+        def work(report):
+            reference = ensure_guide_audio(video_path, report)
+            return align_session(takes, reference, report=report)
+
+        def done(results):
+            store = self.takes()
+            applied = 0
+            for r in results:
+                if r["ok"] and r["align"]["confidence"] >= ALIGN_MIN_CONFIDENCE:
+                    apply_alignment(store, by_id[r["take_id"]], r["align"])
+                    applied += 1
+            low = sum(r["ok"] and r["align"]["confidence"] < ALIGN_MIN_CONFIDENCE for r in results)
+            self.statusBar().showMessage(
+                f"자동 정렬: {applied}개 적용 · 신뢰도 낮음 {low}개 (그대로 둠) · 실패 {sum(not r['ok'] for r in results)}개",
+                8000,
+            )
+
+        self.run_task("align", "에피소드 정렬", work, done, lambda e: QMessageBox.warning(self, "오류", f"정렬 실패:\n{e}"))
+
+    def trim_session_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "세션 폴더 선택", recordings_dir())
+        if not folder:
+            return
+        t0 = time.perf_counter()
+
+        def done(results):
+            store = self.takes()
+            ok = [r for r in results if r["ok"]]
+            for r in ok:
+                store.set_trim(r["path"], r["trim"]["start_sec"], r["trim"]["end_sec"])
+            audio = sum(r["trim"]["duration_sec"] for r in ok)
+            cut = sum(r["trim"]["duration_sec"] - (r["trim"]["end_sec"] - r["trim"]["start_sec"])
+                      for r in ok if r["trim"]["speech"])
+            self.statusBar().showMessage(
+                f"트림 완료: 파일 {len(ok)}/{len(results)} · 무음 {cut:.1f}초 · 실시간 대비 {audio / max(time.perf_counter() - t0, 1e-9):.0f}배",
+                8000,
+            )
+
+        self.run_task(
+            "trim", "무음 트림",
+            lambda report: trim_session([folder], report=report),
+            done, lambda e: QMessageBox.warning(self, "오류", f"트림 실패:\n{e}"),
+        )
+
+    def set_storage_format(self, key):
+        self.storage_format = key
+        self.rec.subtype = STORAGE_FORMATS[key][1]
+        self.settings.setValue("storage_format", key)
+
+    def encode_existing_takes(self):
+        if STORAGE_FORMATS[self.storage_format][2] is None:
+            QMessageBox.information(self, "변환", "오디오 > 녹음 저장 형식에서 FLAC 또는 24-bit 를 먼저 고르세요.")
+            return
+        with self.takes().lock:
+            paths = [r[0] for r in self.take_store.db.execute("SELECT path FROM takes WHERE path LIKE '%.wav'")]
+        for path in paths:
+            if os.path.exists(path) and not path.endswith("_24bit.wav"):
+                self.encoder.submit(path, self.storage_format)
+        self.update_encode_status()
+
+    def update_encode_status(self):
+        st = self.encoder.stats()
+        if not st["pending"] and not st["current"]:
+            self.encode_timer.stop()
+            if st["done"] or st["failed"]:
+                fail = f" · 실패 {st['failed']}" if st["failed"] else ""
+                self.lbl_encode.setText(f"🗜 변환 완료 {st['done']} · {st['saved_ratio'] * 100:.0f}% 절약{fail}")
+            return
+        if not self.encode_timer.isActive():
+            self.encode_timer.start()
+        self.lbl_encode.show()
+        self.lbl_encode.setText(
+            f"🗜 테이크 처리 대기 {st['pending']} · {st['mb_per_sec']:.1f} MB/s · 완료 {st['done']} · {st['saved_ratio'] * 100:.0f}% 절약"
+        )
+
+    def current_cue_tags(self):
+        if not self.dialogues_full:
+            return {}
+        idx, _ = self.cue_index.locate(self.player.get_time_sec())
+        if idx == -1:
+            return {}
+        row = self.dialogues_full[idx]
+        return {
+            "script": self.script_path,
+            "cue": idx,
+            "cue_start_sec": row["시작_초"],
+            "cue_key": cue_key(row["시작_초"], _plain_value(row["대사"])),
+            "speaker": _plain_value(row["화자"]),
+            "line": _plain_value(row["대사"]),
+        }
+
+    def play_record(self):
+        # 테이크 목록 (현재 대사 / 현재 화자 / 대본 전체) - 색인 조회
+        store = self.takes()
+        tags = self.current_cue_tags()
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("테이크 목록 (더블클릭: 영상과 함께 미리듣기)")
+        dialog.resize(900, 500)
+        layout = QVBoxLayout(dialog)
+
+        top = QHBoxLayout()
+        combo_scope = QComboBox()
+        scopes = []
+        if tags:
+            scopes.append((f"현재 대사 #{tags['cue'] + 1}", lambda: store.for_cue(self.script_path, tags["cue_key"])))
+            scopes.append((f"현재 화자: {tags['speaker']}", lambda: store.for_speaker(self.script_path, tags["speaker"])))
+        if self.script_path:
+            scopes.append(("이 대본 전체", lambda: store.for_script(self.script_path)))
+        scopes.append(("대사 연결 없음", store.unattached))
+        combo_scope.addItems([name for name, _ in scopes])
+        btn_file = QPushButton("파일에서 열기...")
+        top.addWidget(QLabel("범위:"))
+        top.addWidget(combo_scope, 1)
+        top.addWidget(btn_file)
+        layout.addLayout(top)
+
+        takes_list = QListWidget()
+        layout.addWidget(takes_list)
+        bottom = QHBoxLayout()
+        btn_select = QPushButton("✔ 믹스에 쓸 테이크로 선택")
+        combo_orig = QComboBox()
+        combo_orig.addItems(["미리듣기: 원본 음소거", "미리듣기: 원본 줄이기"])
+        btn_align = QPushButton("🎯 가이드에 맞추기")
+        btn_align.setEnabled(bool(self.video_path))
+        bottom.addWidget(btn_select)
+        bottom.addWidget(btn_align)
+        bottom.addWidget(combo_orig)
+        layout.addLayout(bottom)
+
+        def refresh(i):
+            takes_list.clear()
+            for t in scopes[i][1]():
+                cue = f"#{t['cue'] + 1}" if t["cue"] is not None else "-"
+                dur = f"{t['duration_sec']:.1f}초" if t["duration_sec"] else ""
+                item = QListWidgetItem(f"{t['created'] or ''}  {cue}  {t['speaker'] or ''}  {dur}  {t['line'] or os.path.basename(t['path'])}")
+                if t["selected"]:
+                    item.setText("✔ " + item.text())
+                if t["offset_sec"]:
+                    item.setText(item.text() + f"  [{t['offset_sec'] * 1000:+.0f} ms]")
+                item.setData(Qt.ItemDataRole.UserRole, t)
+                takes_list.addItem(item)
+
+        def play(item):
+            take = item.data(Qt.ItemDataRole.UserRole)
+            if self.player.is_ready() and take["video_start_sec"] is not None:
+                self.preview_take(take, combo_orig.currentIndex() == 1)
+            else:
+                self.play_take(take["path"])
+
+        def select_take():
+            item = takes_list.currentItem()
+            if item is not None and item.data(Qt.ItemDataRole.UserRole)["cue"] is not None:
+                store.select(item.data(Qt.ItemDataRole.UserRole)["id"])
+                refresh(combo_scope.currentIndex())
+
+        def align_current():
+            item = takes_list.currentItem()
+            if item is not None:
+                self.align_one_take(item.data(Qt.ItemDataRole.UserRole), lambda: refresh(combo_scope.currentIndex()))
+
+        def open_file():
+            file_path, _ = QFileDialog.getOpenFileName(
+                dialog, "재생할 WAV 파일 선택", recordings_dir(), "WAV 파일 (*.wav)"
+            )
+            if file_path:
+                self.play_take(file_path)
+
+        combo_scope.currentIndexChanged.connect(refresh)
+        takes_list.itemDoubleClicked.connect(play)
+        btn_file.clicked.connect(open_file)
+        btn_select.clicked.connect(select_take)
+        btn_align.clicked.connect(align_current)
+        refresh(0)
+        dialog.exec()
+
+    def play_take(self, file_path):
+        # 영상과 무관하게 테이크만 (디스크에서 스트리밍)
+        self.stop_preview()
+        try:
+            self.take_player.start(file_path)
+            self.statusBar().showMessage(f"재생 중: {os.path.basename(file_path)}", 3000)
         except Exception as e:
             QMessageBox.warning(self, "오류", f"재생 실패:\n{e}")
 
+    # =============================================================
+    # TAKE PREVIEW (영상 위치에 맞춰 테이크 재생, 원본 음소거/줄이기)
+    # =============================================================
+    PREVIEW_LEAD_SEC = 1.0 # 테이크 앞 여유 (VLC 재생 시작 지연 흡수)
+    PREVIEW_DUCK_VOLUME = 25
+
+    def preview_take(self, take, duck=False):
+        self.stop_preview()
+        backend = self.player.backend
+        start = take_timeline_sec(take)
+        # 먼저 테이크 앞으로 이동한 뒤 출력 스트림을 열고, 영상 시계가 start 에 닿는 블록부터 소리 냄
+        self.player.set_time_sec(start - self.PREVIEW_LEAD_SEC)
+        try:
+            self.take_player.start(take["path"], start)
+        except Exception as e:
+            self.statusBar().showMessage(f"미리듣기 실패: {e}", 5000)
+            return
+        self.publish_preview_clock()
+
+        self.preview = {"volume": backend.get_volume()}
+        backend.set_volume(self.PREVIEW_DUCK_VOLUME if duck else 0)
+        if not self.player.is_playing():
+            self.player.toggle_play()
+        self.statusBar().showMessage(f"▶ 미리듣기: {os.path.basename(take['path'])}")
+
+    def publish_preview_clock(self):
+        clock = self.player.clock
+        self.take_player.publish_video_clock(clock.now_ms() / 1000, clock.rate if clock.playing else 0.0)
+
+    def check_preview(self):
+        # 타이머 틱/탐색마다 호출: 콜백용 영상 위치 발행, 테이크가 끝나면 원본 소리 복구 + 정지
+        if self.preview is None:
+            return
+        if not self.take_player.done.is_set():
+            self.publish_preview_clock()
+            return
+        err = self.take_player.sync_error
+        self.stop_preview()
+        if self.player.is_playing():
+            self.player.stop()
+        if err is not None:
+            self.statusBar().showMessage(f"미리듣기 끝 (시작 정렬 보정 {err * 1000:+.1f} ms)", 4000)
+
+    def stop_preview(self):
+        self.take_player.stop()
+        if self.preview is not None:
+            preview, self.preview = self.preview, None
+            if self.player.is_ready():
+                self.player.backend.set_volume(preview["volume"])
+
     # =============================================================
     # SYNC (현재 화자 모든 대사 출력 로직 유지)
     # =============================================================
     def to_sec(self, t):
-        try:
-            if isinstance(t, (float, int)):
-                return float(t)
-            
-            parts = str(t).split(":")
-            if len(parts) == 3:
-                h, m, s = parts
-                return int(h)*3600 + int(m)*60 + float(s)
-            elif len(parts) == 2:
-                m, s = parts
-                return int(m)*60 + float(s)
-            else:
-                return 0.0
-        except:
-            return 0.0
+        return to_sec(t)
 
     def build_primary(self, full): # 기존 알고리즘 유지
-        result = []
-        prev = None
-        for r in full:
-            if r["화자"] != prev:
-                result.append(r)
-                prev = r["화자"]
-        return result
+        return build_primary(full)
 
     def assign_colors(self):
-        pal = [
-            "#FF6B6B","#4ECDC4","#45B7D1","#FFA600",
-            "#6A4C93","#1982C4","#8E5572","#9BC53D",
-            "#F94144","#577590","#D8572A"
-        ]
-        i = 0
-        self.speaker_colors = {}
+        self.speaker_colors = build_speaker_colors(self.dialogues_full)
 
-        for r in self.dialogues_full:
-            s = r["화자"]
-            if s not in self.speaker_colors:
-                self.speaker_colors[s] = pal[i % len(pal)]
-                i += 1
+    def _sync_running_changed(self, running):
+        if running:
+            self.timer.start()
+        else:
+            self.timer.stop()
+            if self.player.clock.diag is not None:
+                self.diag.tick_stopped()
+            # 영상 끝/일시정지로 구간 끝에 못 가면 그때까지 녹음분으로 마무리
+            if self.punch is not None:
+                self.finish_punch()
+            # 일시정지하면 미리듣기도 멈춤 (영상과 따로 흘러가지 않도록)
+            if self.preview is not None:
+                self.stop_preview()
 
     def update_by_time(self): # 로직 수정
         self.player.update_slider()
+        self.check_punch()
+        self.check_preview()
 
         if not self.dialogues_full:
             return
 
         now = self.player.get_time_sec()
 
-        # 1. 현재 대사(cur)를 찾을 때는 모든 대사를 담은 full list를 사용합니다.
-        lst_full = self.dialogues_full 
-        current_idx_full = -1
-        for i, r in enumerate(lst_full):
-            if r["시작_초"] <= now:
-                current_idx_full = i
-            else:
-                break
-        
-        # 2. 다음/다다음 대사(nxt/nxt2)를 찾을 때는 화자 변경 시점만 담은 primary list를 사용합니다.
+        # 1. 현재 대사(cur)는 full list, 다음/다다음 대사(nxt/nxt2)는 화자 변경 시점만 담은 primary list 기준
+        #    (CueIndex: 재생 중에는 커서 전진, 탐색 후에는 이진 탐색)
+        lst_full = self.dialogues_full
         lst_primary = self.dialogues_primary
-        primary_idx = -1
-        for i, r in enumerate(lst_primary):
-            if r["시작_초"] <= now:
-                primary_idx = i
-            else:
-                break
-        
+        current_idx_full, primary_idx = self.cue_index.locate(now)
+
         if current_idx_full == -1 or primary_idx == -1:
-             # 영상 시작 전이라면 업데이트 중단
-            self.lbl_current.setText("-")
-            self.lbl_next.setText("-")
-            self.lbl_count.setText("(다음화자) 준비 -")
-            self.lbl_next2.setText("-")
-            self.colorize(self.lbl_current, None)
-            self.colorize(self.lbl_next2, None)
+            # 영상 시작 전이라면 업데이트 중단
+            self.render_idle()
             return
 
         # 3. 레이블 업데이트 호출
         self.update_labels(lst_full, current_idx_full, lst_primary, primary_idx, now)
 
+    def render_idle(self):
+        r = self.renderer
+        if r.changed(self.lbl_current, None):
+            self.lbl_current.setText("-")
+        if r.changed(self.lbl_next, None):
+            self.lbl_next.setText("-")
+        if r.changed(self.lbl_next2, None):
+            self.lbl_next2.setText("-")
+        r.set_text(self.lbl_count, "(다음화자) 준비 -")
+        self.colorize(self.lbl_current, None)
+        self.colorize(self.lbl_next2, None)
+
+    def emotion_tone_str(self, row):
+        # 💡 감정, 톤 정보
+        emotion = row.get("감정", None)
+        tone = row.get("톤", None)
+
+        if emotion and tone:
+            return f" ({emotion}, {tone})"
+        elif emotion:
+            return f" ({emotion})"
+        elif tone:
+            return f" ({tone})"
+        return ""
+
     def update_labels(self, lst_full, cur_idx_full, lst_primary, cur_idx_primary, now): # 로직 수정
-        
+        # 대사 라벨은 해당 대사(인덱스)가 바뀔 때만 다시 그리고, 카운트다운만 매 틱 갱신
+        r = self.renderer
+
         # --- 1. 현재 화자 (FULL LIST 사용) ---
-        cur = lst_full[cur_idx_full]
-        if cur:
+        if r.changed(self.lbl_current, ("cur", cur_idx_full)):
+            cur = lst_full[cur_idx_full]
             s = cur["화자"]
             t = cur["대사"]
             self.lbl_current.setText(f"{s}\n\n{t}") # 모든 대사 출력
             self.colorize(self.lbl_current, s)
-        else:
-            self.lbl_current.setText("-")
-            self.colorize(self.lbl_current, None)
 
 
         # --- 2. 다음 화자 (PRIMARY LIST 사용) ---
-        nxt = lst_primary[cur_idx_primary + 1] if cur_idx_primary + 1 < len(lst_primary) else None
-        
+        nxt_idx = cur_idx_primary + 1
+        nxt = lst_primary[nxt_idx] if nxt_idx < len(lst_primary) else None
+
         if nxt:
-            s = nxt["화자"]
-            t = nxt["대사"]
+            if r.changed(self.lbl_next, ("next", nxt_idx)):
+                s = nxt["화자"]
+                t = nxt["대사"]
+                self.lbl_next.setText(f"{s}{self.emotion_tone_str(nxt)}\n\n{t}") # 감정/톤 추가
+
             remain = max(0, nxt["시작_초"] - now)
-            
-            # 💡 감정, 톤 정보 추가
-            emotion = nxt.get("감정", None)
-            tone = nxt.get("톤", None)
-            
-            # 대사 텍스트 구성
-            emotion_tone_str = ""
-            if emotion and tone:
-                 emotion_tone_str = f" ({emotion}, {tone})"
-            elif emotion:
-                emotion_tone_str = f" ({emotion})"
-            elif tone:
-                emotion_tone_str = f" ({tone})"
-                
-            self.lbl_next.setText(f"{s}{emotion_tone_str}\n\n{t}") # 감정/톤 추가
-            self.lbl_count.setText(f"({s}) 준비 - {remain:.2f} 초")
+            r.set_text(self.lbl_count, f"({nxt['화자']}) 준비 - {remain:.2f} 초")
         else:
-            self.lbl_next.setText("다음 화자 없음 (혹은 동일 화자)")
-            self.lbl_count.setText("(다음화자) 준비 -")
+            if r.changed(self.lbl_next, ("next", None)):
+                self.lbl_next.setText("다음 화자 없음 (혹은 동일 화자)")
+            r.set_text(self.lbl_count, "(다음화자) 준비 -")
 
 
         # --- 3. 다다음 화자 (PRIMARY LIST 사용) ---
-        nxt2 = lst_primary[cur_idx_primary + 2] if cur_idx_primary + 2 < len(lst_primary) else None
+        nxt2_idx = cur_idx_primary + 2
+        nxt2 = lst_primary[nxt2_idx] if nxt2_idx < len(lst_primary) else None
+
+        if r.changed(self.lbl_next2, ("next2", nxt2_idx if nxt2 else None)):
+            if nxt2:
+                s = nxt2["화자"]
+                t = nxt2["대사"]
+                self.lbl_next2.setText(f"{s}{self.emotion_tone_str(nxt2)}\n\n{t}") # 감정/톤 추가
+                self.colorize(self.lbl_next2, s)
+            else:
+                self.lbl_next2.setText("-")
+                self.colorize(self.lbl_next2, None)
 
-        if nxt2:
-            s = nxt2["화자"]
-            t = nxt2["대사"]
-            
-            # 💡 감정, 톤 정보 추가
-            emotion = nxt2.get("감정", None)
-            tone = nxt2.get("톤", None)
-            
-            emotion_tone_str = ""
-            if emotion and tone:
-                 emotion_tone_str = f" ({emotion}, {tone})"
-            elif emotion:
-                emotion_tone_str = f" ({emotion})"
-            elif tone:
-                emotion_tone_str = f" ({tone})"
-                
-            self.lbl_next2.setText(f"{s}{emotion_tone_str}\n\n{t}") # 감정/톤 추가
-            self.colorize(self.lbl_next2, s)
+
+    def colorize(self, label, spk):
+        # 미리 만들어 둔 화자별 스타일 사용, 화자가 바뀐 경우에만 setStyleSheet
+        self.renderer.set_speaker(label, spk)
+
+
+
+# =============================================================
+# COMMAND LINE - 헤드리스 일괄 처리 (QApplication / VLC 생성 안 함)
+#   python gemi.py convert <SRT 또는 폴더...> [-o 출력폴더] [-j 프로세스 수]
+#   python gemi.py validate <XLSX/SRT 또는 폴더...> [-j 프로세스 수]
+# =============================================================
+ZERO_TIME_RE = re.compile(r"[0:.,\s]+")
+
+
+def _is_blank(v):
+    return v is None or v != v or (isinstance(v, str) and not v.strip())
+
+
+def _time_issue(label, raw):
+    # to_sec 는 실패 시 0.0 을 돌려주므로 원문과 비교해 형식 오류 판별
+    if _is_blank(raw):
+        return f"{label} 비어 있음"
+    if to_sec(raw) == 0.0 and not ZERO_TIME_RE.fullmatch(str(raw)):
+        return f"{label} 형식 오류 ({raw})"
+    return None
+
+
+class CueValidator:
+    # 대본/자막 행을 순서대로 넣으며 문제점 수집
+    MAX_ISSUES = 50
+
+    def __init__(self, check_speaker=True, label="#{}"):
+        # label: 위치 표시 형식 (SRT: 큐 번호, 엑셀: 시트 행 번호)
+        self.check_speaker = check_speaker
+        self.label = label
+        self.issues = []
+        self.issue_total = 0
+        self.count = 0
+        self.prev_start = None
+
+    def add(self, start, end, speaker, text):
+        self.count += 1
+        where = f"{self.label.format(self.count)} ({start})"
+
+        issue = _time_issue("시작", start)
+        if issue:
+            self.issue(where, issue)
+        start_sec = to_sec(start)
+
+        if not _is_blank(end):
+            end_issue = _time_issue("끝", end)
+            if end_issue:
+                self.issue(where, end_issue)
+            elif to_sec(end) < start_sec:
+                self.issue(where, "끝이 시작보다 빠름")
+
+        if self.prev_start is not None and start_sec < self.prev_start:
+            self.issue(where, "시작 시간이 이전 대사보다 빠름")
+        self.prev_start = start_sec
+
+        if self.check_speaker and _is_blank(speaker):
+            self.issue(where, "화자 비어 있음")
+        if _is_blank(text):
+            self.issue(where, "대사 비어 있음")
+
+    def issue(self, where, text):
+        self.issue_total += 1
+        if len(self.issues) < self.MAX_ISSUES:
+            self.issues.append(f"{where}: {text}")
+
+
+def _cli_result(path, t0, **kw):
+    result = {"path": path, "ok": True, "seconds": time.perf_counter() - t0,
+              "cues": 0, "issues": [], "issue_total": 0, "output": None, "error": None}
+    result.update(kw)
+    return result
+
+
+def cli_convert_one(src, dst):
+    # 프로세스 풀 작업자: SRT → 엑셀 변환 + 검사
+    t0 = time.perf_counter()
+    try:
+        v = CueValidator(check_speaker=False)
+
+        def rows():
+            for start, end, text in iter_srt_cues(src):
+                v.add(start, end, "", text)
+                yield [start, end, "", text, "", ""]
+
+        write_script_xlsx(dst, rows())
+        return _cli_result(src, t0, cues=v.count, issues=v.issues, issue_total=v.issue_total, output=dst)
+    except Exception as e:
+        return _cli_result(src, t0, ok=False, error=f"{type(e).__name__}: {e}")
+
+
+def cli_validate_one(src):
+    t0 = time.perf_counter()
+    try:
+        if src.lower().endswith(".srt"):
+            v = CueValidator(check_speaker=False)
+            for start, end, text in iter_srt_cues(src):
+                v.add(start, end, "", text)
         else:
-            self.lbl_next2.setText("-")
-            self.colorize(self.lbl_next2, None)
+            # 정렬 전 시트 순서 그대로 검사 (머리글 다음 2행부터)
+            v = CueValidator(label="{}행")
+            v.count = 1
+            for r in read_script_excel(src, sort=False):
+                v.add(r.get("시작"), r.get("끝"), r.get("화자"), r.get("대사"))
+            v.count -= 1
+        return _cli_result(src, t0, cues=v.count, issues=v.issues, issue_total=v.issue_total)
+    except Exception as e:
+        return _cli_result(src, t0, ok=False, error=f"{type(e).__name__}: {e}")
 
 
-    def colorize(self, label, spk):
-        if spk is None:
-            color = "#3a3a3a"
+def _collect_inputs(paths, exts):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                files.extend(os.path.join(root, n) for n in sorted(names)
+                             if n.lower().endswith(exts) and not n.startswith("~$"))
         else:
-            color = self.speaker_colors.get(spk, "#555555")
+            files.append(p)
+    return files
+
+
+def _run_pool(jobs, fn, arg_list):
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(fn, *args) for args in arg_list]
+        for fut in as_completed(futures):
+            r = fut.result()
+            results.append(r)
+            state = "OK  " if r["ok"] and not r["issues"] else ("WARN" if r["ok"] else "FAIL")
+            cues = f"{r['cues']:7d} cues  " if r["cues"] is not None else ""
+            line = f"  {state} {r['seconds']:7.2f}s {cues}{r['path']}"
+            if r["output"]:
+                line += f" -> {r['output']}"
+            print(line, flush=True)
+            if r["error"]:
+                print(f"        {r['error']}")
+            for issue in r["issues"][:5]:
+                print(f"        - {issue}")
+            if r["issue_total"] > 5:
+                print(f"        ... 외 {r['issue_total'] - 5}건")
+    return results
+
+
+def cli_main(argv):
+    parser = argparse.ArgumentParser(prog="gemi.py", description="킹누 더빙툴 일괄 처리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_conv = sub.add_parser("convert", help="SRT → 엑셀 변환 (폴더 가능)")
+    p_conv.add_argument("paths", nargs="+")
+    p_conv.add_argument("-o", "--output", help="출력 폴더 (기본: SRT 와 같은 폴더)")
+    p_conv.add_argument("-j", "--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+
+    p_val = sub.add_parser("validate", help="대본 엑셀/SRT 검사 (폴더 가능)")
+    p_val.add_argument("paths", nargs="+")
+    p_val.add_argument("-j", "--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+
+    p_trim = sub.add_parser("trim", help="테이크 앞뒤 무음 검출 → 사이드카에 트림 기록 (폴더 가능)")
+    p_trim.add_argument("paths", nargs="+")
+    p_trim.add_argument("-j", "--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+
+    p_align = sub.add_parser("align", help="대본의 선택 테이크를 가이드 오디오에 맞춰 오프셋 제안/적용")
+    p_align.add_argument("script", help="대본 엑셀 경로 (테이크 색인 키)")
+    p_align.add_argument("--reference", required=True, help="원본 대사가 든 가이드 오디오 (영상에서 추출한 WAV 등)")
+    p_align.add_argument("--apply", action="store_true", help="신뢰도 문턱 이상이면 오프셋 적용")
+    p_align.add_argument("--min-confidence", type=float, default=ALIGN_MIN_CONFIDENCE)
+    p_align.add_argument("-j", "--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+
+    p_mix = sub.add_parser("mixdown", help="대본의 선택 테이크 → WAV/FLAC 믹스 (+화자별 스템)")
+    p_mix.add_argument("script", help="대본 엑셀 경로 (테이크 색인 키)")
+    p_mix.add_argument("-o", "--output", required=True, help="출력 .wav / .flac")
+    p_mix.add_argument("--reference", help="덕킹할 가이드 오디오 파일")
+    p_mix.add_argument("--duck-db", type=float, default=-12.0)
+    p_mix.add_argument("--stems", help="화자별 스템 출력 폴더")
+    p_mix.add_argument("-j", "--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+
+    p_bench = sub.add_parser("bench", help="헤드리스 성능 측정 (합성 대본/SRT) → JSON")
+    p_bench.add_argument("--sizes", default="100,1000,10000,100000", help="대본 대사 수 목록 (쉼표)")
+    p_bench.add_argument("--srt-mb", default="1,10,100", help="SRT 크기 목록 MB (쉼표, 빈 값이면 생략)")
+    p_bench.add_argument("--ticks", type=int, default=3000, help="update_by_time 측정 틱 수")
+    p_bench.add_argument("--budget", type=float, default=2.0, help="경로마다 반복 측정 시간 (초)")
+    p_bench.add_argument("-o", "--output", help="결과 JSON 경로")
+    p_bench.add_argument("--compare", help="이전 결과 JSON 과 비교")
+
+    p_replay = sub.add_parser("replay", help="영상 없이 가상 시계로 대본 싱크 재생·검증")
+    p_replay.add_argument("script", help="대본 XLSX")
+    p_replay.add_argument("--step", type=float, default=KingnuTool.SYNC_INTERVAL_MS / 1000, help="결정적 재생 간격 (초)")
+    p_replay.add_argument("--jumps", type=int, default=0, help="중간에 넣을 임의 탐색 횟수")
+    p_replay.add_argument("--seed", type=int, default=0)
+    p_replay.add_argument("--rate", type=float, help="배속 실시간 재생 (최대 100, QTimer 경로)")
+    p_replay.add_argument("-o", "--output", help="결과 JSON 경로")
+
+    p_cal = sub.add_parser("calibrate", help="루프백 왕복 지연 측정 → 장치 프로필 저장")
+    p_cal.add_argument("--simulate", type=float, metavar="MS", help="가상 장치로 측정 (지연 ms)")
+    p_cal.add_argument("--runs", type=int, default=3)
+    p_cal.add_argument("--no-save", action="store_true", help="프로필 저장 안 함")
+
+    args = parser.parse_args(argv)
+    if args.command == "calibrate":
+        return cli_calibrate(args)
+    if args.command == "mixdown":
+        return cli_mixdown(args)
+    if args.command == "align":
+        return cli_align(args)
+    if args.command == "bench":
+        return cli_bench(args)
+    if args.command == "replay":
+        return cli_replay(args)
+    jobs = args.jobs or os.cpu_count() or 1
+    t0 = time.perf_counter()
+
+    if args.command == "convert":
+        files = _collect_inputs(args.paths, (".srt",))
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+        arg_list = []
+        for src in files:
+            out_dir = args.output or os.path.dirname(os.path.abspath(src))
+            dst = os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0] + ".xlsx")
+            arg_list.append((src, dst))
+        results = _run_pool(jobs, cli_convert_one, arg_list)
+    elif args.command == "trim":
+        files = _collect_inputs(args.paths, (".wav", ".flac"))
+        results = _run_pool(jobs, cli_trim_one, [(f,) for f in files])
+        # 색인이 있는 테이크는 트림 값도 갱신
+        store = TakeStore()
+        for r in results:
+            if r["ok"]:
+                store.set_trim(r["path"], r["trim"]["start_sec"], r["trim"]["end_sec"])
+        store.close()
+    else:
+        files = _collect_inputs(args.paths, (".xlsx", ".srt"))
+        results = _run_pool(jobs, cli_validate_one, [(f,) for f in files])
+
+    failed = sum(not r["ok"] for r in results)
+    warned = sum(r["ok"] and bool(r["issues"]) for r in results)
+    cpu = sum(r["seconds"] for r in results)
+    elapsed = time.perf_counter() - t0
+    if args.command == "trim":
+        audio = sum(r["trim"]["duration_sec"] for r in results if r["ok"])
+        amount = f"오디오 {audio / 60:.1f}분 (실시간 대비 {audio / max(elapsed, 1e-9):.0f}배)"
+    else:
+        amount = f"대사 {sum(r['cues'] for r in results)}개"
+    print(
+        f"\n[요약] 파일 {len(results)}개 · 성공 {len(results) - failed} · 경고 {warned} · 실패 {failed} · "
+        f"{amount} · 작업 {cpu:.2f}s · 경과 {elapsed:.2f}s ({jobs} 프로세스)"
+    )
+    return 1 if failed else 0
+
+
+def cli_mixdown(args):
+    store = TakeStore()
+    takes = store.selected_for_script(args.script)
+    store.close()
+    if not takes:
+        print(f"[실패] 테이크 없음: {args.script}")
+        return 1
+    jobs = build_mix_jobs(takes, args.output, args.reference, args.duck_db, args.stems)
+    t0 = time.perf_counter()
+    for r in render_mix_jobs(jobs, args.jobs):
+        print(f"  OK   {r['seconds']:7.2f}s {r['takes']:5d} takes  {r['duration_sec'] / 60:6.1f}min  peak {r['peak']:.2f}  {r['output']}")
+    print(f"\n[요약] 파일 {len(jobs)}개 · 경과 {time.perf_counter() - t0:.2f}s")
+    return 0
+
+
+def cli_align(args):
+    store = TakeStore()
+    takes = store.selected_for_script(args.script)
+    if not takes:
+        print(f"[실패] 테이크 없음: {args.script}")
+        return 1
+    t0 = time.perf_counter()
+    jobs = args.jobs or os.cpu_count() or 1
+    results = _run_pool(jobs, cli_align_one, [take_align_job(t, args.reference) for t in takes if os.path.exists(t["path"])])
+    by_id = {t["id"]: t for t in takes}
+    applied = 0
+    if args.apply:
+        for r in results:
+            if r["ok"] and r["align"]["confidence"] >= args.min_confidence:
+                apply_alignment(store, by_id[r["take_id"]], r["align"])
+                applied += 1
+    store.close()
+    failed = sum(not r["ok"] for r in results)
+    print(
+        f"\n[요약] 테이크 {len(results)}개 · 적용 {applied} · 실패 {failed} · "
+        f"경과 {time.perf_counter() - t0:.2f}s ({jobs} 프로세스)"
+    )
+    return 1 if failed else 0
+
+
+def cli_calibrate(args):
+    device = SimulatedLoopbackDevice(args.simulate / 1000) if args.simulate is not None else LoopbackDevice()
+    try:
+        key = device.key
+        profile = measure_round_trip(device, runs=args.runs)
+    except Exception as e:
+        print(f"[실패] {e}")
+        return 1
+    if not args.no_save:
+        LatencyProfiles().set(key, profile)
+    print(
+        f"{key}\n왕복 지연 {profile['round_trip_sec'] * 1000:.2f} ms · 편차 {profile['spread_sec'] * 1000:.2f} ms · "
+        f"상관 {profile['confidence']:.2f} · 측정값 {', '.join(f'{v * 1000:.2f}' for v in profile['runs'])} ms"
+    )
+    return 0
 
-        if label.objectName() == "CurrentSpeakerLabel":
-            label.setStyleSheet(
-                f"background:{color}; font-size:20px; font-weight:bold; padding:15px; border-radius:6px;"
-            )
-        elif label.objectName() == "Next2SpeakerLabel":
-            label.setStyleSheet(
-                f"background:{color}; font-size:16px; font-weight:normal; padding:10px; border-radius:6px;"
-            )
-        
+
+# =============================================================
+# BENCHMARK - 헤드리스 성능 측정 (offscreen Qt, VLC/오디오 미사용) → JSON
+# =============================================================
+BENCH_SPEAKERS = ["민준", "서연", "도윤", "하은", "시우", "지유", "주원", "서아", "예준", "하린", "내레이션", "기타"]
+BENCH_EMOTIONS = ["", "", "기쁨", "슬픔", "분노", "놀람", "담담"]
+BENCH_TONES = ["", "", "작게", "크게", "빠르게", "속삭임"]
+BENCH_SYLLABLES = "가나다라마바사아자차카타파하거너더러머버서어저처커터퍼허고노도로모보소오조초코토포호그느드르므브스으즈"
+
+
+class _BenchUnavailable:
+    # 벤치마크 중 VLC/오디오 장치에 닿으면 바로 실패 (측정 경로가 장치 없이 도는지 확인)
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        raise RuntimeError(f"벤치마크 중에는 {self._name}.{attr} 를 쓸 수 없습니다.")
+
+
+def _bench_time(sec, sep="."):
+    h, rem = divmod(sec, 3600)
+    m, s = divmod(rem, 60)
+    return f"{int(h):02d}:{int(m):02d}:{int(s):02d}{sep}{int(round((s % 1) * 1000)) % 1000:03d}"
+
+
+def bench_rows(n, seed=0):
+    # 엑셀 대본 행 [시작, 끝, 화자, 대사, 감정, 톤] (2.5초 간격)
+    rng = random.Random(seed)
+    for i in range(n):
+        start = 1.0 + i * 2.5
+        line = " ".join("".join(rng.choice(BENCH_SYLLABLES) for _ in range(rng.randint(1, 4)))
+                        for _ in range(rng.randint(2, 9)))
+        yield [_bench_time(start), _bench_time(start + 1.8), rng.choice(BENCH_SPEAKERS), line,
+               rng.choice(BENCH_EMOTIONS), rng.choice(BENCH_TONES)]
+
+
+def bench_write_srt(path, target_mb, seed=0):
+    # (대사 수, 실제로 쓴 바이트 수)
+    limit = int(target_mb * 1024 * 1024)
+    written = 0
+    count = 0
+    with open(path, "wb") as f:
+        for row in bench_rows(10 ** 9, seed):
+            count += 1
+            block = f"{count}\r\n{row[0].replace('.', ',')} --> {row[1].replace('.', ',')}\r\n<i>{row[3]}</i>\r\n\r\n"
+            data = block.encode("utf-8")
+            f.write(data)
+            written += len(data)
+            if written >= limit:
+                break
+    return count, written
+
+
+class BenchRecorder:
+    BUDGET_SEC = 2.0 # 경로마다 이 시간 안에서 반복 (최소 MIN_RUNS 회)
+    MIN_RUNS = 3
+    MAX_RUNS = 200
+
+    def __init__(self):
+        self.results = []
+
+    @staticmethod
+    def _percentile(sorted_ms, q):
+        return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+    def add(self, name, size, samples_ms, peak_bytes=None, unit="cues"):
+        ms = sorted(samples_ms)
+        r = {
+            "path": name, "size": size, "unit": unit, "runs": len(ms),
+            "mean_ms": sum(ms) / len(ms),
+            "p50_ms": self._percentile(ms, 0.50), "p90_ms": self._percentile(ms, 0.90),
+            "p99_ms": self._percentile(ms, 0.99), "max_ms": ms[-1],
+            "peak_mb": None if peak_bytes is None else peak_bytes / 1e6,
+        }
+        self.results.append(r)
+        peak = f"{r['peak_mb']:8.1f} MB" if peak_bytes is not None else "       -   "
+        print(f"  {name:<24} {size:>9} {unit:<4} p50 {r['p50_ms']:9.3f}  p90 {r['p90_ms']:9.3f}  "
+              f"p99 {r['p99_ms']:9.3f}  max {r['max_ms']:9.3f} ms  peak {peak}  ({r['runs']}회)", flush=True)
+        return r
+
+    @staticmethod
+    def peak(fn, cleanup=None):
+        # 시간 측정과 분리한 한 번 실행의 최대 메모리 (tracemalloc: Python 할당 기준, Qt 내부 할당 제외)
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            if cleanup:
+                cleanup()
+
+    def measure(self, name, size, fn, unit="cues", max_runs=None, cleanup=None):
+        # cleanup: 매 실행 뒤 (시간 제외) 만든 위젯 등을 치움
+        fn() # 첫 호출 (지연 import, 캐시 준비) 은 제외
+        if cleanup:
+            cleanup()
+        samples = []
+        t_end = time.perf_counter() + self.BUDGET_SEC
+        while len(samples) < (max_runs or self.MAX_RUNS):
+            t0 = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - t0) * 1000)
+            if cleanup:
+                cleanup()
+            if len(samples) >= self.MIN_RUNS and time.perf_counter() > t_end:
+                break
+        return self.add(name, size, samples, self.peak(fn, cleanup), unit)
+
+
+def bench_dispose_dialogs(win):
+    # exec 를 막아 둔 대화상자는 창에 붙어 남으므로 바로 삭제 (다음 반복에 영향 없도록)
+    for dialog in win.findChildren(QDialog):
+        dialog.setParent(None)
+        dialog.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def bench_sync_ticks(win, full, ticks, paint):
+    # 재생을 흉내: 가상 시계로 33ms 씩 전진 + 가끔 임의 위치로 탐색, 틱마다 update_by_time 시간
+    rng = random.Random(1)
+    span = replay_length_sec(full)
+    backend = SimulatedBackend(span, rate=0)
+    win.player.set_backend(backend)
+    win.player.attach_media(None)
+    samples = []
+    app = QApplication.instance()
+    for k in range(ticks):
+        backend.step(KingnuTool.SYNC_INTERVAL_MS / 1000)
+        if k % 500 == 499 or backend.pos_ms >= backend.length_ms:
+            backend.step(rng.uniform(0, span) - backend.pos_ms / 1000)
+        t0 = time.perf_counter()
+        win.update_by_time()
+        if paint:
+            app.processEvents()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+_HEADLESS_QAPP = None # 프로세스 동안 유지 (파이썬 참조가 사라지면 QApplication 이 파괴됨)
+
+
+@contextlib.contextmanager
+def _headless_app():
+    # offscreen Qt + 장치 모듈 차단 (CI 등 libvlc/오디오 없는 환경), 끝나면 모듈 전역 복구
+    global _HEADLESS_QAPP
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    g = globals()
+    saved = {name: g[name] for name in ("vlc", "sd")}
+    g["vlc"] = _BenchUnavailable("vlc")
+    g["sd"] = _BenchUnavailable("sounddevice")
+    try:
+        _HEADLESS_QAPP = QApplication.instance() or QApplication([sys.argv[0]])
+        yield _HEADLESS_QAPP
+    finally:
+        g.update(saved)
+
+
+def cli_bench(args):
+    with _headless_app():
+        return _cli_bench(args)
+
+
+def _cli_bench(args):
+    sizes = [int(v) for v in args.sizes.split(",") if v]
+    srt_sizes = [float(v) for v in args.srt_mb.split(",") if v]
+    bench = BenchRecorder()
+    bench.BUDGET_SEC = args.budget
+    workdir = tempfile.mkdtemp(prefix="kingnu_bench_")
+
+    win = KingnuTool()
+    win.resize(1500, 900)
+    win.show()
+    original_exec = QDialog.exec
+    QDialog.exec = lambda self: 0 # 대화상자는 만들기만 하고 바로 반환
+
+    try:
+        for n in sizes:
+            print(f"\n[대본 {n} 대사]", flush=True)
+            xlsx = os.path.join(workdir, f"script_{n}.xlsx")
+            write_script_xlsx(xlsx, bench_rows(n))
+            cache = ScriptCache(os.path.join(workdir, "cache"))
+
+            bench.measure("load_excel", n, lambda: load_script_bundle(xlsx, None), max_runs=20)
+            load_script_bundle(xlsx, cache)
+            bench.measure("load_excel_cached", n, lambda: load_script_bundle(xlsx, cache), max_runs=50)
+
+            full, primary = load_script(xlsx)
+            bench.measure("build_primary", n, lambda: build_primary(full))
+            bench.measure("assign_colors", n, lambda: build_speaker_colors(full))
+            bundle = ScriptBundle(xlsx, full, primary)
+            bench.measure("apply_script", n, lambda: win.apply_script(bundle))
+
+            dispose = lambda: bench_dispose_dialogs(win)
+            bench.measure("dialogue_table_open", n, win.show_all_dialogues_dialog, max_runs=20, cleanup=dispose)
+            win.show_all_dialogues_dialog() # 검색은 열린 목록 하나에서 측정
+            bench.measure("dialogue_search", n, lambda: win._handle_dialogue_search_change("가나"),
+                          cleanup=lambda: win._handle_dialogue_search_change(""))
+            dispose()
+
+            for name, ticks, paint in (("update_by_time", args.ticks, False), ("update_by_time+paint", args.ticks // 4, True)):
+                samples = bench_sync_ticks(win, full, ticks, paint)
+                bench.add(name, n, samples, bench.peak(lambda: bench_sync_ticks(win, full, min(ticks, 300), paint)))
+
+        for mb in srt_sizes:
+            srt = os.path.join(workdir, f"subs_{mb:g}mb.srt")
+            cues, size = bench_write_srt(srt, mb)
+            print(f"\n[SRT {size / 1024 / 1024:.2f} MB · {cues} 대사]", flush=True)
+            out = os.path.join(workdir, "converted.xlsx")
+            r = bench.measure("load_srt", cues, lambda: convert_srt_to_excel(srt, out), max_runs=5)
+            r["file_bytes"] = size
+            os.remove(srt)
+    finally:
+        QDialog.exec = original_exec
+        win.close()
+        for name in os.listdir(workdir):
+            path = os.path.join(workdir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    report = {
+        "schema": 1,
+        "build": file_digest(os.path.abspath(__file__))[:12],
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qt": QT_VERSION_STR,
+        "ticks": args.ticks,
+        "results": bench.results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+    if args.compare:
+        bench_compare(args.compare, report)
+    return 0
+
+
+def bench_compare(old_path, new):
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["path"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\n[비교] {old_path} → 현재 (p50 / p99 배율, 1 보다 작으면 빨라짐)")
+    for r in new["results"]:
+        o = old.get((r["path"], r["size"]))
+        if o and o["p50_ms"] > 0 and o["p99_ms"] > 0:
+            print(f"  {r['path']:<24} {r['size']:>9}  p50 ×{r['p50_ms'] / o['p50_ms']:5.2f}  p99 ×{r['p99_ms'] / o['p99_ms']:5.2f}")
+
+
+# =============================================================
+# SYNC REPLAY - 가상 시계로 대본 싱크(현재/다음/다다음 + 카운트다운) 재생·검증
+# =============================================================
+def replay_length_sec(full):
+    # 시작이 비어 NaN 인 행(정렬 시 맨 뒤)은 도달하지 않으므로 유한한 시작/끝만 사용
+    starts = CueIndex._sorted_starts(full)
+    if not starts:
+        return 0.0
+    ends = [e for e in (to_sec(r.get("끝", 0)) for r in full) if math.isfinite(e)]
+    return max([starts[-1]] + ends) + 5.0
+
+
+class SyncExpectation:
+    # 화면에 나와야 할 문자열을 대본에서 직접 계산 (CueIndex 커서/LabelRenderer 캐시와 독립)
+    NO_NEXT = "다음 화자 없음 (혹은 동일 화자)"
+    IDLE_COUNT = "(다음화자) 준비 -"
+
+    def __init__(self, win):
+        self.win = win
+        self.full = win.dialogues_full
+        self.primary = win.dialogues_primary
+        self.full_starts = CueIndex._sorted_starts(self.full)
+        self.primary_starts = CueIndex._sorted_starts(self.primary)
+
+    def labels(self, now):
+        ci = bisect.bisect_right(self.full_starts, now) - 1
+        pi = bisect.bisect_right(self.primary_starts, now) - 1
+        if ci == -1 or pi == -1:
+            return ("-", "-", self.IDLE_COUNT, "-"), None
+        cur = self.full[ci]
+        nxt = self.primary[pi + 1] if pi + 1 < len(self.primary) else None
+        nxt2 = self.primary[pi + 2] if pi + 2 < len(self.primary) else None
+        et = self.win.emotion_tone_str
+        return (
+            f"{cur['화자']}\n\n{cur['대사']}",
+            f"{nxt['화자']}{et(nxt)}\n\n{nxt['대사']}" if nxt else self.NO_NEXT,
+            f"({nxt['화자']}) 준비 - {max(0, nxt['시작_초'] - now):.2f} 초" if nxt else self.IDLE_COUNT,
+            f"{nxt2['화자']}{et(nxt2)}\n\n{nxt2['대사']}" if nxt2 else "-",
+        ), ci
+
+
+COUNTDOWN_RE = re.compile(r"\((.*)\) 준비 - ([0-9.]+) 초")
+
+
+class SyncReplay:
+    LABELS = ("현재", "다음", "카운트다운", "다다음")
+    MAX_REPORTED = 20
+
+    def __init__(self, win):
+        self.win = win
+        self.expect = SyncExpectation(win)
+        self.ticks = 0
+        self.cue_changes = 0
+        self.last_cue = None
+        self.mismatches = 0
+        self.examples = []
+        self.tick_ms = []
+
+    def shown(self):
+        w = self.win
+        return (w.lbl_current.text(), w.lbl_next.text(), w.lbl_count.text(), w.lbl_next2.text())
+
+    def tick(self):
+        # 틱 전후 시각 모두와 비교 (배속 재생에서는 update_by_time 안에서도 시계가 흐름)
+        clock = self.win.player.clock
+        before = clock.now_ms() / 1000
+        t0 = time.perf_counter()
+        self.win.update_by_time()
+        self.tick_ms.append((time.perf_counter() - t0) * 1000)
+        after = clock.now_ms() / 1000
+        self.check(before, after)
+
+    def check(self, before, after):
+        self.ticks += 1
+        shown = self.shown()
+        exp_a, cue = self.expect.labels(before)
+        exp_b = exp_a if after == before else self.expect.labels(after)[0]
+        if cue != self.last_cue:
+            self.cue_changes += 1
+            self.last_cue = cue
+        for i, label in enumerate(self.LABELS):
+            if shown[i] in (exp_a[i], exp_b[i]) or (i == 2 and self._count_between(shown[i], exp_a[i], exp_b[i], after - before)):
+                continue
+            self.mismatches += 1
+            if len(self.examples) < self.MAX_REPORTED:
+                self.examples.append({"time_sec": round(before, 3), "label": label,
+                                      "expected": exp_a[i], "shown": shown[i]})
+
+    @staticmethod
+    def _count_between(shown, exp_a, exp_b, span):
+        # 배속 재생: 같은 화자의 카운트다운이 틱 동안 흐른 시간(span) 안이면 정상 (표시 반올림 0.005 허용)
+        m = COUNTDOWN_RE.fullmatch(shown)
+        if not m:
+            return False
+        for exp in (exp_a, exp_b):
+            e = COUNTDOWN_RE.fullmatch(exp)
+            if e and e.group(1) == m.group(1) and abs(float(e.group(2)) - float(m.group(2))) <= span + 0.005:
+                return True
+        return False
+
+    def run_steps(self, step_sec, jumps=0, seed=0):
+        # 결정적 재생: 가상 시계를 step_sec 씩 진행, jumps 번 임의 위치 탐색 (탐색 경로 포함)
+        length = replay_length_sec(self.win.dialogues_full)
+        backend = SimulatedBackend(length, rate=0)
+        self.win.player.set_backend(backend)
+        self.win.player.attach_media(None)
+        app = QApplication.instance()
+        steps = max(1, int(length / step_sec))
+        rng = random.Random(seed)
+        jump_at = set(rng.sample(range(steps), min(jumps, steps)))
+        for k in range(steps):
+            if k in jump_at:
+                self.win.player.set_time_sec(rng.uniform(0, length))
+                app.processEvents() # 위치 보고 이벤트
+            else:
+                backend.step(step_sec)
+            self.tick()
+
+    def run_rate(self, rate):
+        # 실제 QTimer 재생 경로를 rate 배속으로 (영상 길이 / rate 초 걸림)
+        win = self.win
+        backend = SimulatedBackend(replay_length_sec(win.dialogues_full), rate)
+        win.player.set_backend(backend)
+        win.player.attach_media(None)
+        win.timer.timeout.disconnect(win.update_by_time)
+        win.timer.timeout.connect(self.tick)
+        try:
+            loop = QEventLoop()
+            win.player.clock.running_changed.connect(lambda running: None if running else loop.quit())
+            backend.play()
+            loop.exec()
+        finally:
+            win.timer.timeout.disconnect(self.tick)
+            win.timer.timeout.connect(win.update_by_time)
+
+    def summary(self):
+        ms = sorted(self.tick_ms) or [0.0]
+        pick = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]
+        return {
+            "cues": len(self.win.dialogues_full),
+            "ticks": self.ticks,
+            "cue_changes": self.cue_changes,
+            "mismatches": self.mismatches,
+            "examples": self.examples,
+            "tick_p50_ms": pick(0.5), "tick_p99_ms": pick(0.99), "tick_max_ms": ms[-1],
+        }
+
+
+def cli_replay(args):
+    with _headless_app():
+        return _cli_replay(args)
+
+
+def _cli_replay(args):
+    win = KingnuTool()
+    win.show()
+    t0 = time.perf_counter()
+    try:
+        win.apply_script(load_script_bundle(args.script, None))
+    except (ScriptFormatError, OSError) as e:
+        print(f"대본 로드 실패: {e}", file=sys.stderr)
+        return 1
+
+    replay = SyncReplay(win)
+    length = replay_length_sec(win.dialogues_full)
+    if args.rate:
+        replay.run_rate(min(args.rate, SimulatedBackend.MAX_RATE))
+    else:
+        replay.run_steps(args.step, args.jumps, args.seed)
+    win.close()
+
+    result = replay.summary()
+    result.update(script=args.script, video_sec=length, wall_sec=time.perf_counter() - t0)
+    print(f"{args.script}: 대사 {result['cues']} · 영상 {length:.0f}초 → {result['wall_sec']:.1f}초 "
+          f"(×{length / max(result['wall_sec'], 1e-9):.0f}) · 틱 {result['ticks']} · 대사 전환 {result['cue_changes']}")
+    print(f"  update_by_time p50 {result['tick_p50_ms']:.3f} ms · p99 {result['tick_p99_ms']:.3f} ms · 최대 {result['tick_max_ms']:.3f} ms")
+    if result["mismatches"]:
+        print(f"  ✖ 불일치 {result['mismatches']}건")
+        for e in result["examples"]:
+            print(f"    {e['time_sec']:.3f}s [{e['label']}] 기대 {e['expected']!r} / 표시 {e['shown']!r}")
+    else:
+        print("  ✔ 모든 틱에서 현재/다음/다다음/카운트다운 일치")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if result["mismatches"] else 0
+
+
+CLI_COMMANDS = ("convert", "validate", "trim", "align", "mixdown", "calibrate", "bench", "replay")
 
 
 # =============================================================
 # EXEC
 # =============================================================
+def _startup_ready(win):
+    # 이벤트 루프 진입 후: 시간 기록 + VLC 백그라운드 준비
+    STARTUP.mark("이벤트 루프 시작")
+    win.player.preload_backend()
+    if "--startup-profile" in sys.argv or os.environ.get("KINGNU_STARTUP_PROFILE"):
+        QTimer.singleShot(2000, lambda: print(STARTUP.report()))
+
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # PyInstaller EXE 에서 프로세스 풀 사용
+
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        sys.exit(cli_main(sys.argv[1:]))
+
     app = QApplication(sys.argv)
+    STARTUP.mark("QApplication 생성")
     win = KingnuTool()
+    STARTUP.mark("메인 창 생성")
     win.show()
+    STARTUP.mark("메인 창 표시")
+    QTimer.singleShot(0, lambda: _startup_ready(win))
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,29 @@
+# -*- mode: python ; coding: utf-8 -*-
+# pyinstaller gemi.spec
+# 지연 로딩 모듈(LazyModule)은 import 문이 없어 분석에 안 잡히므로 hiddenimports 로 지정
+
+a = Analysis(
+    ['gemi.py'],
+    pathex=[],
+    binaries=[('libvlc.dll', '.'), ('libvlccore.dll', '.')],
+    datas=[],
+    hiddenimports=['numpy', 'pandas', 'openpyxl', 'sounddevice', 'soundfile', 'vlc'],
+    hookspath=[],
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='gemi',
+    debug=False,
+    strip=False,
+    upx=True,
+    console=False,
+)
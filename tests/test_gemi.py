@@ -0,0 +1,615 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gemi
+
+
+@pytest.fixture
+def headless(tmp_path, monkeypatch):
+    # 녹음/캐시/설정은 임시 HOME 아래로, vlc/sd 전역은 끝나면 복구
+    home = tmp_path / "home"
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(home / ".config"))
+    monkeypatch.delenv("LOCALAPPDATA", raising=False)
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    with gemi._headless_app() as app:
+        yield app
+
+
+# ---------------------------
+# SRT 인코딩 감지
+# ---------------------------
+def test_detect_encoding_non_ascii_after_first_chunk(tmp_path):
+    # 앞 1MiB 이상이 ASCII 뿐이고 한글(CP949)은 그 뒤에 나오는 자막
+    path = tmp_path / "late_hangul.srt"
+    ascii_block = "".join(
+        f"{i}\r\n00:00:{i % 60:02d},000 --> 00:00:{i % 60:02d},500\r\nhello world {i}\r\n\r\n" for i in range(1, 40000)
+    ).encode("ascii")
+    assert len(ascii_block) > 1 << 20
+    tail = "40000\r\n01:00:00,000 --> 01:00:01,000\r\n한글 대사\r\n\r\n".encode("cp949")
+    path.write_bytes(ascii_block + tail)
+
+    assert gemi.detect_text_encoding(str(path)) == "cp949"
+    cues = list(gemi.iter_srt_cues(str(path)))
+    assert cues[-1][2] == "한글 대사"
+
+
+def test_detect_encoding_stops_at_scan_limit(tmp_path, monkeypatch):
+    # 순수 ASCII 가 예산 넘게 이어지면 끝까지 읽지 않고 UTF-8
+    path = tmp_path / "english.srt"
+    path.write_bytes(b"1\r\n00:00:01,000 --> 00:00:02,000\r\nhello\r\n\r\n" * 100000 + "한글".encode("cp949"))
+    read = []
+
+    class CountingReader(io.BufferedReader):
+        def read(self, n=-1):
+            data = super().read(n)
+            read.append(len(data))
+            return data
+
+    monkeypatch.setattr(gemi, "open", lambda p, mode: CountingReader(io.FileIO(p, mode)), raising=False)
+    assert gemi.detect_text_encoding(str(path), scan_limit=1 << 20) == "utf-8"
+    assert sum(read) <= (1 << 20) + 4 < path.stat().st_size
+    monkeypatch.undo()
+    assert gemi.detect_text_encoding(str(path)) == "cp949"
+
+
+SAMPLE_SRT = (
+    "1\r\n00:00:01,000 --> 00:00:02,500\r\n<i>안녕하세요</i>\r\n둘째 줄\r\n\r\n"
+    "2\r\n00:00:03,000 --> 00:00:04,000\r\n1004\r\n\r\n"
+    "3\r\n00:00:05,000 --> 00:00:06,000\r\n잘 가\r\n"
+)
+SAMPLE_CUES = [
+    ("00:00:01.000", "00:00:02.500", "안녕하세요 둘째 줄"),
+    ("00:00:03.000", "00:00:04.000", "1004"), # 숫자만 있는 대사
+    ("00:00:05.000", "00:00:06.000", "잘 가"),
+]
+
+
+@pytest.mark.parametrize("encoding, detected", [
+    ("utf-8", "utf-8"), ("utf-8-sig", "utf-8-sig"), ("cp949", "cp949"), ("utf-16", "utf-16"),
+])
+def test_srt_encodings(tmp_path, encoding, detected):
+    path = str(tmp_path / "sample.srt")
+    with open(path, "wb") as f:
+        f.write(SAMPLE_SRT.encode(encoding))
+    assert gemi.detect_text_encoding(path) == detected
+    assert list(gemi.iter_srt_cues(path)) == SAMPLE_CUES
+
+
+def test_srt_to_excel_round_trip(tmp_path):
+    src = str(tmp_path / "sample.srt")
+    with open(src, "wb") as f:
+        f.write(SAMPLE_SRT.encode("cp949"))
+    save = str(tmp_path / "sample.xlsx")
+    assert gemi.convert_srt_to_excel(src, save) == 3
+
+    rows = gemi.read_script_excel(save)
+    assert [(r["시작"], r["끝"], r["대사"]) for r in rows] == SAMPLE_CUES
+    assert [r["시작_초"] for r in rows] == [1.0, 3.0, 5.0]
+
+
+# ---------------------------
+# 가상 시계 싱크 재생
+# ---------------------------
+def test_replay_with_trailing_blank_start(tmp_path, headless):
+    path = str(tmp_path / "script.xlsx")
+    rows = list(gemi.bench_rows(20))
+    rows.append(["", "", "기타", "시작 시간 없는 대사", "", ""])
+    gemi.write_script_xlsx(path, rows)
+
+    win = gemi.KingnuTool()
+    try:
+        win.apply_script(gemi.load_script_bundle(path, None))
+        assert win.dialogues_full[-1]["시작_초"] != win.dialogues_full[-1]["시작_초"] # NaN 행 유지
+
+        length = gemi.replay_length_sec(win.dialogues_full)
+        assert length == gemi.to_sec(rows[-2][1]) + 5.0
+
+        replay = gemi.SyncReplay(win)
+        replay.run_steps(0.1, jumps=3)
+        assert replay.ticks > 0
+        assert replay.mismatches == 0
+    finally:
+        win.close()
+
+
+def test_simulated_backend_time_labels(headless):
+    win = gemi.KingnuTool()
+    try:
+        win.player.set_backend(gemi.SimulatedBackend(80.3, rate=0))
+        win.player.attach_media(None)
+        win.player.backend.step(12.5)
+        win.player.update_slider()
+        assert win.player.lbl_total_time.text() == "00:01:20.300"
+        assert win.player.lbl_cur_time.text() == "00:00:12.500"
+    finally:
+        win.close()
+
+
+# ---------------------------
+# 테이크 변환 (FLAC)
+# ---------------------------
+def _encoder_take(tmp_path):
+    wav = str(tmp_path / "record_1.wav")
+    gemi.sf.write(wav, gemi.np.zeros((4410, 1), dtype="float32"), 44100)
+    gemi.write_take_sidecar(wav, {"path": wav, "duration_sec": 0.1})
+    store = gemi.TakeStore(str(tmp_path))
+    store.add({"path": wav, "duration_sec": 0.1})
+    return wav, store, gemi.TakeEncoder(lambda: store)
+
+
+def test_encode_failure_keeps_original_sidecar(tmp_path, monkeypatch):
+    wav, store, encoder = _encoder_take(tmp_path)
+    remove = os.remove
+
+    def locked(p):
+        if p == wav:
+            raise PermissionError("in use")
+        remove(p)
+
+    monkeypatch.setattr(gemi.os, "remove", locked)
+    target = gemi.STORAGE_FORMATS["flac"][2]
+    with pytest.raises(PermissionError):
+        encoder.encode(wav, target)
+    monkeypatch.undo()
+
+    flac = os.path.splitext(wav)[0] + ".flac"
+    assert os.path.exists(wav) and not os.path.exists(flac) and not os.path.exists(flac + ".partial")
+    meta = gemi.read_take_sidecar(wav)
+    assert meta["path"] == wav and "encoded_from" not in meta
+    assert [t["path"] for t in store.unattached()] == [wav]
+
+    encoder.encode(wav, target)
+    assert not os.path.exists(wav)
+    assert gemi.read_take_sidecar(flac)["path"] == flac
+    assert [t["path"] for t in store.unattached()] == [flac]
+    store.close()
+
+
+# ---------------------------
+# 대사 검색 색인
+# ---------------------------
+def test_search_does_not_match_across_fields():
+    rows = [{"대사": "오분", "감정": "기쁨", "톤": "작게"}, {"대사": "분기 보고", "감정": None, "톤": float("nan")}]
+    index = gemi.DialogueSearchIndex(rows)
+    assert index.search("분기") == {1}
+    assert index.search("분기쁨") == set()
+    assert index.search("기쁨") == {0}
+    assert index.search("분 기") == {1}
+
+
+def test_search_matches_brute_force_with_speaker_filter():
+    rng = gemi.random.Random(2)
+    words = ["안녕", "하세요", "잘", "가", "Hello", "WORLD", "기쁨", "슬픔", "작게", "크게"]
+    rows = [
+        {"화자": rng.choice("ABC"), "대사": " ".join(rng.choices(words, k=rng.randint(1, 4))),
+         "감정": rng.choice([None, "기쁨", "슬픔"]), "톤": rng.choice([None, float("nan"), "작게"])}
+        for _ in range(400)
+    ]
+    index = gemi.DialogueSearchIndex(rows)
+    proxy = gemi.DialogueFilterProxy()
+    proxy.setSourceModel(gemi.DialogueTableModel(rows))
+    norm = gemi.DialogueSearchIndex.normalize
+
+    for query in ["안", "녕하", "안녕 하세요", "hello world", "잘가", "슬픔", "크게 안녕", "없음"]:
+        expected = {
+            i for i, r in enumerate(rows)
+            if any(isinstance(r[f], str) and norm(query) in norm(r[f]) for f in ("대사", "감정", "톤"))
+        }
+        assert index.search(query) == expected, query
+
+        proxy.set_search_rows(index.search(query))
+        proxy.set_speaker("B")
+        shown = {proxy.mapToSource(proxy.index(k, 0)).row() for k in range(proxy.rowCount())}
+        assert shown == {i for i in expected if rows[i]["화자"] == "B"}, query
+        proxy.set_speaker(None)
+
+    assert index.search("  ") is None
+
+
+# ---------------------------
+# 헤드리스 실행 (bench / replay)
+# ---------------------------
+def test_headless_app_restores_device_modules(monkeypatch):
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    vlc, sd = gemi.vlc, gemi.sd
+    with gemi._headless_app():
+        assert isinstance(gemi.vlc, gemi._BenchUnavailable)
+        assert isinstance(gemi.sd, gemi._BenchUnavailable)
+    assert gemi.vlc is vlc and gemi.sd is sd
+
+
+# ---------------------------
+# 벤치마크 합성 데이터
+# ---------------------------
+def test_bench_srt_reports_exact_size(tmp_path):
+    path = str(tmp_path / "bench.srt")
+    cues, size = gemi.bench_write_srt(path, 0.25)
+    assert size == os.path.getsize(path) >= 0.25 * 1024 * 1024
+    assert len(list(gemi.iter_srt_cues(path))) == cues
+
+
+def _wait_idle(encoder, timeout=5.0):
+    t_end = gemi.time.monotonic() + timeout
+    while encoder.stats()["pending"] and gemi.time.monotonic() < t_end:
+        gemi.time.sleep(0.01)
+    return encoder.stats()
+
+
+def test_encoder_retries_locked_trim(tmp_path, monkeypatch):
+    wav, store, encoder = _encoder_take(tmp_path)
+    encoder.RETRY_SEC = 0.01
+    calls = []
+
+    def trim(path):
+        calls.append(path)
+        if len(calls) < 3:
+            raise PermissionError("recorder still open")
+        return {"start_sec": 0.01, "end_sec": 0.09}
+
+    monkeypatch.setattr(gemi, "trim_take", trim)
+    encoder.submit(wav, "wav")
+    stats = _wait_idle(encoder)
+    assert len(calls) == 3 and stats["failed"] == 0
+    assert store.unattached()[0]["trim_start_sec"] == 0.01
+
+
+def test_encoder_gives_up_on_permanently_locked_file(tmp_path, monkeypatch):
+    wav, store, encoder = _encoder_take(tmp_path)
+    encoder.RETRY_SEC = 0.01
+    encoder.MAX_RETRIES = 3
+    calls = []
+
+    def trim(path):
+        calls.append(path)
+        raise PermissionError("locked")
+
+    monkeypatch.setattr(gemi, "trim_take", trim)
+    encoder.submit(wav, "wav")
+    stats = _wait_idle(encoder)
+    assert len(calls) == 4
+    assert stats["pending"] == 0 and stats["failed"] == 1
+
+
+# ---------------------------
+# 믹스다운 / 리샘플링
+# ---------------------------
+def _resample_blocks(x, src_fs, dst_fs, block=512):
+    np = gemi.np
+    r = gemi.StreamResampler(src_fs, dst_fs)
+    out, pos = [], 0
+    while pos < len(x):
+        need = r.need(block)
+        chunk = x[pos:pos + need]
+        pos += need
+        r.feed(np.concatenate([chunk, np.zeros(need - len(chunk), np.float32)]))
+        out.append(r.pull(block))
+    return np.concatenate(out)
+
+
+def test_resampler_rejects_above_new_nyquist():
+    np = gemi.np
+    t = np.arange(48000) / 48000
+    passed = _resample_blocks(np.sin(2 * np.pi * 1000 * t).astype(np.float32), 48000, 44100)
+    ref = np.sin(2 * np.pi * 1000 * np.arange(len(passed)) / 44100)
+    assert np.abs(passed - ref)[2000:40000].max() < 1e-3 # 블록 경계에서도 위상 유지
+
+    # 23kHz 는 44.1k 의 나이퀴스트(22.05k) 위 → 21.1kHz 로 접히지 않고 걸러져야 함
+    alias = _resample_blocks(np.sin(2 * np.pi * 23000 * t).astype(np.float32), 48000, 44100)
+    assert np.abs(alias[2000:40000]).max() < 1e-2
+
+
+def test_mix_places_resampled_take(tmp_path):
+    np = gemi.np
+    fs = gemi.MIX_SAMPLE_RATE
+    take = str(tmp_path / "take.wav")
+    x = np.zeros(24000, dtype=np.float32)
+    x[12000] = 0.5 # 파일 안 0.5 초
+    gemi.sf.write(take, x, 24000) # 믹스(44.1k)와 다른 레이트
+    src_fs = 24000
+    out = str(tmp_path / "mix.wav")
+    r = gemi.render_mix({"output": out, "sources": [(take, 1.25, 1.0, 0.0, None)]})
+
+    y, y_fs = gemi.sf.read(out, dtype="float32")
+    assert y_fs == fs and r["takes"] == 1
+    assert abs(len(y) - int(round((1.25 + len(x) / src_fs) * fs))) <= 1
+    assert int(np.argmax(np.abs(y))) == int(round((1.25 + 12000 / src_fs) * fs))
+
+
+# ---------------------------
+# 테이크 파일 이름
+# ---------------------------
+def test_take_paths_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(gemi, "recordings_dir", lambda: str(tmp_path))
+    fixed = gemi.datetime.datetime(2026, 1, 2, 3, 4, 5, 6000)
+    monkeypatch.setattr(gemi.datetime, "datetime", type("Frozen", (), {"now": staticmethod(lambda: fixed)}))
+
+    first = gemi.new_take_path("_cue00001")
+    assert os.path.basename(first) == "record_20260102_030405_006_cue00001.wav"
+    open(first, "wb").close()
+    second = gemi.new_take_path("_cue00001")
+    open(os.path.splitext(second)[0] + ".flac", "wb").close() # 변환되어 .wav 가 없어진 테이크
+    third = gemi.new_take_path("_cue00001")
+    assert len({first, second, third}) == 3
+    assert third.endswith("_cue00001_3.wav")
+
+
+# ---------------------------
+# 테이크 색인
+# ---------------------------
+def _cue_take(tmp_path, name, cue, start, line, script="script.xlsx"):
+    return {"path": str(tmp_path / name), "script": str(tmp_path / script), "cue": cue,
+            "cue_start_sec": start, "line": line, "speaker": "A", "created": name}
+
+
+def test_takes_follow_cue_identity_not_row(tmp_path):
+    store = gemi.TakeStore(str(tmp_path))
+    script = str(tmp_path / "script.xlsx")
+    store.add(_cue_take(tmp_path, "a1.wav", 3, 12.5, "안녕"))
+    store.add(_cue_take(tmp_path, "b1.wav", 4, 15.0, "잘 가"))
+    # 대본 앞에 한 줄이 추가되어 같은 대사가 5번째 행이 된 뒤의 녹음
+    later = store.add(_cue_take(tmp_path, "a2.wav", 4, 12.5, "안녕"))
+
+    key = gemi.cue_key(12.5, "안녕")
+    assert [t["path"] for t in store.for_cue(script, key)] == [str(tmp_path / "a2.wav"), str(tmp_path / "a1.wav")]
+    assert gemi.cue_key(12.5, "안녕!") != key
+
+    store.select(later)
+    chosen = {t["line"]: os.path.basename(t["path"]) for t in store.selected_for_script(script)}
+    assert chosen == {"안녕": "a2.wav", "잘 가": "b1.wav"}
+    store.close()
+
+
+def test_take_store_upgrade_fills_cue_keys(tmp_path):
+    db = gemi.sqlite3.connect(str(tmp_path / gemi.TakeStore.DB_NAME))
+    db.executescript("""
+        CREATE TABLE takes (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, script TEXT, cue INTEGER,
+            cue_start_sec REAL, speaker TEXT, line TEXT, video_start_sec REAL, offset_sec REAL NOT NULL DEFAULT 0,
+            duration_sec REAL, created TEXT, selected INTEGER NOT NULL DEFAULT 0, trim_start_sec REAL, trim_end_sec REAL);
+        INSERT INTO takes (path, script, cue, cue_start_sec, line) VALUES ('old.wav', 's', 2, 7.25, '대사');
+        INSERT INTO takes (path) VALUES ('loose.wav');
+        PRAGMA user_version = 3;
+    """)
+    db.close()
+
+    store = gemi.TakeStore(str(tmp_path))
+    rows = {t["path"]: t["cue_key"] for t in store._query("1", ())}
+    assert rows == {"old.wav": gemi.cue_key(7.25, "대사"), "loose.wav": None}
+    store.close()
+
+
+# ---------------------------
+# 대사 위치 색인
+# ---------------------------
+def _linear_locate(rows, now):
+    # 색인 도입 전 순차 탐색과 같은 규칙 (NaN 시작 이후는 도달하지 않음)
+    found = -1
+    for i, r in enumerate(rows):
+        if r["시작_초"] != r["시작_초"] or r["시작_초"] > now:
+            break
+        found = i
+    return found
+
+
+def test_cue_index_matches_linear_scan():
+    rng = gemi.random.Random(1)
+    starts = sorted(rng.uniform(0, 600) for _ in range(300))
+    starts[10] = starts[11] # 같은 시각에 시작하는 대사
+    full = [{"시작_초": t} for t in starts] + [{"시작_초": float("nan")}]
+    primary = full[::3]
+    index = gemi.CueIndex(full, primary)
+
+    # 순방향 재생(작은 간격) + 앞/뒤로 탐색 섞기
+    now, times = 0.0, []
+    for _ in range(3000):
+        now = rng.uniform(-5, 620) if rng.random() < 0.05 else now + rng.uniform(0, 0.5)
+        times.append(now)
+    times += [starts[0], starts[10], starts[-1], -1.0]
+
+    for t in times:
+        assert index.locate(t) == (_linear_locate(full, t), _linear_locate(primary, t)), t
+
+
+# ---------------------------
+# 대사 목록 모델 / 필터
+# ---------------------------
+def test_dialogue_proxy_filters_by_speaker_and_search():
+    rows = [
+        {"시작_초": 1.0, "화자": "A", "대사": "안녕하세요", "감정": None, "톤": None},
+        {"시작_초": 2.5, "화자": "B", "대사": "안녕", "감정": "기쁨", "톤": None},
+        {"시작_초": 4.0, "화자": "A", "대사": "잘 가", "감정": None, "톤": None},
+        {"시작_초": None, "화자": "B", "대사": "시간 없음", "감정": None, "톤": None},
+    ]
+    model = gemi.DialogueTableModel(rows)
+    assert (model.rowCount(), model.columnCount()) == (4, 5)
+    assert model.data(model.index(1, 0)) == "2.500초"
+    assert model.data(model.index(3, 0)) == ""
+    assert model.headerData(2, gemi.Qt.Orientation.Vertical) == "3"
+
+    proxy = gemi.DialogueFilterProxy()
+    proxy.setSourceModel(model)
+
+    def shown():
+        return [proxy.mapToSource(proxy.index(r, 0)).row() for r in range(proxy.rowCount())]
+
+    assert shown() == [0, 1, 2, 3]
+    proxy.set_speaker("A")
+    assert shown() == [0, 2]
+    proxy.set_search_rows(gemi.DialogueSearchIndex(rows).search("안녕"))
+    assert shown() == [0]
+    proxy.set_speaker(None)
+    assert shown() == [0, 1]
+    proxy.set_speaker("없는 화자")
+    assert shown() == []
+
+
+# ---------------------------
+# 대본 캐시
+# ---------------------------
+def test_script_cache_round_trip_and_invalidation(tmp_path, monkeypatch):
+    path = str(tmp_path / "script.xlsx")
+    gemi.write_script_xlsx(path, list(gemi.bench_rows(30)))
+    cache = gemi.ScriptCache(str(tmp_path / "cache"))
+
+    full, primary = gemi.load_script(path, cache)
+    parse = gemi.read_script_excel
+
+    def no_parse(*a, **kw):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(gemi, "read_script_excel", no_parse)
+    hit_full, hit_primary = gemi.load_script(path, cache)
+    assert repr(hit_full) == repr(full) and repr(hit_primary) == repr(primary) # 빈 셀 NaN 포함
+    assert all(any(p is r for r in hit_full) for p in hit_primary) # primary 는 full 의 같은 행 객체
+
+    # 내용이 바뀌면 (크기/수정시각/해시) 다시 파싱
+    gemi.write_script_xlsx(path, list(gemi.bench_rows(31)))
+    assert cache.load(path) is None
+    monkeypatch.setattr(gemi, "read_script_excel", parse)
+    assert len(gemi.load_script(path, cache)[0]) == 31
+    assert cache.load(path) is not None
+
+    # 파싱 방식 버전이 바뀌면 무효
+    monkeypatch.setattr(gemi.ScriptCache, "VERSION", gemi.ScriptCache.VERSION + 1)
+    assert cache.load(path) is None
+    monkeypatch.undo()
+
+    # 깨진 캐시 파일은 지우고 미적중 처리
+    entry = cache._entry_path(path)
+    with open(entry, "r+b") as f:
+        f.seek(-8, os.SEEK_END)
+        f.write(b"\0" * 8)
+    assert cache.load(path) is None and not os.path.exists(entry)
+
+
+# ---------------------------
+# 파형 피크 피라미드
+# ---------------------------
+def test_peak_pyramid_levels_match_direct_reduction(tmp_path):
+    np = gemi.np
+    P = gemi.PeakPyramid
+    frames = P.READ_BLOCK + 1000 # 읽기 블록 경계 + 자투리 칸
+    x = np.random.default_rng(3).uniform(-1, 1, (frames, 2)).astype(np.float32)
+    path = str(tmp_path / "take.wav")
+    gemi.sf.write(path, x, 48000, subtype="FLOAT")
+    mono = x.mean(axis=1)
+
+    pyramid = P.build(path)
+    assert (pyramid.sample_rate, pyramid.frames) == (48000, frames)
+    assert len(pyramid.levels[-1]) <= P.MIN_BUCKETS < len(pyramid.levels[-2])
+    for level, lv in enumerate(pyramid.levels):
+        size = pyramid.bucket_size(level)
+        starts = range(0, frames, size)
+        assert len(lv) == len(starts), level
+        expect = np.array([[mono[s:s + size].min(), mono[s:s + size].max(),
+                            np.sqrt((mono[s:s + size].astype(np.float64) ** 2).mean())] for s in starts])
+        assert np.allclose(lv[:, :2], expect[:, :2]), level
+        assert np.allclose(lv[:-1, 2], expect[:-1, 2], rtol=1e-4), level # 마지막 칸은 채움 방식에 따라 다름
+
+    assert pyramid.level_for(1) == 0
+    assert pyramid.level_for(P.BASE * P.FACTOR) == 1
+    assert pyramid.level_for(10 ** 9) == len(pyramid.levels) - 1
+
+    cache = gemi.PeakCache(str(tmp_path / "peaks"))
+    os.makedirs(cache.folder)
+    built = cache.get_or_build(path)
+    loaded = cache.load(path)
+    assert loaded.frames == frames and all(np.array_equal(a, b) for a, b in zip(built.levels, loaded.levels))
+
+    # 파일이 바뀌면 이전 캐시는 지우고 새로 계산
+    gemi.sf.write(path, x[:5000], 48000, subtype="FLOAT")
+    assert cache.load(path) is None
+    assert cache.get_or_build(path).frames == 5000
+    assert len(os.listdir(cache.folder)) == 1
+
+
+# ---------------------------
+# 무음 트림
+# ---------------------------
+def _speech_take(tmp_path, name, seconds, bursts, fs=44100):
+    # 잡음 바닥 약 -60dBFS 위에 (시작초, 끝초) 구간마다 -12dBFS 톤
+    np = gemi.np
+    rng = np.random.default_rng(4)
+    x = rng.normal(0, 10 ** (-60 / 20), int(seconds * fs))
+    t = np.arange(len(x)) / fs
+    for a, b in bursts:
+        on = (t >= a) & (t < b)
+        x[on] += 0.25 * np.sqrt(2) * np.sin(2 * np.pi * 220 * t[on])
+    path = str(tmp_path / name)
+    gemi.sf.write(path, x.astype(np.float32), fs)
+    return path
+
+
+def test_trim_take_bounds(tmp_path):
+    frame = gemi.TRIM_FRAME_SEC
+    # 짧은 클릭(5ms)은 무시, 발화 앞뒤로 여유
+    path = _speech_take(tmp_path, "mid.wav", 2.0, [(0.2, 0.205), (0.5, 1.3)])
+    trim = gemi.trim_take(path)
+    assert trim["speech"]
+    assert abs(trim["start_sec"] - (0.5 - gemi.TRIM_PRE_PAD_SEC)) <= frame
+    assert abs(trim["end_sec"] - (1.3 + gemi.TRIM_POST_PAD_SEC)) <= frame
+    assert gemi.read_take_sidecar(path)["trim"] == trim
+
+    # 파일 처음/끝까지 이어지는 발화는 파일 범위로 잘림
+    edge = gemi.trim_take(_speech_take(tmp_path, "edge.wav", 1.0, [(0.0, 0.4), (0.7, 1.0)]), write=False)
+    assert edge["start_sec"] == 0.0 and edge["end_sec"] == edge["duration_sec"]
+    assert abs(edge["duration_sec"] - 1.0) <= frame
+
+    silent = gemi.trim_take(_speech_take(tmp_path, "silent.wav", 1.0, [(0.3, 0.33)]), write=False)
+    assert silent["speech"] is False and silent["start_sec"] is None
+    assert not os.path.exists(gemi.take_sidecar_path(str(tmp_path / "silent.wav")))
+
+
+# ---------------------------
+# 테이크 정렬 (상호상관)
+# ---------------------------
+def test_estimate_lag_finds_fractional_delay():
+    np = gemi.np
+    fs = 48000
+    ref = gemi.make_calibration_signal(fs, seconds=0.2)
+    delay = 1234.4
+    spectrum = np.fft.rfft(ref, 16384)
+    shifted = np.fft.irfft(spectrum * np.exp(-2j * np.pi * np.fft.rfftfreq(16384) * delay), 16384)
+    recorded = shifted + np.random.default_rng(5).normal(0, 0.01, len(shifted))
+
+    lag, score = gemi.estimate_lag(ref, recorded.astype(np.float32))
+    assert abs(lag - delay) < 0.2 and score > 0.9
+    with pytest.raises(gemi.CalibrationError):
+        gemi.estimate_lag(ref, ref[:100])
+
+
+def _burst_audio(path, fs, seconds, bursts, seed):
+    # 구간마다 잡음 버스트 (정렬은 에너지 변화만 보므로 두 파일의 잡음이 달라도 됨)
+    np = gemi.np
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 0.001, int(seconds * fs))
+    for a, b in bursts:
+        x[int(a * fs):int(b * fs)] += rng.normal(0, 0.2, int(b * fs) - int(a * fs))
+    gemi.sf.write(path, x.astype(np.float32), fs)
+
+
+def test_align_take_recovers_offset(tmp_path):
+    bursts = [(0.5, 0.8), (1.1, 1.25), (2.3, 2.9), (3.2, 3.3), (3.6, 4.4), (5.0, 5.5)]
+    guide = str(tmp_path / "guide.wav")
+    _burst_audio(guide, 22050, 6.0, bursts, seed=6)
+
+    # 테이크 = 가이드 2.0~4.6 초 구간을 44.1k 로 다시 녹음한 것, 0.3 초 늦게 놓여 있음
+    take = str(tmp_path / "take.wav")
+    _burst_audio(take, 44100, 2.6, [(a - 2.0, b - 2.0) for a, b in bursts if 2.0 <= a < 4.6], seed=7)
+    r = gemi.align_take(take, 2.3, guide)
+    assert abs(r["delta_sec"] + 0.3) <= 2 * gemi.ALIGN_HOP_SEC
+    assert r["confidence"] > 0.5
+
+    store = gemi.TakeStore(str(tmp_path))
+    gemi.write_take_sidecar(take, {"path": take})
+    store.add({"path": take, "offset_sec": 0.1})
+    row = store.unattached()[0]
+    assert gemi.apply_alignment(store, row, r) == pytest.approx(0.1 + r["delta_sec"])
+    assert store.unattached()[0]["offset_sec"] == pytest.approx(0.1 + r["delta_sec"])
+    assert gemi.read_take_sidecar(take)["alignment"]["delta_sec"] == r["delta_sec"]
+    store.close()